@@ -0,0 +1,41 @@
+"""transaction_checkpoints
+
+Revision ID: 3f1c2a9d7e41
+Revises: 6af6dabcbdc4
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9d7e41"
+down_revision: Union[str, None] = "6af6dabcbdc4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transaction_checkpoints",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column("account_id", sa.Uuid(), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.Column("last_transaction_at", sa.DateTime(), nullable=False),
+        sa.Column("last_transaction_id", sa.Uuid(), nullable=False),
+        sa.Column("buying_power", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("securities", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transaction_checkpoints")
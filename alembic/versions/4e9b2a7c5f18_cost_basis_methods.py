@@ -0,0 +1,52 @@
+"""cost_basis_methods
+
+Revision ID: 4e9b2a7c5f18
+Revises: 8c5d1e4a7f36
+Create Date: 2026-10-18 23:41:09.528713
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e9b2a7c5f18"
+down_revision: Union[str, None] = "8c5d1e4a7f36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "cost_basis_method",
+                sa.Enum("FIFO", "LIFO", "HIFO", "AVERAGE", name="costbasismethod"),
+                nullable=False,
+                server_default="FIFO",
+            )
+        )
+    op.create_index(
+        "ix_lots_security_id_sequence_open",
+        "lots",
+        ["security_id", "sequence"],
+        sqlite_where=sa.text("remaining_quantity > 0"),
+        postgresql_where=sa.text("remaining_quantity > 0"),
+    )
+    op.create_index(
+        "ix_lots_security_id_price_open",
+        "lots",
+        ["security_id", sa.text("price DESC"), "sequence"],
+        sqlite_where=sa.text("remaining_quantity > 0"),
+        postgresql_where=sa.text("remaining_quantity > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lots_security_id_price_open", table_name="lots")
+    op.drop_index("ix_lots_security_id_sequence_open", table_name="lots")
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("cost_basis_method")
@@ -0,0 +1,163 @@
+"""realized_gains
+
+Revision ID: 8c5d1e4a7f36
+Revises: 2b8f6e1c4d73
+Create Date: 2026-10-18 21:04:51.306127
+
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Sequence, Union
+from uuid import uuid4
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c5d1e4a7f36"
+down_revision: Union[str, None] = "2b8f6e1c4d73"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+trades = sa.table(
+    "trades",
+    sa.column("id", sa.Uuid()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("account_id", sa.Uuid()),
+    sa.column("security_id", sa.Uuid()),
+    sa.column("type", sa.String()),
+    sa.column("quantity", sa.Numeric(precision=18, scale=8)),
+    sa.column("price", sa.Numeric(precision=18, scale=8)),
+)
+realized_gains = sa.table(
+    "realized_gains",
+    sa.column("id", sa.Uuid()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("updated_at", sa.DateTime()),
+    sa.column("account_id", sa.Uuid()),
+    sa.column("security_id", sa.Uuid()),
+    sa.column("trade_id", sa.Uuid()),
+    sa.column("sold_at", sa.DateTime()),
+    sa.column("quantity", sa.Numeric(precision=18, scale=8)),
+    sa.column("proceeds", sa.Numeric(precision=18, scale=8)),
+    sa.column("cost", sa.Numeric(precision=18, scale=8)),
+    sa.column("gain", sa.Numeric(precision=18, scale=8)),
+    sa.column("holding_days", sa.Numeric(precision=18, scale=2)),
+    sa.column("lots", sa.JSON()),
+)
+
+
+def _realized_gains(rows) -> list[dict]:
+    """Gains of the sells among `rows`, trades ordered by security and time,
+    consuming the lots opened by the buys first in, first out."""
+    now = datetime.now(timezone.utc)
+    gains = []
+    security_id = None
+    for row in rows:
+        if row.security_id != security_id:
+            security_id = row.security_id
+            lots: deque[list] = deque()
+            sequence = 0
+        if row.type.lower() == "buy":
+            lots.append([sequence, row.quantity, row.price, row.created_at])
+            sequence += 1
+            continue
+
+        remaining = row.quantity
+        consumed = []
+        while remaining > 0 and lots:
+            lot = lots[0]
+            taken = min(lot[1], remaining)
+            lot[1] -= taken
+            remaining -= taken
+            consumed.append((lot[0], taken, lot[2], lot[3]))
+            if lot[1] == 0:
+                lots.popleft()
+        if not consumed:
+            continue
+
+        cost = sum((q * price for _, q, price, _ in consumed), Decimal("0"))
+        proceeds = row.quantity * row.price
+        seconds_held = sum(
+            (
+                q * Decimal((row.created_at - acquired_at).total_seconds())
+                for _, q, _, acquired_at in consumed
+            ),
+            Decimal("0"),
+        )
+        gains.append(
+            {
+                "id": uuid4(),
+                "created_at": now,
+                "updated_at": now,
+                "account_id": row.account_id,
+                "security_id": row.security_id,
+                "trade_id": row.id,
+                "sold_at": row.created_at,
+                "quantity": row.quantity,
+                "proceeds": proceeds,
+                "cost": cost,
+                "gain": proceeds - cost,
+                "holding_days": round(seconds_held / row.quantity / 86400, 2),
+                "lots": [
+                    {
+                        "sequence": seq,
+                        "quantity": str(q),
+                        "price": str(price),
+                        "acquired_at": acquired_at.isoformat(),
+                    }
+                    for seq, q, price, acquired_at in consumed
+                ],
+            }
+        )
+    return gains
+
+
+def upgrade() -> None:
+    op.create_table(
+        "realized_gains",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column("account_id", sa.Uuid(), nullable=False),
+        sa.Column("security_id", sa.Uuid(), nullable=False),
+        sa.Column("trade_id", sa.Uuid(), nullable=True),
+        sa.Column("sold_at", sa.DateTime(), nullable=False),
+        sa.Column("quantity", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("proceeds", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("cost", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("gain", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("holding_days", sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column("lots", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["security_id"], ["securities.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["trade_id"], ["trades.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_realized_gains_account_id_sold_at",
+        "realized_gains",
+        ["account_id", "sold_at"],
+    )
+    op.create_index(op.f("ix_realized_gains_trade_id"), "realized_gains", ["trade_id"])
+
+    # Record the gains of the sells made before this migration
+    rows = op.get_bind().execute(
+        sa.select(trades).order_by(
+            trades.c.security_id, trades.c.created_at, trades.c.id
+        )
+    )
+    gains = _realized_gains(rows)
+    if gains:
+        op.bulk_insert(realized_gains, gains)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_realized_gains_trade_id"), table_name="realized_gains")
+    op.drop_index("ix_realized_gains_account_id_sold_at", table_name="realized_gains")
+    op.drop_table("realized_gains")
@@ -0,0 +1,52 @@
+"""position_snapshots
+
+Revision ID: 9b7e4d2c1a58
+Revises: 3f1c2a9d7e41
+Create Date: 2026-10-18 10:41:03.552871
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b7e4d2c1a58"
+down_revision: Union[str, None] = "3f1c2a9d7e41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "position_snapshots",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column("account_id", sa.Uuid(), nullable=False),
+        sa.Column("security_id", sa.Uuid(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("position", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("cost_basis", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("average_price", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("fifo_lots", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["security_id"], ["securities.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("security_id", "date"),
+    )
+    op.create_index(
+        "ix_position_snapshots_account_id_date",
+        "position_snapshots",
+        ["account_id", "date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_position_snapshots_account_id_date", table_name="position_snapshots"
+    )
+    op.drop_table("position_snapshots")
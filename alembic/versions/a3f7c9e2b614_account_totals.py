@@ -0,0 +1,88 @@
+"""account_totals
+
+Revision ID: a3f7c9e2b614
+Revises: 4e9b2a7c5f18
+Create Date: 2026-10-19 01:17:36.904251
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f7c9e2b614"
+down_revision: Union[str, None] = "4e9b2a7c5f18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+accounts = sa.table(
+    "accounts",
+    sa.column("id", sa.Uuid()),
+    sa.column("total_target_allocation", sa.Numeric(precision=18, scale=8)),
+    sa.column("total_cost_basis", sa.Numeric(precision=18, scale=8)),
+    sa.column("market_value", sa.Numeric(precision=18, scale=8)),
+)
+securities = sa.table(
+    "securities",
+    sa.column("account_id", sa.Uuid()),
+    sa.column("symbol", sa.String()),
+    sa.column("target_allocation", sa.Numeric(precision=18, scale=8)),
+    sa.column("cost_basis", sa.Numeric(precision=18, scale=8)),
+    sa.column("position", sa.Numeric(precision=18, scale=8)),
+)
+instruments = sa.table(
+    "instruments",
+    sa.column("symbol", sa.String()),
+    sa.column("latest_price", sa.Numeric(precision=18, scale=8)),
+)
+
+
+def _total(expression):
+    return (
+        sa.select(sa.func.coalesce(sa.func.sum(expression), 0))
+        .where(securities.c.account_id == accounts.c.id)
+        .scalar_subquery()
+    )
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        for name in ("total_target_allocation", "total_cost_basis", "market_value"):
+            batch_op.add_column(
+                sa.Column(
+                    name,
+                    sa.Numeric(precision=18, scale=8),
+                    nullable=False,
+                    server_default="0",
+                )
+            )
+
+    market_value = (
+        sa.select(
+            sa.func.coalesce(
+                sa.func.sum(securities.c.position * instruments.c.latest_price), 0
+            )
+        )
+        .select_from(securities)
+        .join(instruments, instruments.c.symbol == securities.c.symbol)
+        .where(securities.c.account_id == accounts.c.id)
+        .scalar_subquery()
+    )
+    op.execute(
+        accounts.update().values(
+            total_target_allocation=_total(securities.c.target_allocation),
+            total_cost_basis=_total(securities.c.cost_basis),
+            market_value=market_value,
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("market_value")
+        batch_op.drop_column("total_cost_basis")
+        batch_op.drop_column("total_target_allocation")
@@ -0,0 +1,185 @@
+"""lots_table
+
+Revision ID: c4a81f06d3b2
+Revises: 9b7e4d2c1a58
+Create Date: 2026-10-18 13:05:27.904415
+
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a81f06d3b2"
+down_revision: Union[str, None] = "9b7e4d2c1a58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+securities = sa.table(
+    "securities",
+    sa.column("id", sa.Uuid()),
+    sa.column("account_id", sa.Uuid()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("fifo_lots", sa.JSON()),
+    sa.column("lot_sequence", sa.Integer()),
+)
+lots = sa.table(
+    "lots",
+    sa.column("id", sa.Uuid()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("updated_at", sa.DateTime()),
+    sa.column("account_id", sa.Uuid()),
+    sa.column("security_id", sa.Uuid()),
+    sa.column("sequence", sa.Integer()),
+    sa.column("quantity", sa.Numeric(precision=18, scale=8)),
+    sa.column("remaining_quantity", sa.Numeric(precision=18, scale=8)),
+    sa.column("price", sa.Numeric(precision=18, scale=8)),
+    sa.column("acquired_at", sa.DateTime()),
+)
+position_snapshots = sa.table(
+    "position_snapshots",
+    sa.column("id", sa.Uuid()),
+    sa.column("date", sa.Date()),
+    sa.column("fifo_lots", sa.JSON()),
+    sa.column("lots", sa.JSON()),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lots",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column("account_id", sa.Uuid(), nullable=False),
+        sa.Column("security_id", sa.Uuid(), nullable=False),
+        sa.Column("sequence", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column(
+            "remaining_quantity", sa.Numeric(precision=18, scale=8), nullable=False
+        ),
+        sa.Column("price", sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column("acquired_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["security_id"], ["securities.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("security_id", "sequence"),
+    )
+    op.create_index(
+        "ix_lots_account_id_acquired_at", "lots", ["account_id", "acquired_at"]
+    )
+    with op.batch_alter_table("securities") as batch_op:
+        batch_op.add_column(
+            sa.Column("lot_sequence", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.add_column(
+            sa.Column("lot_cursor", sa.Integer(), nullable=False, server_default="0")
+        )
+    with op.batch_alter_table("position_snapshots") as batch_op:
+        batch_op.add_column(sa.Column("lots", sa.JSON(), nullable=True))
+
+    # The open lots of each security become rows; their purchase dates are
+    # unknown, so the security's creation date is used.
+    connection = op.get_bind()
+    now = datetime.now(timezone.utc)
+    for row in connection.execute(sa.select(securities)).all():
+        fifo_lots = row.fifo_lots or []
+        for sequence, (quantity, price) in enumerate(fifo_lots):
+            connection.execute(
+                lots.insert().values(
+                    id=uuid.uuid4(),
+                    created_at=now,
+                    updated_at=now,
+                    account_id=row.account_id,
+                    security_id=row.id,
+                    sequence=sequence,
+                    quantity=quantity,
+                    remaining_quantity=quantity,
+                    price=price,
+                    acquired_at=row.created_at,
+                )
+            )
+        connection.execute(
+            securities.update()
+            .where(securities.c.id == row.id)
+            .values(lot_sequence=len(fifo_lots))
+        )
+
+    for row in connection.execute(sa.select(position_snapshots)).all():
+        acquired_at = datetime.combine(row.date, datetime.min.time()).isoformat()
+        connection.execute(
+            position_snapshots.update()
+            .where(position_snapshots.c.id == row.id)
+            .values(
+                lots=[
+                    {
+                        "sequence": sequence,
+                        "quantity": quantity,
+                        "remaining_quantity": quantity,
+                        "price": price,
+                        "acquired_at": acquired_at,
+                    }
+                    for sequence, (quantity, price) in enumerate(row.fifo_lots or [])
+                ]
+            )
+        )
+
+    # Checkpoints saved the JSON lots; replays rebuild them as needed
+    connection.execute(sa.text("DELETE FROM transaction_checkpoints"))
+
+    with op.batch_alter_table("position_snapshots") as batch_op:
+        batch_op.drop_column("fifo_lots")
+    with op.batch_alter_table("securities") as batch_op:
+        batch_op.drop_column("fifo_lots")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("securities") as batch_op:
+        batch_op.add_column(sa.Column("fifo_lots", sa.JSON(), nullable=True))
+    with op.batch_alter_table("position_snapshots") as batch_op:
+        batch_op.add_column(sa.Column("fifo_lots", sa.JSON(), nullable=True))
+
+    connection = op.get_bind()
+    open_lots: dict = {}
+    statement = (
+        sa.select(lots)
+        .where(lots.c.remaining_quantity > 0)
+        .order_by(lots.c.security_id, lots.c.sequence)
+    )
+    for row in connection.execute(statement).all():
+        open_lots.setdefault(row.security_id, []).append(
+            [str(row.remaining_quantity), str(row.price)]
+        )
+    for row in connection.execute(sa.select(securities.c.id)).all():
+        connection.execute(
+            securities.update()
+            .where(securities.c.id == row.id)
+            .values(fifo_lots=open_lots.get(row.id, []))
+        )
+
+    for row in connection.execute(sa.select(position_snapshots)).all():
+        connection.execute(
+            position_snapshots.update()
+            .where(position_snapshots.c.id == row.id)
+            .values(
+                fifo_lots=[
+                    [lot["remaining_quantity"], lot["price"]] for lot in row.lots or []
+                ]
+            )
+        )
+    connection.execute(sa.text("DELETE FROM transaction_checkpoints"))
+
+    with op.batch_alter_table("position_snapshots") as batch_op:
+        batch_op.drop_column("lots")
+    with op.batch_alter_table("securities") as batch_op:
+        batch_op.drop_column("lot_cursor")
+        batch_op.drop_column("lot_sequence")
+    op.drop_index("ix_lots_account_id_acquired_at", table_name="lots")
+    op.drop_table("lots")
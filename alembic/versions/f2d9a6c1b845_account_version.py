@@ -0,0 +1,31 @@
+"""account_version
+
+Revision ID: f2d9a6c1b845
+Revises: a3f7c9e2b614
+Create Date: 2026-10-19 03:42:11.518304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2d9a6c1b845"
+down_revision: Union[str, None] = "a3f7c9e2b614"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("version")
@@ -1,19 +1,23 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 from uuid import UUID
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy.sql import func
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
-from app.api.utils import verify_password
+from app.api.utils import verify_password_async
 from app.constants.messages import Messages
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
+from app.core.user_cache import user_cache
+from app.crud.pagination import PageParams, decode_cursor
 from app.models.accounts import Account
 from app.models.auth import TokenData
 from app.models.generic import DetailItem
@@ -21,6 +25,7 @@ from app.models.ledger import Ledger
 from app.models.securities import Security
 from app.models.trades import Trade
 from app.models.users import User
+from app.services.imports import parse_import_rows
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -31,6 +36,16 @@ def get_session() -> Generator[Session, None, None]:
 SessionDepAnnotated = Annotated[Session, Depends(get_session)]
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # Attributes can't be lazy loaded on an async session, so they are kept
+    # loaded after commits
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDepAnnotated = Annotated[AsyncSession, Depends(get_async_session)]
+
+
 def validate_unique_username(session: SessionDepAnnotated, user_in: User):
     if user_in.username:
         statement = select(User).where(
@@ -75,16 +90,16 @@ TokenDep = Depends(oauth2_scheme)
 AuthFormDepAnnotated = Annotated[OAuth2PasswordRequestForm, Depends()]
 
 
-def get_current_user(
-    token: Annotated[str, TokenDep], session: SessionDepAnnotated
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail=DetailItem(
-            type="unauthorized", loc=[], msg=Messages.Auth.INVALID_CREDENTIALS
-        ).model_dump(),
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail=DetailItem(
+        type="unauthorized", loc=[], msg=Messages.Auth.INVALID_CREDENTIALS
+    ).model_dump(),
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_token(token: str) -> tuple[TokenData, dict]:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.AUTH_ALGORITHM]
@@ -95,23 +110,57 @@ def get_current_user(
         token_data = TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
+    return token_data, payload
+
 
+def get_current_user(
+    token: Annotated[str, TokenDep], session: SessionDepAnnotated
+) -> User:
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return session.merge(cached_user, load=False)
+
+    token_data, payload = decode_token(token)
     statement = select(User).where(User.username == token_data.username)
     user = session.exec(statement).first()
     if not user:
         raise credentials_exception
+    user_cache.set(token, user, payload.get("exp"))
     return user
 
 
 CurrentUserDepAnnotated = Annotated[User, Depends(get_current_user)]
 
 
-def authenticate_user(session: SessionDepAnnotated, form_data: AuthFormDepAnnotated):
+async def get_current_user_async(
+    token: Annotated[str, TokenDep], session: AsyncSessionDepAnnotated
+) -> User:
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return await session.merge(cached_user, load=False)
+
+    token_data, payload = decode_token(token)
+    statement = select(User).where(User.username == token_data.username)
+    user = (await session.exec(statement)).first()
+    if not user:
+        raise credentials_exception
+    user_cache.set(token, user, payload.get("exp"))
+    return user
+
+
+CurrentUserAsyncDepAnnotated = Annotated[User, Depends(get_current_user_async)]
+
+
+async def authenticate_user(
+    session: SessionDepAnnotated, form_data: AuthFormDepAnnotated
+):
+    # bcrypt runs on the password hasher's threads; waiting for it here instead
+    # of in the request threadpool keeps logins from starving other endpoints
     statement = select(User).where(User.username == form_data.username)
-    user = session.exec(statement).first()
+    user = await run_in_threadpool(lambda: session.exec(statement).first())
     if not user:
         return False
-    if not verify_password(form_data.password, user.password_hash):
+    if not await verify_password_async(form_data.password, user.password_hash):
         return False
     return user
 
@@ -147,6 +196,17 @@ def get_account_or_404(session: SessionDepAnnotated, account_id: int | UUID):
     return account_db
 
 
+async def get_account_or_404_async(
+    session: AsyncSessionDepAnnotated, account_id: int | UUID
+):
+    account_db = await crud.get_by_id_async(Account, session, account_id)
+    if not account_db:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=Messages.Account.NOT_FOUND
+        )
+    return account_db
+
+
 def get_security_or_404(session: SessionDepAnnotated, security_id: int | UUID):
     security_db = crud.get_by_id(Security, session, security_id)
     if not security_db:
@@ -156,6 +216,17 @@ def get_security_or_404(session: SessionDepAnnotated, security_id: int | UUID):
     return security_db
 
 
+async def get_security_or_404_async(
+    session: AsyncSessionDepAnnotated, security_id: int | UUID
+):
+    security_db = await crud.get_by_id_async(Security, session, security_id)
+    if not security_db:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=Messages.Security.NOT_FOUND
+        )
+    return security_db
+
+
 def get_trade_or_404(session: SessionDepAnnotated, trade_id: int | UUID):
     trade_db = crud.get_by_id(Trade, session, trade_id)
     if not trade_db:
@@ -165,6 +236,17 @@ def get_trade_or_404(session: SessionDepAnnotated, trade_id: int | UUID):
     return trade_db
 
 
+async def get_trade_or_404_async(
+    session: AsyncSessionDepAnnotated, trade_id: int | UUID
+):
+    trade_db = await crud.get_by_id_async(Trade, session, trade_id)
+    if not trade_db:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=Messages.Trade.NOT_FOUND
+        )
+    return trade_db
+
+
 def get_ledger_item_or_404(session: SessionDepAnnotated, ledger_id: int | UUID):
     ledger_item_db = crud.get_by_id(Ledger, session, ledger_id)
     if not ledger_item_db:
@@ -172,3 +254,58 @@ def get_ledger_item_or_404(session: SessionDepAnnotated, ledger_id: int | UUID):
             status_code=status.HTTP_404_NOT_FOUND, detail=Messages.Ledger.NOT_FOUND
         )
     return ledger_item_db
+
+
+async def get_ledger_item_or_404_async(
+    session: AsyncSessionDepAnnotated, ledger_id: int | UUID
+):
+    ledger_item_db = await crud.get_by_id_async(Ledger, session, ledger_id)
+    if not ledger_item_db:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=Messages.Ledger.NOT_FOUND
+        )
+    return ledger_item_db
+
+
+def get_page_params(
+    cursor: str | None = None,
+    limit: int = Query(
+        default=settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+):
+    if cursor is None:
+        return PageParams(limit=limit)
+    try:
+        return PageParams(limit=limit, cursor=decode_cursor(cursor))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=DetailItem(
+                type="invalid_cursor",
+                loc=["query", "cursor"],
+                msg=Messages.Pagination.INVALID_CURSOR,
+                input=cursor,
+            ).model_dump(),
+        )
+
+
+PageParamsDepAnnotated = Annotated[PageParams, Depends(get_page_params)]
+
+
+async def get_import_rows(request: Request) -> list[dict]:
+    try:
+        return parse_import_rows(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=DetailItem(
+                type="invalid_import_file",
+                loc=["body"],
+                msg=Messages.Import.INVALID_FILE,
+            ).model_dump(),
+        )
+
+
+ImportRowsDepAnnotated = Annotated[list[dict], Depends(get_import_rows)]
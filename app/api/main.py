@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import accounts, auth, ledger, securities, trades, users
+from app.api.routes import accounts, auth, ledger, prices, securities, trades, users
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(accounts.router)
 api_router.include_router(securities.router)
 api_router.include_router(trades.router)
 api_router.include_router(ledger.router)
+api_router.include_router(prices.router)
@@ -1,10 +1,17 @@
+from datetime import date, datetime, timezone
+
 from fastapi import APIRouter, Depends, status
 
 from app import crud
 from app.api.dependencies import (
+    AsyncSessionDepAnnotated,
+    CurrentUserAsyncDepAnnotated,
     CurrentUserDepAnnotated,
+    ImportRowsDepAnnotated,
+    PageParamsDepAnnotated,
     SessionDepAnnotated,
     get_account_or_404,
+    get_account_or_404_async,
 )
 from app.api.utils import verify_ownership_or_403
 from app.constants.messages import Messages
@@ -16,9 +23,22 @@ from app.models.accounts import (
     AccountUpdate,
     AllocationPlanCreate,
     AllocationPlanItem,
+    RebalancePlanCreate,
+    RebalancePlanItem,
 )
 from app.models.generic import Meta, ResponseMultiple, ResponseSingle
+from app.models.imports import ImportResult
+from app.models.performance import AccountPerformance
+from app.models.prices import PortfolioValuePoint
+from app.models.realized_gains import RealizedGainPeriod, RealizedGainSummary
+from app.models.snapshots import HoldingRead
 from app.services.allocation import AccountManager
+from app.services.holdings import get_holdings_at
+from app.services.imports import import_transactions
+from app.services.performance import get_account_performance
+from app.services.realized_gains import get_realized_gains
+from app.services.transactions import change_cost_basis_method, run_account_write
+from app.services.valuation import get_account_value_history
 
 router = APIRouter(
     prefix=f"/{settings.ACCOUNTS_ROUTE_STR}", tags=[settings.ACCOUNTS_ROUTE_STR]
@@ -26,24 +46,33 @@ router = APIRouter(
 
 
 @router.get("/", response_model=ResponseMultiple[AccountRead])
-def read_account_list(
-    session: SessionDepAnnotated,
-    current_user: CurrentUserDepAnnotated,
+async def read_account_list(
+    session: AsyncSessionDepAnnotated,
+    current_user: CurrentUserAsyncDepAnnotated,
+    page: PageParamsDepAnnotated,
+    since: datetime | None = None,
+    until: datetime | None = None,
 ):
-    if current_user.is_admin:
-        accounts, count = crud.accounts.fetch_all(session)
-    else:
-        accounts = current_user.accounts
-        count = len(accounts)
-    return ResponseMultiple(data=accounts, meta=Meta(count=count))
+    owner = None if current_user.is_admin else current_user
+    result = await crud.accounts.get_page_async(session, page, owner, since, until)
+    return ResponseMultiple(
+        data=result.items,
+        meta=Meta(
+            count=result.count,
+            next_cursor=result.next_cursor,
+            prev_cursor=result.prev_cursor,
+        ),
+    )
 
 
 @router.get("/{account_id}", response_model=ResponseSingle[AccountRead])
-def read_account_detail(
-    current_user: CurrentUserDepAnnotated,
-    account_db: Account = Depends(get_account_or_404),
+async def read_account_detail(
+    session: AsyncSessionDepAnnotated,
+    current_user: CurrentUserAsyncDepAnnotated,
+    account_db: Account = Depends(get_account_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    await crud.accounts.load_securities_async(session, account_db)
     return ResponseSingle(data=account_db)
 
 
@@ -67,7 +96,13 @@ def update_account(
     account_db: Account = Depends(get_account_or_404),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
-    crud.accounts.update(session, account_db, account_in)
+
+    def write():
+        if account_in.cost_basis_method is not None:
+            change_cost_basis_method(session, account_db, account_in.cost_basis_method)
+        crud.accounts.update(session, account_db, account_in)
+
+    run_account_write(session, account_db, write)
     return ResponseSingle(data=account_db, message=Messages.Account.UPDATED)
 
 
@@ -82,6 +117,90 @@ def delete_account(
     return ResponseSingle(message=Messages.Account.DELETED)
 
 
+@router.get("/{account_id}/holdings", response_model=ResponseMultiple[HoldingRead])
+def read_holdings(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    at: datetime | None = None,
+    account_db: Account = Depends(get_account_or_404),
+):
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    holdings = get_holdings_at(session, account_db, at or datetime.now(timezone.utc))
+    return ResponseMultiple(data=holdings, meta=Meta(count=len(holdings)))
+
+
+@router.get("/{account_id}/value", response_model=ResponseMultiple[PortfolioValuePoint])
+def read_value_history(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    since: date | None = None,
+    until: date | None = None,
+    account_db: Account = Depends(get_account_or_404),
+):
+    """Daily value of the account's holdings, valued at the stored closing
+    prices, and of its cash."""
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    history = get_account_value_history(session, account_db, since, until)
+    return ResponseMultiple(data=history, meta=Meta(count=len(history)))
+
+
+@router.get(
+    "/{account_id}/performance", response_model=ResponseSingle[AccountPerformance]
+)
+def read_performance(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    since: date | None = None,
+    until: date | None = None,
+    account_db: Account = Depends(get_account_or_404),
+):
+    """Time-weighted and money-weighted (XIRR) returns of the account and of
+    each security it traded, valued at the stored closing prices."""
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    performance = get_account_performance(session, account_db, since, until)
+    return ResponseSingle(data=performance)
+
+
+@router.get(
+    "/{account_id}/realized-gains",
+    response_model=ResponseMultiple[RealizedGainSummary],
+)
+def read_realized_gains(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    since: date | None = None,
+    until: date | None = None,
+    period: RealizedGainPeriod | None = None,
+    by_security: bool = False,
+    account_db: Account = Depends(get_account_or_404),
+):
+    """Proceeds, cost and gain realized by the account's sells, totaled per
+    day, month or year of the sell and/or per security."""
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    gains = get_realized_gains(session, account_db, since, until, period, by_security)
+    return ResponseMultiple(data=gains, meta=Meta(count=len(gains)))
+
+
+@router.post(
+    "/{account_id}/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseSingle[ImportResult],
+)
+def import_account_transactions(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    rows: ImportRowsDepAnnotated,
+    account_db: Account = Depends(get_account_or_404),
+):
+    """Import trades and ledger entries from a JSON array or a CSV file
+    (`Content-Type: text/csv`) of rows shaped like `ImportRow`."""
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    result = run_account_write(
+        session, account_db, lambda: import_transactions(session, account_db, rows)
+    )
+    return ResponseSingle(data=result, message=Messages.Import.COMPLETED)
+
+
 @router.post("/{account_id}/plan")
 def create_allocation_plan(
     session: SessionDepAnnotated,
@@ -94,4 +213,29 @@ def create_allocation_plan(
     plan = mgr.get_allocation_plan(
         allocation_plan_in.new_investment, allocation_plan_in.allocation_strategy
     )
-    return ResponseMultiple(data=plan, message=Messages.Allocation.CREATED)
+    message = (
+        Messages.Allocation.CREATED_WITH_STALE_PRICES
+        if any(item.stale_price for item in plan)
+        else Messages.Allocation.CREATED
+    )
+    return ResponseMultiple(data=plan, message=message)
+
+
+@router.post("/{account_id}/rebalance")
+def create_rebalance_plan(
+    session: SessionDepAnnotated,
+    current_user: CurrentUserDepAnnotated,
+    rebalance_in: RebalancePlanCreate,
+    account_db: Account = Depends(get_account_or_404),
+) -> ResponseMultiple[RebalancePlanItem]:
+    """Trades, within the new investment plus the proceeds of any sells, that
+    bring the account closest to its target allocation."""
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    mgr = AccountManager(session, account_db)
+    plan = mgr.get_rebalance_plan(rebalance_in)
+    message = (
+        Messages.Allocation.CREATED_WITH_STALE_PRICES
+        if any(item.stale_price for item in plan)
+        else Messages.Allocation.REBALANCED
+    )
+    return ResponseMultiple(data=plan, message=message)
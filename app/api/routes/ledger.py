@@ -1,26 +1,38 @@
-from fastapi import APIRouter, Depends, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 
 from app import crud
 from app.api.dependencies import (
+    AsyncSessionDepAnnotated,
+    CurrentUserAsyncDepAnnotated,
     CurrentUserDepAnnotated,
+    PageParamsDepAnnotated,
     SessionDepAnnotated,
     get_account_or_404,
+    get_account_or_404_async,
     get_ledger_item_or_404,
+    get_ledger_item_or_404_async,
 )
 from app.api.utils import verify_ownership_or_403
 from app.constants.messages import Messages
 from app.core.config import settings
 from app.models.accounts import Account
 from app.models.contexts import LedgerTransactionContext
-from app.models.generic import Meta, ResponseMultiple, ResponseSingle
+from app.models.generic import ExportFormat, Meta, ResponseMultiple, ResponseSingle
 from app.models.ledger import (
     Ledger,
     LedgerCreate,
     LedgerRead,
+    LedgerType,
 )
+from app.services.exports import MEDIA_TYPES, export_ledger
 from app.services.transactions import (
     process_transaction,
+    record_checkpoint_if_due,
     reprocess_transactions_excluding,
+    run_account_write,
 )
 
 router = APIRouter(
@@ -30,21 +42,51 @@ router = APIRouter(
 
 
 @router.get("/", response_model=ResponseMultiple[LedgerRead])
-def read_ledger_list(
-    current_user: CurrentUserDepAnnotated,
-    account_db: Account = Depends(get_account_or_404),
+async def read_ledger_list(
+    session: AsyncSessionDepAnnotated,
+    current_user: CurrentUserAsyncDepAnnotated,
+    page: PageParamsDepAnnotated,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: LedgerType | None = Query(default=None, alias="type"),
+    account_db: Account = Depends(get_account_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    result = await crud.ledger.get_page_for_account_async(
+        session, account_db, page, since, until, type_
+    )
     return ResponseMultiple(
-        data=account_db.ledger, meta=Meta(count=len(account_db.ledger))
+        data=result.items,
+        meta=Meta(
+            count=result.count,
+            next_cursor=result.next_cursor,
+            prev_cursor=result.prev_cursor,
+        ),
     )
 
 
-@router.get("/{ledger_id}", response_model=ResponseSingle[LedgerRead])
-def read_ledger_detail(
+@router.get("/export", response_class=StreamingResponse)
+def export_ledger_list(
+    session: SessionDepAnnotated,
     current_user: CurrentUserDepAnnotated,
+    format: ExportFormat = ExportFormat.NDJSON,
     account_db: Account = Depends(get_account_or_404),
-    ledger_db: Ledger = Depends(get_ledger_item_or_404),
+):
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    return StreamingResponse(
+        export_ledger(session.get_bind(), account_db.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="ledger-{account_db.id}.{format.value}"'
+        },
+    )
+
+
+@router.get("/{ledger_id}", response_model=ResponseSingle[LedgerRead])
+async def read_ledger_detail(
+    current_user: CurrentUserAsyncDepAnnotated,
+    account_db: Account = Depends(get_account_or_404_async),
+    ledger_db: Ledger = Depends(get_ledger_item_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(ledger_db.account_id, account_db.id)
@@ -64,16 +106,22 @@ def create_ledger_item(
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
 
-    ctx = LedgerTransactionContext(
-        session=session,
-        account=account_db,
-        type=ledger_in.type,
-        ledger=ledger_in,
-    )
-    process_transaction(ctx)
-
-    ledger_db = crud.ledger.create(session, ledger_in, account_db)
-
+    def write():
+        ctx = LedgerTransactionContext(
+            session=session,
+            account=account_db,
+            type=ledger_in.type,
+            ledger=ledger_in,
+        )
+        process_transaction(ctx, commit=False)
+
+        ledger_db = crud.ledger.create(session, ledger_in, account_db, commit=False)
+        record_checkpoint_if_due(session, account_db, ledger_db, commit=False)
+        session.commit()
+        session.refresh(ledger_db)
+        return ledger_db
+
+    ledger_db = run_account_write(session, account_db, write)
     return ResponseSingle(data=ledger_db, message=Messages.Ledger.CREATED)
 
 
@@ -87,8 +135,10 @@ def delete_ledger_item(
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(ledger_db.account_id, account_db.id)
 
-    reprocess_transactions_excluding(session, account_db, exclude=[ledger_db.id])
+    def write():
+        reprocess_transactions_excluding(session, account_db, exclude=[ledger_db.id])
+        crud.ledger.delete(session, ledger_db)
 
-    crud.ledger.delete(session, ledger_db)
+    run_account_write(session, account_db, write)
 
     return ResponseSingle(message=Messages.Ledger.DELETED)
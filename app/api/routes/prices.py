@@ -0,0 +1,29 @@
+from fastapi import APIRouter, status
+
+from app.api.dependencies import (
+    ImportRowsDepAnnotated,
+    IsAdminDep,
+    SessionDepAnnotated,
+)
+from app.constants.messages import Messages
+from app.core.config import settings
+from app.models.generic import ResponseSingle
+from app.models.prices import PriceImportResult
+from app.services.valuation import import_prices
+
+router = APIRouter(
+    prefix=f"/{settings.PRICES_ROUTE_STR}", tags=[settings.PRICES_ROUTE_STR]
+)
+
+
+@router.post(
+    "/history",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseSingle[PriceImportResult],
+    dependencies=[IsAdminDep],
+)
+def import_price_history(session: SessionDepAnnotated, rows: ImportRowsDepAnnotated):
+    """Store daily closes from a JSON array or a CSV file (`Content-Type:
+    text/csv`) of `symbol`, `date` and `close` rows."""
+    result = import_prices(session, rows)
+    return ResponseSingle(data=result, message=Messages.Price.IMPORTED)
@@ -1,11 +1,18 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, status
 
 from app import crud
 from app.api.dependencies import (
+    AsyncSessionDepAnnotated,
+    CurrentUserAsyncDepAnnotated,
     CurrentUserDepAnnotated,
+    PageParamsDepAnnotated,
     SessionDepAnnotated,
     get_account_or_404,
+    get_account_or_404_async,
     get_security_or_404,
+    get_security_or_404_async,
 )
 from app.api.utils import verify_ownership_or_403
 from app.constants.messages import Messages
@@ -15,6 +22,7 @@ from app.models.generic import Meta, ResponseMultiple, ResponseSingle
 from app.models.securities import Security, SecurityCreate, SecurityRead, SecurityUpdate
 from app.services.allocation import validate_target_allocation
 from app.services.securities import create_security_with_info
+from app.services.transactions import run_account_write
 
 router = APIRouter(
     prefix=f"/{settings.ACCOUNTS_ROUTE_STR}/{{account_id}}/{settings.SECURITIES_ROUTE_STR}",
@@ -23,21 +31,33 @@ router = APIRouter(
 
 
 @router.get("/", response_model=ResponseMultiple[SecurityRead])
-def read_security_list(
-    current_user: CurrentUserDepAnnotated,
-    account_db: Account = Depends(get_account_or_404),
+async def read_security_list(
+    session: AsyncSessionDepAnnotated,
+    current_user: CurrentUserAsyncDepAnnotated,
+    page: PageParamsDepAnnotated,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    account_db: Account = Depends(get_account_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    result = await crud.securities.get_page_for_account_async(
+        session, account_db, page, since, until
+    )
     return ResponseMultiple(
-        data=account_db.securities, meta=Meta(count=len(account_db.securities))
+        data=result.items,
+        meta=Meta(
+            count=result.count,
+            next_cursor=result.next_cursor,
+            prev_cursor=result.prev_cursor,
+        ),
     )
 
 
 @router.get("/{security_id}", response_model=ResponseSingle[SecurityRead])
-def read_security_detail(
-    current_user: CurrentUserDepAnnotated,
-    account_db: Account = Depends(get_account_or_404),
-    security_db: Security = Depends(get_security_or_404),
+async def read_security_detail(
+    current_user: CurrentUserAsyncDepAnnotated,
+    account_db: Account = Depends(get_account_or_404_async),
+    security_db: Security = Depends(get_security_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(security_db.account_id, account_db.id)
@@ -56,8 +76,12 @@ def create_security(
     account_db: Account = Depends(get_account_or_404),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
-    validate_target_allocation(account_db, security_in.target_allocation)
-    security_db = create_security_with_info(session, security_in, account_db)
+
+    def write():
+        validate_target_allocation(account_db, security_in.target_allocation)
+        return create_security_with_info(session, security_in, account_db)
+
+    security_db = run_account_write(session, account_db, write)
     return ResponseSingle(data=security_db, message=Messages.Security.CREATED)
 
 
@@ -71,11 +95,17 @@ def update_security(
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(security_db.account_id, account_db.id)
-    if security_in.target_allocation is not None:
-        validate_target_allocation(
-            account_db, security_in.target_allocation, exclude=[security_db.id]
-        )
-    crud.securities.update(session, security_db, security_in)
+
+    def write():
+        if security_in.target_allocation is not None:
+            validate_target_allocation(
+                account_db,
+                security_in.target_allocation,
+                replaced=security_db.target_allocation,
+            )
+        crud.securities.update(session, security_db, security_in)
+
+    run_account_write(session, account_db, write)
     return ResponseSingle(data=security_db, message=Messages.Security.UPDATED)
 
 
@@ -88,5 +118,11 @@ def delete_security(
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(security_db.account_id, account_db.id)
-    crud.securities.delete(session, security_db)
+
+    def write():
+        crud.securities.delete(session, security_db)
+        # Checkpoints still include the trades of the removed security
+        crud.checkpoints.delete_all_for_account(session, account_db)
+
+    run_account_write(session, account_db, write)
     return ResponseSingle(message=Messages.Security.DELETED)
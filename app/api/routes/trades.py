@@ -1,23 +1,35 @@
-from fastapi import APIRouter, Depends, status
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 
 from app import crud
 from app.api.dependencies import (
+    AsyncSessionDepAnnotated,
+    CurrentUserAsyncDepAnnotated,
     CurrentUserDepAnnotated,
+    PageParamsDepAnnotated,
     SessionDepAnnotated,
     get_account_or_404,
+    get_account_or_404_async,
     get_security_or_404,
     get_trade_or_404,
+    get_trade_or_404_async,
 )
 from app.api.utils import verify_ownership_or_403
 from app.constants.messages import Messages
 from app.core.config import settings
 from app.models.accounts import Account
 from app.models.contexts import TradeTransactionContext
-from app.models.generic import Meta, ResponseMultiple, ResponseSingle
-from app.models.trades import Trade, TradeCreate, TradeRead
+from app.models.generic import ExportFormat, Meta, ResponseMultiple, ResponseSingle
+from app.models.trades import Trade, TradeCreate, TradeRead, TradeType
+from app.services.exports import MEDIA_TYPES, export_trades
 from app.services.transactions import (
     process_transaction,
+    record_checkpoint_if_due,
     reprocess_transactions_excluding,
+    run_account_write,
 )
 
 router = APIRouter(
@@ -27,27 +39,57 @@ router = APIRouter(
 
 
 @router.get("/", response_model=ResponseMultiple[TradeRead])
-def read_trade_list(
+async def read_trade_list(
+    session: AsyncSessionDepAnnotated,
+    current_user: CurrentUserAsyncDepAnnotated,
+    page: PageParamsDepAnnotated,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: TradeType | None = Query(default=None, alias="type"),
+    security_id: UUID | None = None,
+    account_db: Account = Depends(get_account_or_404_async),
+):
+    verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
+    result = await crud.trades.get_page_for_account_async(
+        session, account_db, page, since, until, type_, security_id
+    )
+    trades = [
+        TradeRead.model_validate(t, update={"security_symbol": symbol or ""})
+        for t, symbol in result.items
+    ]
+
+    return ResponseMultiple(
+        data=trades,
+        meta=Meta(
+            count=result.count,
+            next_cursor=result.next_cursor,
+            prev_cursor=result.prev_cursor,
+        ),
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_trade_list(
     session: SessionDepAnnotated,
     current_user: CurrentUserDepAnnotated,
+    format: ExportFormat = ExportFormat.NDJSON,
     account_db: Account = Depends(get_account_or_404),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
-    trades = []
-    for t in account_db.trades:
-        t = TradeRead.model_validate(t)
-        sec = crud.securities.get_one(session, t.security_id)
-        t.security_symbol = sec.symbol if sec else ""
-        trades.append(t)
-
-    return ResponseMultiple(data=trades, meta=Meta(count=len(account_db.trades)))
+    return StreamingResponse(
+        export_trades(session.get_bind(), account_db.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="trades-{account_db.id}.{format.value}"'
+        },
+    )
 
 
 @router.get("/{trade_id}", response_model=ResponseSingle[TradeRead])
-def read_trade_detail(
-    current_user: CurrentUserDepAnnotated,
-    account_db: Account = Depends(get_account_or_404),
-    trade_db: Trade = Depends(get_trade_or_404),
+async def read_trade_detail(
+    current_user: CurrentUserAsyncDepAnnotated,
+    account_db: Account = Depends(get_account_or_404_async),
+    trade_db: Trade = Depends(get_trade_or_404_async),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(trade_db.account_id, account_db.id)
@@ -66,20 +108,30 @@ def create_trade(
     account_db: Account = Depends(get_account_or_404),
 ):
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
-    security_db = get_security_or_404(session, trade_in.security_id)
-    verify_ownership_or_403(security_db.account_id, account_db.id)
-
-    ctx = TradeTransactionContext(
-        session=session,
-        account=account_db,
-        security=security_db,
-        trade=trade_in,
-        type=trade_in.type,
-    )
-    process_transaction(ctx)
-
-    trade_db = crud.trades.create(session, trade_in, account_db)
 
+    def write():
+        security_db = get_security_or_404(session, trade_in.security_id)
+        verify_ownership_or_403(security_db.account_id, account_db.id)
+
+        ctx = TradeTransactionContext(
+            session=session,
+            account=account_db,
+            security=security_db,
+            trade=trade_in,
+            type=trade_in.type,
+            trade_id=uuid4(),
+        )
+        process_transaction(ctx, commit=False)
+
+        trade_db = crud.trades.create(
+            session, trade_in, account_db, id=ctx.trade_id, commit=False
+        )
+        record_checkpoint_if_due(session, account_db, trade_db, commit=False)
+        session.commit()
+        session.refresh(trade_db)
+        return trade_db
+
+    trade_db = run_account_write(session, account_db, write)
     return ResponseSingle(data=trade_db, message=Messages.Trade.CREATED)
 
 
@@ -93,8 +145,10 @@ def delete_trade(
     verify_ownership_or_403(account_db.user_id, current_user.id, current_user.is_admin)
     verify_ownership_or_403(trade_db.account_id, account_db.id)
 
-    reprocess_transactions_excluding(session, account_db, exclude=[trade_db.id])
+    def write():
+        reprocess_transactions_excluding(session, account_db, exclude=[trade_db.id])
+        crud.trades.delete(session, trade_db)
 
-    crud.trades.delete(session, trade_db)
+    run_account_write(session, account_db, write)
 
     return ResponseSingle(message=Messages.Trade.DELETED)
@@ -1,23 +1,25 @@
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-import bcrypt
 import jwt
 from fastapi import HTTPException, status
 
 from app.constants.messages import Messages
 from app.core.config import settings
+from app.core.password_hasher import password_hasher
 from app.models.generic import DetailItem
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-    )
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await password_hasher.verify_async(plain_password, hashed_password)
 
 
 def get_password_hash(password: str):
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -14,6 +14,7 @@ class Messages:
     class Auth:
         INVALID_CREDENTIALS = "Incorrect username or password."
         FORBIDDEN = "Permission denied for this action."
+        BUSY = "Too many password operations are pending. Try again later."
 
     class Password:
         INVALID = "The password does not meet the required criteria."
@@ -28,11 +29,25 @@ class Messages:
     class General:
         INTERNAL_ERROR = "An unexpected error occurred. Please try again later."
 
+    class Pagination:
+        INVALID_CURSOR = "Invalid pagination cursor."
+
     class Account:
         CREATED = "Account created successfully."
         UPDATED = "Account updated successfully."
         DELETED = "Account deleted successfully."
         NOT_FOUND = "Account not found."
+        WRITE_CONFLICT = "The account was changed by another request. Please try again."
+
+        @staticmethod
+        def changing_cost_basis_method(method: str):
+            return f"Recomputing cost basis with method '{method}'..."
+
+        @staticmethod
+        def retrying_write(attempt: int):
+            return (
+                f"Account changed by another request, retrying (attempt {attempt})..."
+            )
 
     class Security:
         CREATED = "Security added successfully."
@@ -40,9 +55,23 @@ class Messages:
         DELETED = "Security removed successfully."
         FETCHING = "Retrieving securities data..."
         NOT_FOUND = "Security not found."
+        REFRESHING_PRICES = "Refreshing latest prices..."
+
+        @staticmethod
+        def prices_refreshed(count: int):
+            return f"Latest prices refreshed for {count} symbols."
 
     class External:
         COULD_NOT_FETCH = "Unable to retrieve data from external provider."
+        SYMBOL_NOT_FOUND = "Symbol not found."
+
+        @staticmethod
+        def timed_out(seconds: float):
+            return f"Timed out after {seconds} seconds."
+
+        @staticmethod
+        def fetch_attempt_failed(symbol: str, attempt: int, error: str):
+            return f"Attempt {attempt} to fetch '{symbol}' failed: {error}"
 
         @staticmethod
         def could_not_fetch_symbols(symbols: str | list):
@@ -60,9 +89,31 @@ class Messages:
         DELETED = "Ledger entry removed successfully."
         NOT_FOUND = "Ledger entry not found."
 
+    class Import:
+        COMPLETED = "Transactions imported successfully."
+        IMPORTED = "Import completed successfully."
+        INVALID_FILE = "The import file could not be read."
+        BEFORE_LATEST_TRANSACTION = (
+            "Imported transactions must not precede the account's latest transaction."
+        )
+
+        @staticmethod
+        def importing(count: int):
+            return f"Importing {count} transactions..."
+
+    class Price:
+        IMPORTED = "Price history imported successfully."
+
+        @staticmethod
+        def importing(count: int):
+            return f"Importing {count} daily prices..."
+
     class Allocation:
         CREATING = "Generating allocation plan..."
         CREATED = "Allocation plan generated successfully."
+        CREATED_WITH_STALE_PRICES = "Allocation plan generated using the last known prices of securities that could not be updated."
+        REBALANCING = "Optimizing rebalancing trades..."
+        REBALANCED = "Rebalancing trades optimized successfully."
 
         class Validation:
             MAX_TARGET_ALLOCATION = "The total target allocation must not exceed 100%."
@@ -80,6 +131,10 @@ class Messages:
         def processing(type: str):
             return f"Processing {type} transaction..."
 
+        @staticmethod
+        def reprocessing_from_checkpoint(transaction_count: int):
+            return f"Resuming from checkpoint after {transaction_count} transactions..."
+
         class Validation:
             WITHDRAWN_AMOUNT_CANNOT_BE_GREATER_THAN_BUYING_POWER = (
                 "Withdrawn amount exceeds available buying power."
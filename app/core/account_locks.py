@@ -0,0 +1,43 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from uuid import UUID
+from weakref import WeakValueDictionary
+
+
+class AccountLocks:
+    """A lock per account, so that writes to an account from the threads of
+    this process run one at a time while writes to other accounts run in
+    parallel. Locks are dropped once no thread holds or waits for them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks: WeakValueDictionary[UUID, threading.Lock] = WeakValueDictionary()
+
+    def _get(self, account_id: UUID) -> threading.Lock:
+        with self.lock:
+            lock = self.locks.get(account_id)
+            if lock is None:
+                lock = self.locks[account_id] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def hold(self, account_id: UUID) -> Iterator[bool]:
+        """Hold the account's lock, yielding whether another thread held it
+        first, in which case the account was probably changed meanwhile."""
+        lock = self._get(account_id)
+        waited = not lock.acquire(blocking=False)
+        if waited:
+            lock.acquire()
+        try:
+            yield waited
+        finally:
+            lock.release()
+
+    def clear(self):
+        with self.lock:
+            self.locks.clear()
+
+
+account_locks = AccountLocks()
@@ -3,13 +3,41 @@ import os
 from pydantic_settings import BaseSettings
 
 
+def _optional_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _optional_bool(name: str) -> bool | None:
+    value = os.getenv(name)
+    return value.lower() == "true" if value else None
+
+
 class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv(
         "SECRET_KEY", "a89fdb83be9832133abca00a6420cfd5448e194449a272ed2d8a3f938254aecc"
     )
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./local.db")
+    # Database of the async routes; DATABASE_URL with its backend's async driver
+    # if unset
+    ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
     TEST_DATABASE_URL: str = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+    # Engine defaults for a production "sqlite" or "postgresql" deployment, or
+    # SQLAlchemy's own if unset. Each setting below overrides its profile value
+    DATABASE_PROFILE: str | None = os.getenv("DATABASE_PROFILE")
+    DATABASE_POOL_SIZE: int | None = _optional_int("DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW: int | None = _optional_int("DATABASE_MAX_OVERFLOW")
+    DATABASE_POOL_TIMEOUT: int | None = _optional_int("DATABASE_POOL_TIMEOUT")
+    # Seconds after which connections are replaced
+    DATABASE_POOL_RECYCLE: int | None = _optional_int("DATABASE_POOL_RECYCLE")
+    DATABASE_POOL_PRE_PING: bool | None = _optional_bool("DATABASE_POOL_PRE_PING")
+    # PRAGMAs set on every SQLite connection; busy timeout in milliseconds and
+    # mmap size in bytes
+    SQLITE_JOURNAL_MODE: str | None = os.getenv("SQLITE_JOURNAL_MODE")
+    SQLITE_SYNCHRONOUS: str | None = os.getenv("SQLITE_SYNCHRONOUS")
+    SQLITE_BUSY_TIMEOUT: int | None = _optional_int("SQLITE_BUSY_TIMEOUT")
+    SQLITE_MMAP_SIZE: int | None = _optional_int("SQLITE_MMAP_SIZE")
 
     FIRST_SUPERUSER_USERNAME: str = os.getenv("FIRST_SUPERUSER_USERNAME", "admin")
     FIRST_SUPERUSER_PASSWORD: str = os.getenv("FIRST_SUPERUSER_PASSWORD", "Admin12@")
@@ -28,8 +56,62 @@ class Settings(BaseSettings):
     SECURITIES_ROUTE_STR: str = os.getenv("SECURITIES_ROUTE_STR", "securities")
     TRADES_ROUTE_STR: str = os.getenv("TRADES_ROUTE_STR", "trades")
     LEDGER_ROUTE_STR: str = os.getenv("LEDGER_ROUTE_STR", "ledger")
+    PRICES_ROUTE_STR: str = os.getenv("PRICES_ROUTE_STR", "prices")
+
+    DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Seconds a quote is served from the cache before it is fetched again
+    QUOTE_CACHE_TTL: int = int(os.getenv("QUOTE_CACHE_TTL", 300))
+    QUOTE_CACHE_MAX_SIZE: int = int(os.getenv("QUOTE_CACHE_MAX_SIZE", 4096))
+    # SQLite file backing the cache across restarts; in memory only if unset
+    QUOTE_CACHE_PATH: str | None = os.getenv("QUOTE_CACHE_PATH")
+    QUOTE_CACHE_STALE_WHILE_REVALIDATE: bool = (
+        os.getenv("QUOTE_CACHE_STALE_WHILE_REVALIDATE", "false").lower() == "true"
+    )
+
+    # Refresh the latest price of all securities in the background, instead of
+    # fetching prices while allocation plans are requested
+    PRICE_REFRESH_ENABLED: bool = (
+        os.getenv("PRICE_REFRESH_ENABLED", "false").lower() == "true"
+    )
+    PRICE_REFRESH_INTERVAL: int = int(os.getenv("PRICE_REFRESH_INTERVAL", 900))
+    PRICE_REFRESH_BATCH_SIZE: int = int(os.getenv("PRICE_REFRESH_BATCH_SIZE", 50))
+
+    # Quotes fetched at the same time from the market data provider
+    MARKET_DATA_MAX_CONCURRENCY: int = int(os.getenv("MARKET_DATA_MAX_CONCURRENCY", 8))
+    # Seconds allowed for each quote, and retries with exponential backoff
+    # starting at MARKET_DATA_BACKOFF seconds
+    MARKET_DATA_TIMEOUT: float = float(os.getenv("MARKET_DATA_TIMEOUT", 10))
+    MARKET_DATA_RETRIES: int = int(os.getenv("MARKET_DATA_RETRIES", 2))
+    MARKET_DATA_BACKOFF: float = float(os.getenv("MARKET_DATA_BACKOFF", 0.5))
+
+    # Performance results kept per process, across accounts and date ranges
+    PERFORMANCE_CACHE_MAX_SIZE: int = int(os.getenv("PERFORMANCE_CACHE_MAX_SIZE", 1024))
+
+    # Seconds an authenticated user is served from the per-process cache
+    # instead of being looked up again; 0 disables the cache
+    USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", 60))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", 4096))
+
+    # bcrypt cost factor of new password hashes; existing hashes keep theirs
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))
+    # Threads hashing and verifying passwords, and operations that may wait for
+    # one before new ones are rejected
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
 
     USERNAME_MAX_LENGTH: int = int(os.getenv("USERNAME_MAX_LENGTH", 30))
 
+    TRANSACTION_CHECKPOINT_INTERVAL: int = int(
+        os.getenv("TRANSACTION_CHECKPOINT_INTERVAL", 100)
+    )
+    # Times a write is retried when another request changed the account first,
+    # waiting up to ACCOUNT_WRITE_BACKOFF seconds, doubled at each attempt
+    ACCOUNT_WRITE_RETRIES: int = int(os.getenv("ACCOUNT_WRITE_RETRIES", 5))
+    ACCOUNT_WRITE_BACKOFF: float = float(os.getenv("ACCOUNT_WRITE_BACKOFF", 0.01))
+
 
 settings = Settings()
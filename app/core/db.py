@@ -1,12 +1,166 @@
+from dataclasses import dataclass, replace
+from functools import partial
+
+from sqlalchemy import Engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from alembic import command
 from alembic.config import Config
 from app import crud
-from app.core.config import settings
+from app.core.config import Settings, settings
 from app.models.users import User, UserCreate
 
-engine = create_engine(settings.DATABASE_URL)
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Pool and SQLite options of the engine; None keeps SQLAlchemy's or
+    SQLite's own default."""
+
+    pool_size: int | None = None
+    max_overflow: int | None = None
+    pool_timeout: int | None = None
+    pool_recycle: int | None = None
+    pool_pre_ping: bool | None = None
+    sqlite_journal_mode: str | None = None
+    sqlite_synchronous: str | None = None
+    sqlite_busy_timeout: int | None = None
+    sqlite_mmap_size: int | None = None
+
+
+ENGINE_PROFILES = {
+    # WAL lets reads run alongside the single writer, and NORMAL only syncs at
+    # checkpoints, which is still safe from corruption in WAL mode. Writers
+    # wait for the lock instead of failing with "database is locked"
+    "sqlite": EngineProfile(
+        pool_size=8,
+        max_overflow=16,
+        pool_timeout=30,
+        sqlite_journal_mode="WAL",
+        sqlite_synchronous="NORMAL",
+        sqlite_busy_timeout=5000,
+        sqlite_mmap_size=256 * 1024 * 1024,
+    ),
+    # Connections are checked before use and replaced before server or proxy
+    # idle timeouts close them
+    "postgresql": EngineProfile(
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    ),
+}
+
+# Settings overriding each option of the profile
+PROFILE_SETTINGS = {
+    "pool_size": "DATABASE_POOL_SIZE",
+    "max_overflow": "DATABASE_MAX_OVERFLOW",
+    "pool_timeout": "DATABASE_POOL_TIMEOUT",
+    "pool_recycle": "DATABASE_POOL_RECYCLE",
+    "pool_pre_ping": "DATABASE_POOL_PRE_PING",
+    "sqlite_journal_mode": "SQLITE_JOURNAL_MODE",
+    "sqlite_synchronous": "SQLITE_SYNCHRONOUS",
+    "sqlite_busy_timeout": "SQLITE_BUSY_TIMEOUT",
+    "sqlite_mmap_size": "SQLITE_MMAP_SIZE",
+}
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle")
+SQLITE_PRAGMAS = {
+    "journal_mode": "sqlite_journal_mode",
+    "synchronous": "sqlite_synchronous",
+    "busy_timeout": "sqlite_busy_timeout",
+    "mmap_size": "sqlite_mmap_size",
+}
+
+
+def get_engine_profile(settings: Settings) -> EngineProfile:
+    """The profile named by DATABASE_PROFILE with the options set explicitly in
+    the settings applied over it."""
+    profile = EngineProfile()
+    if settings.DATABASE_PROFILE:
+        if settings.DATABASE_PROFILE not in ENGINE_PROFILES:
+            raise ValueError(
+                f"Unknown DATABASE_PROFILE {settings.DATABASE_PROFILE!r}, "
+                f"expected one of {', '.join(ENGINE_PROFILES)}"
+            )
+        profile = ENGINE_PROFILES[settings.DATABASE_PROFILE]
+    overrides = {
+        option: getattr(settings, name) for option, name in PROFILE_SETTINGS.items()
+    }
+    return replace(
+        profile, **{option: v for option, v in overrides.items() if v is not None}
+    )
+
+
+def _set_sqlite_pragmas(pragmas: dict, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def _engine_options(url: str, profile: EngineProfile) -> tuple[dict, dict]:
+    """Keyword arguments of `create_engine` and PRAGMAs of SQLite connections."""
+    database_url = make_url(url)
+    is_sqlite = database_url.get_backend_name() == "sqlite"
+    # In-memory SQLite databases live in a single connection, without a pool
+    in_memory = is_sqlite and database_url.database in (None, "", ":memory:")
+
+    options = {}
+    if not in_memory:
+        options = {
+            name: getattr(profile, name)
+            for name in POOL_OPTIONS
+            if getattr(profile, name) is not None
+        }
+    if profile.pool_pre_ping is not None:
+        options["pool_pre_ping"] = profile.pool_pre_ping
+
+    pragmas = {}
+    if is_sqlite:
+        pragmas = {
+            pragma: getattr(profile, name)
+            for pragma, name in SQLITE_PRAGMAS.items()
+            if getattr(profile, name) is not None
+        }
+    return options, pragmas
+
+
+def create_db_engine(url: str, profile: EngineProfile) -> Engine:
+    options, pragmas = _engine_options(url, profile)
+    engine = create_engine(url, **options)
+    if pragmas:
+        event.listen(engine, "connect", partial(_set_sqlite_pragmas, pragmas))
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """`url` with the async driver of its backend, e.g. aiosqlite for SQLite."""
+    database_url = make_url(url)
+    backend = database_url.get_backend_name()
+    if database_url.get_driver_name() == ASYNC_DRIVERS.get(backend):
+        return url
+    return database_url.set(
+        drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"
+    ).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str, profile: EngineProfile) -> AsyncEngine:
+    options, pragmas = _engine_options(url, profile)
+    engine = create_async_engine(url, **options)
+    if pragmas:
+        event.listen(
+            engine.sync_engine, "connect", partial(_set_sqlite_pragmas, pragmas)
+        )
+    return engine
+
+
+engine = create_db_engine(settings.DATABASE_URL, get_engine_profile(settings))
+async_engine = create_async_db_engine(
+    settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL),
+    get_engine_profile(settings),
+)
 
 
 def run_migrations() -> None:
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import bcrypt
+
+from app.constants.messages import Messages
+from app.core.config import settings
+from app.core.logging_config import logger
+
+
+@dataclass
+class PasswordHasherStats:
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    # Operations waiting for a worker and being run right now
+    queued: int = 0
+    running: int = 0
+    max_queued: int = 0
+    # Total seconds operations waited for a worker
+    wait_seconds: float = 0.0
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on `workers` dedicated threads, so that a burst of logins
+    takes at most that many cores and none of the threads serving other
+    requests. At most `max_pending` operations wait for a worker; more are
+    rejected with `PasswordHasherBusy`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        rounds: int,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.clock = clock
+        self.stats = PasswordHasherStats()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        with self.lock:
+            if self.stats.queued >= self.max_pending:
+                self.stats.rejected += 1
+                logger.warning(Messages.Auth.BUSY)
+                raise PasswordHasherBusy()
+            self.stats.submitted += 1
+            self.stats.queued += 1
+            self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        submitted_at = self.clock()
+
+        def run():
+            with self.lock:
+                self.stats.queued -= 1
+                self.stats.running += 1
+                self.stats.wait_seconds += self.clock() - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.stats.running -= 1
+                    self.stats.completed += 1
+
+        return self.executor.submit(run)
+
+    def _hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+    def hash(self, password: str) -> str:
+        return self.submit(self._hash, password).result()
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self.submit(self._verify, password, password_hash).result()
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        """`verify` without holding a thread of the caller while it waits."""
+        return await asyncio.wrap_future(
+            self.submit(self._verify, password, password_hash)
+        )
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = PasswordHasherStats(
+                queued=self.stats.queued, running=self.stats.running
+            )
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+)
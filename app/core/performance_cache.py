@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from itertools import chain
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.ledger import Ledger
+from app.models.trades import Trade
+
+_CHANGED_ACCOUNTS = "performance_cache_changed_accounts"
+
+
+class PerformanceCache:
+    """Performance results by account and key, kept in an LRU of `max_size`
+    entries and dropped as soon as a trade or ledger entry of the account is
+    committed."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple[UUID, Hashable], Any] = OrderedDict()
+        self.keys: dict[UUID, set[Hashable]] = {}
+
+    def _drop(self, account_id: UUID, key: Hashable):
+        self.entries.pop((account_id, key))
+        keys = self.keys.get(account_id, set())
+        keys.discard(key)
+        if not keys:
+            self.keys.pop(account_id, None)
+
+    def get(self, account_id: UUID, key: Hashable) -> Any | None:
+        with self.lock:
+            value = self.entries.get((account_id, key))
+            if value is not None:
+                self.entries.move_to_end((account_id, key))
+            return value
+
+    def set(self, account_id: UUID, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[(account_id, key)] = value
+            self.entries.move_to_end((account_id, key))
+            self.keys.setdefault(account_id, set()).add(key)
+            while len(self.entries) > self.max_size:
+                self._drop(*next(iter(self.entries)))
+
+    def invalidate(self, account_ids: Iterable[UUID]):
+        with self.lock:
+            for account_id in account_ids:
+                for key in self.keys.pop(account_id, ()):
+                    self.entries.pop((account_id, key), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys.clear()
+
+
+performance_cache = PerformanceCache(max_size=settings.PERFORMANCE_CACHE_MAX_SIZE)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_accounts(session, flush_context):
+    changed = session.info.setdefault(_CHANGED_ACCOUNTS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Trade, Ledger)):
+            changed.add(obj.account_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_accounts(session):
+    performance_cache.invalidate(session.info.pop(_CHANGED_ACCOUNTS, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_accounts(session):
+    session.info.pop(_CHANGED_ACCOUNTS, None)
@@ -0,0 +1,200 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.constants.messages import Messages
+from app.core.config import settings
+from app.core.logging_config import logger
+
+Fetch = Callable[[list[str]], dict[str, dict]]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale_hits: int = 0
+    evictions: int = 0
+    refreshes: int = 0
+
+
+@dataclass
+class CachedQuote:
+    data: dict
+    fetched_at: float
+
+
+class SQLiteQuoteStore:
+    """Disk tier of the quote cache, so quotes survive restarts."""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS quotes "
+                "(symbol TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get_many(self, symbols: list[str]) -> dict[str, CachedQuote]:
+        if not symbols:
+            return {}
+        placeholders = ", ".join("?" * len(symbols))
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT symbol, data, fetched_at FROM quotes "
+                f"WHERE symbol IN ({placeholders})",
+                symbols,
+            ).fetchall()
+        return {s: CachedQuote(json.loads(data), at) for s, data, at in rows}
+
+    def set_many(self, quotes: dict[str, CachedQuote]):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO quotes (symbol, data, fetched_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (s, json.dumps(q.data, default=str), q.fetched_at)
+                    for s, q in quotes.items()
+                ],
+            )
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM quotes")
+
+
+def _start_thread(target: Callable[[], None]):
+    threading.Thread(target=target, daemon=True).start()
+
+
+class QuoteCache:
+    """Quotes by symbol, kept for `ttl` seconds in an LRU of `max_size` entries.
+
+    Symbols missing from memory are looked up in the optional disk `store`, and
+    the remaining ones are fetched together in a single call. With
+    `stale_while_revalidate`, expired quotes are returned as they are and
+    refreshed in the background.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int,
+        store: SQLiteQuoteStore | None = None,
+        stale_while_revalidate: bool = False,
+        clock: Callable[[], float] = time.time,
+        run_in_background: Callable[[Callable[[], None]], None] = _start_thread,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.store = store
+        self.stale_while_revalidate = stale_while_revalidate
+        self.clock = clock
+        self.run_in_background = run_in_background
+        self.stats = CacheStats()
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, CachedQuote] = OrderedDict()
+        self.refreshing: set[str] = set()
+
+    def _is_fresh(self, quote: CachedQuote) -> bool:
+        return self.clock() - quote.fetched_at < self.ttl
+
+    def _remember(self, quotes: dict[str, CachedQuote]):
+        with self.lock:
+            for symbol, quote in quotes.items():
+                self.entries[symbol] = quote
+                self.entries.move_to_end(symbol)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _fetch(self, symbols: list[str], fetch: Fetch) -> dict[str, CachedQuote]:
+        fetched_at = self.clock()
+        quotes = {
+            symbol: CachedQuote(data, fetched_at)
+            for symbol, data in fetch(symbols).items()
+            if data
+        }
+        self._remember(quotes)
+        if self.store is not None:
+            self.store.set_many(quotes)
+        return quotes
+
+    def _revalidate(self, symbols: list[str], fetch: Fetch):
+        with self.lock:
+            symbols = [s for s in symbols if s not in self.refreshing]
+            self.refreshing.update(symbols)
+        if not symbols:
+            return
+
+        def refresh():
+            try:
+                self._fetch(symbols, fetch)
+                with self.lock:
+                    self.stats.refreshes += 1
+            except Exception:
+                logger.exception(Messages.External.COULD_NOT_FETCH)
+            finally:
+                with self.lock:
+                    self.refreshing.difference_update(symbols)
+
+        self.run_in_background(refresh)
+
+    def get_many(self, symbols: list[str], fetch: Fetch) -> dict[str, dict]:
+        """Quote data of each symbol that is cached or could be fetched."""
+        found: dict[str, CachedQuote] = {}
+        with self.lock:
+            for symbol in symbols:
+                if symbol in self.entries:
+                    self.entries.move_to_end(symbol)
+                    found[symbol] = self.entries[symbol]
+
+        missing = [s for s in symbols if s not in found]
+        if missing and self.store is not None:
+            stored = self.store.get_many(missing)
+            self._remember(stored)
+            found.update(stored)
+
+        out: dict[str, dict] = {}
+        stale: list[str] = []
+        with self.lock:
+            for symbol, quote in found.items():
+                if self._is_fresh(quote):
+                    self.stats.hits += 1
+                    out[symbol] = quote.data
+                elif self.stale_while_revalidate:
+                    self.stats.stale_hits += 1
+                    out[symbol] = quote.data
+                    stale.append(symbol)
+
+            to_fetch = [s for s in symbols if s not in out]
+            self.stats.misses += len(to_fetch)
+        if to_fetch:
+            out.update({s: q.data for s, q in self._fetch(to_fetch, fetch).items()})
+        if stale:
+            self._revalidate(stale, fetch)
+        return out
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats = CacheStats()
+        if self.store is not None:
+            self.store.clear()
+
+
+quote_cache = QuoteCache(
+    ttl=settings.QUOTE_CACHE_TTL,
+    max_size=settings.QUOTE_CACHE_MAX_SIZE,
+    store=(
+        SQLiteQuoteStore(settings.QUOTE_CACHE_PATH)
+        if settings.QUOTE_CACHE_PATH
+        else None
+    ),
+    stale_while_revalidate=settings.QUOTE_CACHE_STALE_WHILE_REVALIDATE,
+)
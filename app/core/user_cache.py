@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.users import User
+
+
+@dataclass
+class CachedUser:
+    user: User
+    expires_at: float
+
+
+def detached_copy(user: User) -> User:
+    """Copy of the user's columns that is not bound to any session, so it can be
+    shared between requests and merged into each request's session without a
+    query. Relationships such as `accounts` are lazy loaded after the merge."""
+    copy = User(**{name: getattr(user, name) for name in User.model_fields})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class UserCache:
+    """Authenticated users by access token, kept for `ttl` seconds in an LRU of
+    `max_size` entries, or until the token expires if that is sooner, and
+    dropped when the user is changed through `crud.users`.
+
+    The cache is per process, so changes made by other processes are only seen
+    once entries expire.
+    """
+
+    def __init__(
+        self, ttl: float, max_size: int, clock: Callable[[], float] = time.time
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, CachedUser] = OrderedDict()
+        self.tokens: dict[UUID, set[str]] = {}
+
+    def _drop(self, token: str):
+        entry = self.entries.pop(token)
+        tokens = self.tokens.get(entry.user.id, set())
+        tokens.discard(token)
+        if not tokens:
+            self.tokens.pop(entry.user.id, None)
+
+    def get(self, token: str) -> User | None:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            if self.clock() >= entry.expires_at:
+                self._drop(token)
+                return None
+            self.entries.move_to_end(token)
+            return entry.user
+
+    def set(self, token: str, user: User, token_expires_at: float | None = None):
+        expires_at = self.clock() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        if self.ttl <= 0 or expires_at <= self.clock():
+            return
+        entry = CachedUser(detached_copy(user), expires_at)
+        with self.lock:
+            if token in self.entries:
+                self._drop(token)
+            self.entries[token] = entry
+            self.tokens.setdefault(user.id, set()).add(token)
+            while len(self.entries) > self.max_size:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, user_id: UUID):
+        with self.lock:
+            for token in self.tokens.pop(user_id, set()):
+                self.entries.pop(token, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tokens.clear()
+
+
+user_cache = UserCache(
+    ttl=settings.USER_CACHE_TTL, max_size=settings.USER_CACHE_MAX_SIZE
+)
@@ -1,4 +1,28 @@
-from . import accounts, ledger, securities, trades, users
+from . import (
+    accounts,
+    checkpoints,
+    instruments,
+    ledger,
+    lots,
+    prices,
+    realized_gains,
+    securities,
+    snapshots,
+    trades,
+    users,
+)
 from .generic import *
 
-__all__ = ["accounts", "ledger", "securities", "trades", "users"]
+__all__ = [
+    "accounts",
+    "checkpoints",
+    "instruments",
+    "ledger",
+    "lots",
+    "prices",
+    "realized_gains",
+    "securities",
+    "snapshots",
+    "trades",
+    "users",
+]
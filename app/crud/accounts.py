@@ -1,16 +1,57 @@
+from datetime import datetime
+
 from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, col, select
+from sqlmodel import update as update_statement
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.crud.pagination import PageParams, paginate, paginate_async
 from app.models.accounts import Account, AccountCreate, AccountUpdate
+from app.models.instruments import Instrument
+from app.models.securities import Security
 from app.models.users import User
+from app.utils import to_naive_utc
+
+
+def _page_statement(user: User | None, since: datetime | None, until: datetime | None):
+    statement = select(Account).options(selectinload(Account.securities))  # type: ignore
+    if user is not None:
+        statement = statement.where(Account.user_id == user.id)
+    if since is not None:
+        statement = statement.where(col(Account.created_at) >= to_naive_utc(since))
+    if until is not None:
+        statement = statement.where(col(Account.created_at) <= to_naive_utc(until))
+    return statement
+
+
+def get_page(
+    session: Session,
+    page: PageParams,
+    user: User | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    """A page of all accounts, or only of those owned by `user`."""
+    statement = _page_statement(user, since, until)
+    return paginate(session, statement, Account, page)
+
+
+async def get_page_async(
+    session: AsyncSession,
+    page: PageParams,
+    user: User | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    statement = _page_statement(user, since, until)
+    return await paginate_async(session, statement, Account, page)
 
 
-def fetch_all(session: Session):
-    statement = select(Account)
-    accounts = session.exec(statement).all()
-    count_statement = select(func.count()).select_from(Account)
-    count = session.exec(count_statement).one()
-    return accounts, count
+async def load_securities_async(session: AsyncSession, account_db: Account):
+    """Load the account's securities, which cannot be lazy loaded on an async
+    session."""
+    await session.refresh(account_db, ["securities"])
 
 
 def create(session: Session, account_in: AccountCreate, current_user: User):
@@ -22,16 +63,46 @@ def create(session: Session, account_in: AccountCreate, current_user: User):
 
 
 def update(
-    session: Session, account_db: Account, account_in: AccountUpdate | None = None
+    session: Session,
+    account_db: Account,
+    account_in: AccountUpdate | None = None,
+    commit: bool = True,
 ):
     if account_in is not None:
         account_data = account_in.model_dump(exclude_unset=True)
         account_db.sqlmodel_update(account_data)
     session.add(account_db)
-    session.commit()
-    session.refresh(account_db)
+    if commit:
+        session.commit()
+        session.refresh(account_db)
 
 
 def delete(session: Session, account_db: Account):
     session.delete(account_db)
     session.commit()
+
+
+def refresh_market_values(session: Session, symbols: list[str], commit: bool = True):
+    """Recompute the market value of every account holding any of `symbols`
+    from the latest prices of its instruments, in a single statement.
+
+    The accounts' versions are incremented too, so that a concurrent write
+    that read the previous market value fails instead of overwriting it."""
+    if not symbols:
+        return
+    market_value = (
+        select(func.coalesce(func.sum(Security.position * Instrument.latest_price), 0))
+        .join(Instrument, col(Instrument.symbol) == Security.symbol)
+        .where(Security.account_id == Account.id)
+        .scalar_subquery()
+    )
+    holders = select(Security.account_id).where(col(Security.symbol).in_(symbols))
+    statement = (
+        update_statement(Account)
+        .where(col(Account.id).in_(holders))
+        .values(market_value=market_value, version=Account.version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
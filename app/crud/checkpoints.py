@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from sqlmodel import Session, col, delete, select
+
+from app.models.accounts import Account
+from app.models.checkpoints import TransactionCheckpoint
+
+
+def get_latest(session: Session, account: Account):
+    statement = (
+        select(TransactionCheckpoint)
+        .where(TransactionCheckpoint.account_id == account.id)
+        .order_by(
+            col(TransactionCheckpoint.last_transaction_at).desc(),
+            col(TransactionCheckpoint.last_transaction_id).desc(),
+        )
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def get_latest_before(session: Session, account: Account, before: datetime):
+    statement = (
+        select(TransactionCheckpoint)
+        .where(
+            TransactionCheckpoint.account_id == account.id,
+            TransactionCheckpoint.last_transaction_at < before,
+        )
+        .order_by(
+            col(TransactionCheckpoint.last_transaction_at).desc(),
+            col(TransactionCheckpoint.last_transaction_id).desc(),
+        )
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def create(session: Session, checkpoint: TransactionCheckpoint, commit: bool = True):
+    session.add(checkpoint)
+    if commit:
+        session.commit()
+        session.refresh(checkpoint)
+    return checkpoint
+
+
+def delete_from(
+    session: Session, account: Account, since: datetime | None, commit: bool = True
+):
+    statement = delete(TransactionCheckpoint).where(
+        col(TransactionCheckpoint.account_id) == account.id
+    )
+    if since is not None:
+        statement = statement.where(
+            col(TransactionCheckpoint.last_transaction_at) >= since
+        )
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
+
+
+def delete_all_for_account(session: Session, account: Account):
+    statement = delete(TransactionCheckpoint).where(
+        col(TransactionCheckpoint.account_id) == account.id
+    )
+    session.exec(statement)  # type: ignore
+    session.commit()
@@ -1,9 +1,16 @@
 from uuid import UUID
 
 from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 def get_by_id[
     T: SQLModel
 ](model: type[T], session: Session, account_id: int | UUID) -> T | None:
     return session.get(model, account_id)
+
+
+async def get_by_id_async[
+    T: SQLModel
+](model: type[T], session: AsyncSession, account_id: int | UUID) -> T | None:
+    return await session.get(model, account_id)
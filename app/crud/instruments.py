@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from sqlalchemy import bindparam
+from sqlmodel import Session, col, func, select
+from sqlmodel import update as update_statement
+
+from app.models.instruments import Instrument
+
+
+def get_by_symbol(session: Session, symbol: str):
+    statement = select(Instrument).where(Instrument.symbol == symbol)
+    return session.exec(statement).first()
+
+
+def get_many(session: Session, symbols: list[str]):
+    statement = select(Instrument).where(col(Instrument.symbol).in_(symbols))
+    return session.exec(statement).all()
+
+
+def get_or_create(session: Session, symbol: str, commit: bool = True):
+    instrument_db = get_by_symbol(session, symbol)
+    if instrument_db is None:
+        instrument_db = Instrument(symbol=symbol)
+        session.add(instrument_db)
+        if commit:
+            session.commit()
+            session.refresh(instrument_db)
+    return instrument_db
+
+
+def update(session: Session, instrument_db: Instrument, commit: bool = True):
+    session.add(instrument_db)
+    if commit:
+        session.commit()
+        session.refresh(instrument_db)
+
+
+def update_latest_prices(
+    session: Session, prices: dict[str, Decimal], commit: bool = True
+):
+    """Set the latest price of each symbol, in a single executemany."""
+    if not prices:
+        return
+    statement = (
+        update_statement(Instrument)
+        .where(col(Instrument.symbol) == bindparam("symbol_"))
+        .values(
+            latest_price=bindparam("price_"),
+            price_updated_at=func.now(),
+            updated_at=func.now(),
+        )
+    )
+    session.connection().execute(
+        statement,
+        [{"symbol_": symbol, "price_": price} for symbol, price in prices.items()],
+    )
+    if commit:
+        session.commit()
@@ -1,25 +1,117 @@
-from sqlmodel import Session, col, select
+from datetime import datetime
+from uuid import UUID
 
+from sqlmodel import Session, col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.pagination import PageParams, paginate, paginate_async
 from app.models.accounts import Account
-from app.models.ledger import Ledger, LedgerCreate, LedgerUpdate
+from app.models.ledger import Ledger, LedgerCreate, LedgerType, LedgerUpdate
+from app.utils import to_naive_utc
 
 
-def get_all_for_account(session: Session, account: Account):
+def get_all_for_account(
+    session: Session, account: Account, since: datetime | None = None
+):
     statement = (
         select(Ledger)
         .where(Ledger.account_id == account.id)
         .order_by(col(Ledger.created_at))
     )
+    if since is not None:
+        statement = statement.where(col(Ledger.created_at) >= since)
 
     ledger = session.exec(statement).all()
     return ledger
 
 
-def create(session: Session, trade_in: LedgerCreate, account_db: Account):
+def get_flows_for_accounts(
+    session: Session, account_ids: list[UUID], until: datetime | None = None
+):
+    """`(account_id, created_at, type, amount)` of the ledger entries of several
+    accounts, without loading them as models."""
+    statement = select(
+        Ledger.account_id, Ledger.created_at, Ledger.type, Ledger.amount
+    ).where(col(Ledger.account_id).in_(account_ids))
+    if until is not None:
+        statement = statement.where(col(Ledger.created_at) <= until)
+    return session.exec(statement).all()
+
+
+def _page_statement(
+    account: Account,
+    since: datetime | None,
+    until: datetime | None,
+    type_: LedgerType | None,
+):
+    statement = select(Ledger).where(Ledger.account_id == account.id)
+    if since is not None:
+        statement = statement.where(col(Ledger.created_at) >= to_naive_utc(since))
+    if until is not None:
+        statement = statement.where(col(Ledger.created_at) <= to_naive_utc(until))
+    if type_ is not None:
+        statement = statement.where(Ledger.type == type_)
+    return statement
+
+
+def get_page_for_account(
+    session: Session,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: LedgerType | None = None,
+):
+    statement = _page_statement(account, since, until, type_)
+    return paginate(session, statement, Ledger, page)
+
+
+async def get_page_for_account_async(
+    session: AsyncSession,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: LedgerType | None = None,
+):
+    statement = _page_statement(account, since, until, type_)
+    return await paginate_async(session, statement, Ledger, page)
+
+
+def stream_for_account(session: Session, account: Account, batch_size: int):
+    """All of the account's ledger entries, read `batch_size` rows at a time
+    from a server-side cursor."""
+    statement = (
+        select(Ledger)
+        .where(Ledger.account_id == account.id)
+        .order_by(col(Ledger.created_at), col(Ledger.id))
+        .execution_options(yield_per=batch_size)
+    )
+    return session.exec(statement)
+
+
+def get_last_created_at(session: Session, account: Account) -> datetime | None:
+    statement = select(func.max(Ledger.created_at)).where(
+        Ledger.account_id == account.id
+    )
+    return session.exec(statement).one()
+
+
+def count_for_account(session: Session, account: Account) -> int:
+    statement = (
+        select(func.count()).select_from(Ledger).where(Ledger.account_id == account.id)
+    )
+    return session.exec(statement).one()
+
+
+def create(
+    session: Session, trade_in: LedgerCreate, account_db: Account, commit: bool = True
+):
     trade_db = Ledger.model_validate(trade_in, update={"account_id": account_db.id})
     session.add(trade_db)
-    session.commit()
-    session.refresh(trade_db)
+    if commit:
+        session.commit()
+        session.refresh(trade_db)
     return trade_db
 
 
@@ -34,3 +126,9 @@ def update(session: Session, trade_db: Ledger, trade_in: LedgerUpdate):
 def delete(session: Session, trade_db: Ledger):
     session.delete(trade_db)
     session.commit()
+
+
+def create_many(session: Session, ledger: list[Ledger], commit: bool = True):
+    session.add_all(ledger)
+    if commit:
+        session.commit()
@@ -0,0 +1,93 @@
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal
+
+from sqlmodel import Session, col, delete, select
+from sqlmodel import update as update_statement
+
+from app.models.accounts import Account
+from app.models.lots import Lot
+from app.models.securities import Security
+
+
+def get_open(
+    session: Session,
+    security: Security,
+    limit: int | None = None,
+    order_by: Sequence | None = None,
+):
+    """Open lots of a security in acquisition order, starting at its cursor,
+    or in `order_by` order."""
+    statement = select(Lot).where(
+        Lot.security_id == security.id, Lot.remaining_quantity > 0
+    )
+    if order_by is None:
+        statement = statement.where(Lot.sequence >= security.lot_cursor).order_by(
+            col(Lot.sequence)
+        )
+    else:
+        statement = statement.order_by(*order_by)
+    statement = statement.limit(limit)
+    return session.exec(statement).all()
+
+
+def get_open_for_account(
+    session: Session, account: Account, acquired_before: datetime | None = None
+):
+    statement = (
+        select(Lot)
+        .where(Lot.account_id == account.id, Lot.remaining_quantity > 0)
+        .order_by(col(Lot.acquired_at))
+    )
+    if acquired_before is not None:
+        statement = statement.where(col(Lot.acquired_at) < acquired_before)
+    return session.exec(statement).all()
+
+
+def create(session: Session, lot: Lot, commit: bool = True):
+    session.add(lot)
+    if commit:
+        session.commit()
+        session.refresh(lot)
+    return lot
+
+
+def create_many(session: Session, lots: list[Lot], commit: bool = True):
+    session.add_all(lots)
+    if commit:
+        session.commit()
+
+
+def update(session: Session, lot: Lot, commit: bool = True):
+    session.add(lot)
+    if commit:
+        session.commit()
+        session.refresh(lot)
+
+
+def set_remaining_quantity(
+    session: Session,
+    security: Security,
+    sequence: int,
+    remaining_quantity: Decimal,
+    commit: bool = True,
+):
+    statement = (
+        update_statement(Lot)
+        .where(col(Lot.security_id) == security.id, col(Lot.sequence) == sequence)
+        .values(remaining_quantity=remaining_quantity)
+    )
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
+
+
+def delete_from_sequence(
+    session: Session, security: Security, sequence: int, commit: bool = True
+):
+    statement = delete(Lot).where(
+        col(Lot.security_id) == security.id, col(Lot.sequence) >= sequence
+    )
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
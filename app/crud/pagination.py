@@ -0,0 +1,135 @@
+import base64
+from datetime import datetime
+from typing import NamedTuple
+from uuid import UUID
+
+from sqlmodel import Session, and_, col, func, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.generic import BaseTableModel
+from app.utils import to_naive_utc
+
+
+class Cursor(NamedTuple):
+    """Position in a list ordered by ``(created_at, id)``."""
+
+    created_at: datetime
+    id: UUID
+    backward: bool = False
+
+
+class PageParams(NamedTuple):
+    limit: int
+    cursor: Cursor | None = None
+
+
+class Page(NamedTuple):
+    items: list
+    # Only counted on the first page, as counting reads every row
+    count: int | None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    direction = "prev" if cursor.backward else "next"
+    created_at = to_naive_utc(cursor.created_at)
+    raw = f"{direction}|{created_at.isoformat()}|{cursor.id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Raises `ValueError` if `value` was not produced by `encode_cursor`."""
+    direction, created_at, id = (
+        base64.urlsafe_b64decode(value.encode()).decode().split("|")
+    )
+    if direction not in ("next", "prev"):
+        raise ValueError(f"Invalid cursor direction: {direction}")
+    return Cursor(
+        datetime.fromisoformat(created_at), UUID(id), backward=direction == "prev"
+    )
+
+
+def _cursor_for(row, backward: bool = False):
+    obj = row if isinstance(row, BaseTableModel) else row[0]
+    return encode_cursor(Cursor(obj.created_at, obj.id, backward=backward))
+
+
+def _page_statements(statement, model: type[BaseTableModel], page: PageParams):
+    """Statements counting the rows of `statement`, on the first page only, and
+    reading `limit + 1` of them after the page's cursor, in the cursor's
+    direction."""
+    count_statement = None
+    if page.cursor is None:
+        count_statement = select(func.count()).select_from(statement.subquery())
+
+    created_at, id = col(model.created_at), col(model.id)
+    cursor = page.cursor
+    if cursor is None:
+        statement = statement.order_by(created_at, id)
+    elif cursor.backward:
+        statement = statement.where(
+            or_(
+                created_at < cursor.created_at,
+                and_(created_at == cursor.created_at, id < cursor.id),
+            )
+        ).order_by(created_at.desc(), id.desc())
+    else:
+        statement = statement.where(
+            or_(
+                created_at > cursor.created_at,
+                and_(created_at == cursor.created_at, id > cursor.id),
+            )
+        ).order_by(created_at, id)
+
+    return count_statement, statement.limit(page.limit + 1)
+
+
+def _to_page(rows: list, count: int | None, page: PageParams) -> Page:
+    has_more = len(rows) > page.limit
+    rows = rows[: page.limit]
+
+    cursor = page.cursor
+    if cursor is not None and cursor.backward:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    if not rows:
+        return Page(items=rows, count=count)
+    return Page(
+        items=rows,
+        count=count,
+        next_cursor=_cursor_for(rows[-1]) if has_next else None,
+        prev_cursor=_cursor_for(rows[0], backward=True) if has_prev else None,
+    )
+
+
+def paginate(
+    session: Session, statement, model: type[BaseTableModel], page: PageParams
+) -> Page:
+    """Run `statement` one page at a time using keyset pagination.
+
+    `statement` must not be ordered; rows are returned by ``(created_at, id)``.
+    Only `limit + 1` rows are read, however deep the cursor is, and all rows are
+    only counted for the first page.
+    """
+    count_statement, rows_statement = _page_statements(statement, model, page)
+    count = None
+    if count_statement is not None:
+        count = session.exec(count_statement).one()
+    rows = list(session.exec(rows_statement).all())
+    return _to_page(rows, count, page)
+
+
+async def paginate_async(
+    session: AsyncSession, statement, model: type[BaseTableModel], page: PageParams
+) -> Page:
+    """`paginate` on an async session."""
+    count_statement, rows_statement = _page_statements(statement, model, page)
+    count = None
+    if count_statement is not None:
+        count = (await session.exec(count_statement)).one()
+    rows = list((await session.exec(rows_statement)).all())
+    return _to_page(rows, count, page)
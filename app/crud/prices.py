@@ -0,0 +1,42 @@
+from datetime import date
+from itertools import batched
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, col, select
+
+from app.models.prices import DailyPrice, DailyPriceBase
+
+# Dialects with an INSERT ... ON CONFLICT DO UPDATE
+INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def get_closes(session: Session, symbols: list[str], until: date):
+    """`(symbol, date, close)` of every close of `symbols` up to `until`."""
+    statement = (
+        select(DailyPrice.symbol, DailyPrice.date, DailyPrice.close)
+        .where(col(DailyPrice.symbol).in_(symbols), col(DailyPrice.date) <= until)
+        .order_by(col(DailyPrice.symbol), col(DailyPrice.date))
+    )
+    return session.exec(statement).all()
+
+
+def upsert_statement(dialect: str):
+    statement = INSERTS[dialect](DailyPrice)
+    return statement.on_conflict_do_update(
+        index_elements=["symbol", "date"], set_={"close": statement.excluded.close}
+    )
+
+
+def upsert_many(
+    session: Session,
+    prices: list[DailyPriceBase],
+    batch_size: int = 10_000,
+    commit: bool = True,
+):
+    """Insert closes, replacing the ones already stored for the same symbol and
+    day, `batch_size` rows per executemany."""
+    statement = upsert_statement(session.get_bind().dialect.name)
+    for batch in batched(prices, batch_size):
+        session.connection().execute(statement, [p.model_dump() for p in batch])
+    if commit:
+        session.commit()
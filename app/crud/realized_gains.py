@@ -0,0 +1,118 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlmodel import Session, and_, col, delete, func, or_, select
+
+from app.models.accounts import Account
+from app.models.realized_gains import RealizedGain, RealizedGainPeriod
+from app.models.securities import Security
+from app.models.trades import Trade
+
+# Formats of the period of a sell, for SQLite's strftime and PostgreSQL's
+# to_char
+PERIOD_FORMATS = {
+    RealizedGainPeriod.DAY: "%Y-%m-%d",
+    RealizedGainPeriod.MONTH: "%Y-%m",
+    RealizedGainPeriod.YEAR: "%Y",
+}
+POSTGRESQL_PERIOD_FORMATS = {
+    RealizedGainPeriod.DAY: "YYYY-MM-DD",
+    RealizedGainPeriod.MONTH: "YYYY-MM",
+    RealizedGainPeriod.YEAR: "YYYY",
+}
+
+
+def period_expression(dialect: str, period: RealizedGainPeriod):
+    """The period of `RealizedGain.sold_at` as text, e.g. "2024-01" for a month."""
+    if dialect == "postgresql":
+        return func.to_char(RealizedGain.sold_at, POSTGRESQL_PERIOD_FORMATS[period])
+    return func.strftime(PERIOD_FORMATS[period], RealizedGain.sold_at)
+
+
+def get_all_for_account(session: Session, account: Account):
+    statement = (
+        select(RealizedGain)
+        .where(RealizedGain.account_id == account.id)
+        .order_by(col(RealizedGain.sold_at))
+    )
+    return session.exec(statement).all()
+
+
+def summarize(
+    session: Session,
+    account: Account,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    period: RealizedGainPeriod | None = None,
+    by_security: bool = False,
+):
+    """Totals of the gains realized by the account from `since` (inclusive) to
+    `until` (exclusive), grouped by `period` of the sell and/or by security."""
+    groups = []
+    if period is not None:
+        dialect = session.get_bind().dialect.name
+        groups.append(period_expression(dialect, period).label("period"))
+    if by_security:
+        groups.extend([col(Security.symbol), col(RealizedGain.security_id)])
+
+    quantity = func.sum(RealizedGain.quantity)
+    statement = select(
+        *groups,
+        func.count().label("sells"),
+        quantity.label("quantity"),
+        func.sum(RealizedGain.proceeds).label("proceeds"),
+        func.sum(RealizedGain.cost).label("cost"),
+        func.sum(RealizedGain.gain).label("gain"),
+        (func.sum(RealizedGain.holding_days * RealizedGain.quantity) / quantity).label(
+            "holding_days"
+        ),
+    ).where(RealizedGain.account_id == account.id)
+    if by_security:
+        statement = statement.join(
+            Security, col(RealizedGain.security_id) == Security.id
+        )
+    if since is not None:
+        statement = statement.where(col(RealizedGain.sold_at) >= since)
+    if until is not None:
+        statement = statement.where(col(RealizedGain.sold_at) < until)
+    if groups:
+        statement = statement.group_by(*groups).order_by(*groups)
+    return session.exec(statement).all()
+
+
+def create(session: Session, gain: RealizedGain, commit: bool = True):
+    session.add(gain)
+    if commit:
+        session.commit()
+        session.refresh(gain)
+    return gain
+
+
+def create_many(session: Session, gains: list[RealizedGain], commit: bool = True):
+    session.add_all(gains)
+    if commit:
+        session.commit()
+
+
+def delete_after(
+    session: Session,
+    account: Account,
+    after: tuple[datetime, UUID] | None,
+    commit: bool = True,
+):
+    """Delete the gains realized by the account's trades ordered after `after`,
+    a `(created_at, id)` key, or all of the account's gains if it is None."""
+    statement = delete(RealizedGain).where(col(RealizedGain.account_id) == account.id)
+    if after is not None:
+        created_at, id = after
+        later_trades = select(Trade.id).where(
+            Trade.account_id == account.id,
+            or_(
+                col(Trade.created_at) > created_at,
+                and_(col(Trade.created_at) == created_at, col(Trade.id) > id),
+            ),
+        )
+        statement = statement.where(col(RealizedGain.trade_id).in_(later_trades))
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
@@ -1,8 +1,12 @@
+from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
 from sqlmodel import Session, col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.crud import instruments
+from app.crud.pagination import PageParams, paginate, paginate_async
 from app.models.accounts import Account
 from app.models.securities import (
     Security,
@@ -10,6 +14,7 @@ from app.models.securities import (
     SecurityServiceUpdate,
     SecurityUpdate,
 )
+from app.utils import to_naive_utc
 
 
 def get_one(session: Session, id: str | UUID):
@@ -39,11 +44,50 @@ def get_all_for_account(session: Session, account: Account):
     return securities
 
 
+def _page_statement(account: Account, since: datetime | None, until: datetime | None):
+    statement = select(Security).where(Security.account_id == account.id)
+    if since is not None:
+        statement = statement.where(col(Security.created_at) >= to_naive_utc(since))
+    if until is not None:
+        statement = statement.where(col(Security.created_at) <= to_naive_utc(until))
+    return statement
+
+
+def get_page_for_account(
+    session: Session,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    statement = _page_statement(account, since, until)
+    return paginate(session, statement, Security, page)
+
+
+async def get_page_for_account_async(
+    session: AsyncSession,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    statement = _page_statement(account, since, until)
+    return await paginate_async(session, statement, Security, page)
+
+
+def get_distinct_symbols(session: Session) -> list[str]:
+    statement = select(Security.symbol).distinct().order_by(col(Security.symbol))
+    return list(session.exec(statement).all())
+
+
 def create(session: Session, security_in: SecurityCreate, account_db: Account):
+    instruments.get_or_create(session, security_in.symbol, commit=False)
     security_db = Security.model_validate(
         security_in, update={"account_id": account_db.id}
     )
+    account_db.total_target_allocation += security_db.target_allocation
     session.add(security_db)
+    session.add(account_db)
     session.commit()
     session.refresh(security_db)
     return security_db
@@ -53,15 +97,29 @@ def update(
     session: Session,
     security_db: Security,
     security_in: SecurityUpdate | SecurityServiceUpdate | None = None,
+    commit: bool = True,
 ):
     if security_in:
         security_data = security_in.model_dump(exclude_unset=True)
+        if "target_allocation" in security_data:
+            account_db = session.get(Account, security_db.account_id)
+            account_db.total_target_allocation += (  # type: ignore
+                security_data["target_allocation"] - security_db.target_allocation
+            )
+            session.add(account_db)
         security_db.sqlmodel_update(security_data)
     session.add(security_db)
-    session.commit()
-    session.refresh(security_db)
+    if commit:
+        session.commit()
+        session.refresh(security_db)
 
 
 def delete(session: Session, security_db: Security):
+    account_db = session.get(Account, security_db.account_id)
+    if account_db is not None:
+        account_db.total_target_allocation -= security_db.target_allocation
+        account_db.total_cost_basis -= security_db.cost_basis
+        account_db.market_value -= security_db.position * security_db.latest_price
+        session.add(account_db)
     session.delete(security_db)
     session.commit()
@@ -0,0 +1,61 @@
+from datetime import date
+
+from sqlmodel import Session, col, delete, func, select
+
+from app.models.accounts import Account
+from app.models.securities import Security
+from app.models.snapshots import PositionSnapshot
+
+
+def get_for_day(session: Session, security: Security, day: date):
+    statement = select(PositionSnapshot).where(
+        PositionSnapshot.security_id == security.id, PositionSnapshot.date == day
+    )
+    return session.exec(statement).first()
+
+
+def get_all_for_day(session: Session, account: Account, day: date):
+    statement = select(PositionSnapshot).where(
+        PositionSnapshot.account_id == account.id, PositionSnapshot.date == day
+    )
+    return session.exec(statement).all()
+
+
+def get_latest_before(session: Session, account: Account, day: date):
+    """Latest snapshot of each security of the account dated before `day`."""
+    latest = (
+        select(
+            PositionSnapshot.security_id,
+            func.max(PositionSnapshot.date).label("date"),
+        )
+        .where(PositionSnapshot.account_id == account.id, PositionSnapshot.date < day)
+        .group_by(col(PositionSnapshot.security_id))
+        .subquery()
+    )
+    statement = select(PositionSnapshot).join(
+        latest,
+        (col(PositionSnapshot.security_id) == latest.c.security_id)
+        & (col(PositionSnapshot.date) == latest.c.date),
+    )
+    return session.exec(statement).all()
+
+
+def save(session: Session, snapshot: PositionSnapshot, commit: bool = True):
+    session.add(snapshot)
+    if commit:
+        session.commit()
+        session.refresh(snapshot)
+    return snapshot
+
+
+def delete_from(
+    session: Session, account: Account, since: date | None, commit: bool = True
+):
+    statement = delete(PositionSnapshot).where(
+        col(PositionSnapshot.account_id) == account.id
+    )
+    if since is not None:
+        statement = statement.where(col(PositionSnapshot.date) >= since)
+    session.exec(statement)  # type: ignore
+    if commit:
+        session.commit()
@@ -1,21 +1,122 @@
-from sqlmodel import Session, col, select
+from datetime import datetime
+from uuid import UUID
 
+from sqlmodel import Session, col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.pagination import PageParams, paginate, paginate_async
 from app.models.accounts import Account
 from app.models.securities import Security
-from app.models.trades import Trade, TradeCreate, TradeUpdate
+from app.models.trades import Trade, TradeCreate, TradeType, TradeUpdate
+from app.utils import to_naive_utc
 
 
-def get_all_for_account(session: Session, account: Account):
+def get_all_for_account(
+    session: Session,
+    account: Account,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
     statement = (
         select(Trade)
         .where(Trade.account_id == account.id)
         .order_by(col(Trade.created_at))
     )
+    if since is not None:
+        statement = statement.where(col(Trade.created_at) >= since)
+    if until is not None:
+        statement = statement.where(col(Trade.created_at) <= until)
 
     trades = session.exec(statement).all()
     return trades
 
 
+def _page_statement(
+    account: Account,
+    since: datetime | None,
+    until: datetime | None,
+    type_: TradeType | None,
+    security_id: UUID | None,
+):
+    statement = (
+        select(Trade, Security.symbol)
+        .join(Security, col(Trade.security_id) == Security.id, isouter=True)
+        .where(Trade.account_id == account.id)
+    )
+    if since is not None:
+        statement = statement.where(col(Trade.created_at) >= to_naive_utc(since))
+    if until is not None:
+        statement = statement.where(col(Trade.created_at) <= to_naive_utc(until))
+    if type_ is not None:
+        statement = statement.where(Trade.type == type_)
+    if security_id is not None:
+        statement = statement.where(Trade.security_id == security_id)
+    return statement
+
+
+def get_page_for_account(
+    session: Session,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: TradeType | None = None,
+    security_id: UUID | None = None,
+):
+    """A page of the account's trades, each paired with its security symbol."""
+    statement = _page_statement(account, since, until, type_, security_id)
+    return paginate(session, statement, Trade, page)
+
+
+async def get_page_for_account_async(
+    session: AsyncSession,
+    account: Account,
+    page: PageParams,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type_: TradeType | None = None,
+    security_id: UUID | None = None,
+):
+    statement = _page_statement(account, since, until, type_, security_id)
+    return await paginate_async(session, statement, Trade, page)
+
+
+def stream_for_account(session: Session, account: Account, batch_size: int):
+    """All of the account's trades with their symbol, read `batch_size` rows at a
+    time from a server-side cursor."""
+    statement = (
+        select(Trade, Security.symbol)
+        .join(Security, col(Trade.security_id) == Security.id, isouter=True)
+        .where(Trade.account_id == account.id)
+        .order_by(col(Trade.created_at), col(Trade.id))
+        .execution_options(yield_per=batch_size)
+    )
+    return session.exec(statement)
+
+
+def get_flows_for_accounts(
+    session: Session, account_ids: list[UUID], until: datetime | None = None
+):
+    """`(account_id, security_id, symbol, created_at, type, quantity, price)` of
+    the trades of several accounts, without loading them as models."""
+    statement = (
+        select(
+            Trade.account_id,
+            Trade.security_id,
+            Security.symbol,
+            Trade.created_at,
+            Trade.type,
+            Trade.quantity,
+            Trade.price,
+        )
+        .join(Security, col(Trade.security_id) == Security.id)
+        .where(col(Trade.account_id).in_(account_ids))
+    )
+    if until is not None:
+        statement = statement.where(col(Trade.created_at) <= until)
+    return session.exec(statement).all()
+
+
 def get_all_for_security(session: Session, account: Account, security: Security):
     statement = (
         select(Trade)
@@ -27,11 +128,33 @@ def get_all_for_security(session: Session, account: Account, security: Security)
     return trades
 
 
-def create(session: Session, trade_in: TradeCreate, account_db: Account):
-    trade_db = Trade.model_validate(trade_in, update={"account_id": account_db.id})
+def get_last_created_at(session: Session, account: Account) -> datetime | None:
+    statement = select(func.max(Trade.created_at)).where(Trade.account_id == account.id)
+    return session.exec(statement).one()
+
+
+def count_for_account(session: Session, account: Account) -> int:
+    statement = (
+        select(func.count()).select_from(Trade).where(Trade.account_id == account.id)
+    )
+    return session.exec(statement).one()
+
+
+def create(
+    session: Session,
+    trade_in: TradeCreate,
+    account_db: Account,
+    id: UUID | None = None,
+    commit: bool = True,
+):
+    update = {"account_id": account_db.id}
+    if id is not None:
+        update["id"] = id
+    trade_db = Trade.model_validate(trade_in, update=update)
     session.add(trade_db)
-    session.commit()
-    session.refresh(trade_db)
+    if commit:
+        session.commit()
+        session.refresh(trade_db)
     return trade_db
 
 
@@ -46,3 +169,9 @@ def update(session: Session, trade_db: Trade, trade_in: TradeUpdate):
 def delete(session: Session, trade_db: Trade):
     session.delete(trade_db)
     session.commit()
+
+
+def create_many(session: Session, trades: list[Trade], commit: bool = True):
+    session.add_all(trades)
+    if commit:
+        session.commit()
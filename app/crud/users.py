@@ -2,6 +2,7 @@ from sqlalchemy import func
 from sqlmodel import Session, select
 
 from app.api.utils import get_password_hash
+from app.core.user_cache import user_cache
 from app.models.users import User, UserCreate, UserRegister, UserUpdate
 
 
@@ -47,18 +48,21 @@ def update(session: Session, user_db: User, user_in: UserUpdate):
     user_db.sqlmodel_update(user_data, update=extra)
     session.add(user_db)
     session.commit()
+    user_cache.invalidate(user_db.id)
     session.refresh(user_db)
 
 
 def hard_delete(session: Session, user_db: User):
     session.delete(user_db)
     session.commit()
+    user_cache.invalidate(user_db.id)
 
 
 def soft_delete(session: Session, user_db: User):
     user_db.sqlmodel_update({"deleted_at": func.now()})
     session.add(user_db)
     session.commit()
+    user_cache.invalidate(user_db.id)
     session.refresh(user_db)
 
 
@@ -66,4 +70,5 @@ def recover(session: Session, user_db: User):
     user_db.sqlmodel_update({"deleted_at": None})
     session.add(user_db)
     session.commit()
+    user_cache.invalidate(user_db.id)
     session.refresh(user_db)
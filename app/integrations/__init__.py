@@ -0,0 +1,46 @@
+import asyncio
+
+from app.core.config import settings
+from app.integrations.market_data import (
+    MarketDataClient,
+    MarketDataProvider,
+    QuoteBatch,
+)
+from app.integrations.yahoo import YFinanceProvider
+
+market_data = MarketDataClient(
+    YFinanceProvider(max_workers=settings.MARKET_DATA_MAX_CONCURRENCY),
+    max_concurrency=settings.MARKET_DATA_MAX_CONCURRENCY,
+    timeout=settings.MARKET_DATA_TIMEOUT,
+    retries=settings.MARKET_DATA_RETRIES,
+    backoff=settings.MARKET_DATA_BACKOFF,
+)
+
+
+def fetch_quotes(symbols: list[str] | str) -> QuoteBatch:
+    """Blocking entry point to `market_data`, for code running outside of an
+    event loop."""
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    return asyncio.run(market_data.fetch_many(symbols))
+
+
+def get_tickers_data(symbols: list[str] | str) -> dict:
+    return fetch_quotes(symbols).quotes
+
+
+__all__ = [
+    "MarketDataClient",
+    "MarketDataProvider",
+    "QuoteBatch",
+    "fetch_quotes",
+    "get_tickers_data",
+    "market_data",
+]
+
+
+if __name__ == "__main__":
+    import pprint
+
+    out = get_tickers_data(["VOOV", "VBR"])
+    pprint.pprint([t for t in out.items()])
@@ -0,0 +1,36 @@
+import asyncio
+from collections import Counter
+
+
+class FakeMarketDataProvider:
+    """In-memory provider for tests and benchmarks.
+
+    Each call waits `latency` seconds. A symbol in `failures` raises on its
+    first `failures[symbol]` calls, and symbols missing from `quotes` are not
+    found.
+    """
+
+    def __init__(
+        self,
+        quotes: dict[str, dict],
+        latency: float = 0.0,
+        failures: dict[str, int] | None = None,
+    ):
+        self.quotes = quotes
+        self.latency = latency
+        self.failures = failures or {}
+        self.calls: Counter[str] = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_quote(self, symbol: str) -> dict:
+        self.calls[symbol] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.calls[symbol] <= self.failures.get(symbol, 0):
+                raise ConnectionError(f"Failed to fetch '{symbol}'.")
+            return self.quotes.get(symbol, {})
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,92 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from app.constants.messages import Messages
+from app.core.logging_config import logger
+
+
+class MarketDataProvider(Protocol):
+    """Source of quote data.
+
+    `fetch_quote` returns the quote data of a symbol, or an empty dict if the
+    provider does not know the symbol. Any exception is treated as a transient
+    failure and retried.
+    """
+
+    async def fetch_quote(self, symbol: str) -> dict: ...
+
+
+@dataclass
+class QuoteBatch:
+    """Quote data of the symbols that could be fetched, and the error of each
+    one that could not."""
+
+    quotes: dict[str, dict] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class MarketDataClient:
+    """Fetches quotes from a `provider`, at most `max_concurrency` at a time.
+
+    Each call is given `timeout` seconds and failed calls are retried up to
+    `retries` times, waiting `backoff * 2 ** attempt` seconds between attempts.
+    A symbol that still fails is reported in the batch errors instead of
+    failing the whole batch.
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        max_concurrency: int,
+        timeout: float,
+        retries: int,
+        backoff: float,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+
+    async def _fetch_one(
+        self, symbol: str, semaphore: asyncio.Semaphore
+    ) -> tuple[str, dict | None, str | None]:
+        error = ""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await self.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                async with semaphore:
+                    data = await asyncio.wait_for(
+                        self.provider.fetch_quote(symbol), self.timeout
+                    )
+            except TimeoutError:
+                error = Messages.External.timed_out(self.timeout)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            else:
+                if not data:
+                    return symbol, None, Messages.External.SYMBOL_NOT_FOUND
+                return symbol, data, None
+            logger.warning(
+                Messages.External.fetch_attempt_failed(symbol, attempt + 1, error)
+            )
+        return symbol, None, error
+
+    async def fetch_many(self, symbols: Iterable[str]) -> QuoteBatch:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *(self._fetch_one(s, semaphore) for s in dict.fromkeys(symbols))
+        )
+
+        batch = QuoteBatch()
+        for symbol, data, error in results:
+            if data is not None:
+                batch.quotes[symbol] = data
+            else:
+                batch.errors[symbol] = error or ""
+        return batch
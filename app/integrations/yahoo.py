@@ -0,0 +1,26 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance as yf
+
+
+class YFinanceProvider:
+    """Quotes from Yahoo Finance.
+
+    yfinance is blocking, so calls run on a dedicated thread pool. Calls that
+    time out keep their thread until yfinance returns, and the pool size bounds
+    how many can pile up.
+    """
+
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="yfinance"
+        )
+
+    async def fetch_quote(self, symbol: str) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._get_info, symbol)
+
+    @staticmethod
+    def _get_info(symbol: str) -> dict:
+        return yf.Ticker(symbol).info or {}
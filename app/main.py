@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 
 from app.api.main import api_router
 from app.constants.messages import Messages
 from app.core.config import settings
+from app.core.db import engine
 from app.core.logging_config import logger
+from app.core.password_hasher import PasswordHasherBusy
 from app.models.generic import DetailItem
+from app.services.prices import PriceRefresher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    refresher = PriceRefresher(engine) if settings.PRICE_REFRESH_ENABLED else None
+    if refresher is not None:
+        refresher.start()
+    yield
+    if refresher is not None:
+        refresher.stop()
 
-app = FastAPI(debug=True)
+
+app = FastAPI(debug=True, lifespan=lifespan)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -24,6 +40,19 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "detail": DetailItem(
+                type="password_hasher_busy", loc=[], msg=Messages.Auth.BUSY
+            ).model_dump(),
+        },
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Unhandled error: {exc}", exc_info=True)
@@ -3,16 +3,20 @@ from decimal import Decimal
 from enum import Enum
 from uuid import UUID
 
+from sqlalchemy.orm import declared_attr
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.models.checkpoints import TransactionCheckpoint
 from app.models.generic import BaseTableModel, get_decimal_field
 from app.models.ledger import Ledger
+from app.models.lots import CostBasisMethod
 from app.models.securities import Security
 from app.models.trades import Trade
 
 
 class AccountBase(SQLModel):
     name: str
+    cost_basis_method: CostBasisMethod = CostBasisMethod.FIFO
 
 
 class Account(BaseTableModel, AccountBase, table=True):
@@ -21,11 +25,25 @@ class Account(BaseTableModel, AccountBase, table=True):
     user_id: UUID = Field(foreign_key="users.id", ondelete="CASCADE")
     user: "User" = Relationship(back_populates="accounts")  # type: ignore
     buying_power: Decimal = get_decimal_field(default=Decimal("0"))
+    # Totals over the account's securities, updated along with them
+    total_target_allocation: Decimal = get_decimal_field(default=Decimal("0"))
+    total_cost_basis: Decimal = get_decimal_field(default=Decimal("0"))
+    market_value: Decimal = get_decimal_field(default=Decimal("0"))
     securities: list[Security] = Relationship(
         back_populates="account", cascade_delete=True
     )
     trades: list[Trade] = Relationship(back_populates="account", cascade_delete=True)
     ledger: list[Ledger] = Relationship(back_populates="account", cascade_delete=True)
+    checkpoints: list[TransactionCheckpoint] = Relationship(
+        back_populates="account", cascade_delete=True
+    )
+    # Incremented by every update, which fails with `StaleDataError` if the
+    # account was updated since it was read
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+
+    @declared_attr  # type: ignore
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}  # type: ignore
 
 
 class AccountCreate(AccountBase):
@@ -35,6 +53,9 @@ class AccountCreate(AccountBase):
 class AccountRead(AccountBase):
     user_id: UUID
     buying_power: Decimal
+    total_target_allocation: Decimal
+    total_cost_basis: Decimal
+    market_value: Decimal
     securities: list[Security]
     id: UUID
     created_at: datetime
@@ -44,6 +65,7 @@ class AccountRead(AccountBase):
 
 class AccountUpdate(SQLModel):
     name: str | None = None
+    cost_basis_method: CostBasisMethod | None = None
 
 
 class AllocationPlanItem(SQLModel):
@@ -54,6 +76,10 @@ class AllocationPlanItem(SQLModel):
     ideal_value: Decimal = get_decimal_field()
     current_weight: Decimal = get_decimal_field(le=1)
     needed_investment: Decimal = get_decimal_field()
+    # When the price used was quoted, and whether it is the last known price of
+    # a symbol that could not be fetched
+    price_as_of: datetime | None = None
+    stale_price: bool = False
 
 
 class AllocationStrategy(str, Enum):
@@ -64,3 +90,27 @@ class AllocationStrategy(str, Enum):
 class AllocationPlanCreate(SQLModel):
     new_investment: Decimal = get_decimal_field()
     allocation_strategy: AllocationStrategy | None = None
+
+
+class RebalancePlanCreate(AllocationPlanCreate):
+    # Trades are made in multiples of the lot size, e.g. 1 for whole shares, or
+    # in fractional quantities when it is not set
+    lot_size: Decimal | None = get_decimal_field(default=None, ge=None, gt=0)
+    min_trade: Decimal = get_decimal_field(default=Decimal("0"))
+    allow_sells: bool = False
+
+
+class RebalancePlanItem(SQLModel):
+    security_id: UUID
+    symbol: str
+    price: Decimal = get_decimal_field()
+    # Positive for buys and negative for sells
+    quantity: Decimal = get_decimal_field(ge=None)
+    amount: Decimal = get_decimal_field(ge=None)
+    current_value: Decimal = get_decimal_field()
+    value_after: Decimal = get_decimal_field()
+    effective_target_allocation: Decimal = get_decimal_field(le=1)
+    current_weight: Decimal = get_decimal_field(le=1)
+    weight_after: Decimal = get_decimal_field(le=1)
+    price_as_of: datetime | None = None
+    stale_price: bool = False
@@ -0,0 +1,35 @@
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import Column, Index
+from sqlmodel import JSON, Field, Relationship
+
+from app.models.generic import BaseTableModel, get_decimal_field
+
+
+class TransactionCheckpoint(BaseTableModel, table=True):
+    """Account and securities state right after a given transaction.
+
+    Transactions are ordered by ``(created_at, id)``; a checkpoint covers every
+    transaction up to and including ``(last_transaction_at, last_transaction_id)``.
+    """
+
+    __tablename__: str = "transaction_checkpoints"
+    __table_args__ = (
+        Index(
+            "ix_transaction_checkpoints_account_id_last_transaction_at",
+            "account_id",
+            "last_transaction_at",
+            "last_transaction_id",
+        ),
+    )
+
+    account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
+    account: "Account" = Relationship(back_populates="checkpoints")  # type: ignore
+
+    transaction_count: int
+    last_transaction_at: datetime
+    last_transaction_id: UUID
+    buying_power: Decimal = get_decimal_field(default=Decimal("0"))
+    securities: dict = Field(sa_column=Column(JSON), default_factory=dict)
@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
 
 from sqlmodel import Session
 
@@ -16,6 +18,9 @@ class TradeTransactionContext:
     type: TradeType
     trade: TradeCreate
     ledger: None = None
+    timestamp: datetime | None = None
+    # Id of the trade, if it is stored, to link it to the gains it realizes
+    trade_id: UUID | None = None
 
 
 @dataclass
@@ -26,6 +31,7 @@ class LedgerTransactionContext:
     ledger: LedgerCreate
     security: None = None
     trade: None = None
+    timestamp: datetime | None = None
 
 
 TransactionContext = TradeTransactionContext | LedgerTransactionContext
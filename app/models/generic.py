@@ -1,5 +1,6 @@
 from collections.abc import Sequence
 from datetime import datetime, timezone
+from enum import Enum
 from typing import Any
 from uuid import UUID, uuid4
 
@@ -36,9 +37,16 @@ def auto_update_timestamp(session, flush_context, instances):
             obj.updated_at = datetime.now(timezone.utc)
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class Meta(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     count: int | None = Field(default=None)
+    next_cursor: str | None = Field(default=None)
+    prev_cursor: str | None = Field(default=None)
 
 
 class ResponseBase(BaseModel):
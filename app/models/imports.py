@@ -0,0 +1,33 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+from sqlmodel import SQLModel
+
+
+class ImportKind(str, Enum):
+    TRADE = "trade"
+    LEDGER = "ledger"
+
+
+class ImportRow(SQLModel):
+    """A trade or ledger entry of a bulk import.
+
+    Trades reference their security by `security_id` or by `symbol`. Rows
+    without `created_at` are stamped with the time of the import.
+    """
+
+    kind: ImportKind
+    type: str
+    created_at: datetime | None = None
+    security_id: UUID | None = None
+    symbol: str | None = None
+    quantity: Decimal | None = None
+    price: Decimal | None = None
+    amount: Decimal | None = None
+
+
+class ImportResult(SQLModel):
+    trades: int
+    ledger: int
@@ -0,0 +1,22 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlmodel import Field
+
+from app.models.generic import BaseTableModel, get_decimal_field
+
+
+class Instrument(BaseTableModel, table=True):
+    """Name and latest quote of a symbol.
+
+    Quotes are stored once per symbol and shared by every security holding it,
+    so a price update is a single row write regardless of how many accounts
+    hold the symbol.
+    """
+
+    __tablename__: str = "instruments"
+
+    symbol: str = Field(index=True, unique=True)
+    name: str = ""
+    latest_price: Decimal = get_decimal_field(default=0)
+    price_updated_at: datetime | None = None
@@ -3,6 +3,7 @@ from decimal import Decimal
 from enum import Enum
 from uuid import UUID
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.models.generic import BaseTableModel, get_decimal_field
@@ -20,6 +21,9 @@ class LedgerBase(SQLModel):
 
 class Ledger(BaseTableModel, LedgerBase, table=True):
     __tablename__: str = "ledger"
+    __table_args__ = (
+        Index("ix_ledger_account_id_created_at", "account_id", "created_at"),
+    )
 
     account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
     account: "Account" = Relationship(back_populates="ledger")  # type: ignore
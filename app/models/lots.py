@@ -0,0 +1,58 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+from sqlalchemy import Index, UniqueConstraint, text
+from sqlmodel import Field, Relationship
+
+from app.models.generic import BaseTableModel, get_decimal_field
+
+
+class CostBasisMethod(str, Enum):
+    """Order in which a sell consumes the open lots of a security, or, with
+    `AVERAGE`, cost of the quantity sold at the security's average price."""
+
+    FIFO = "fifo"
+    LIFO = "lifo"
+    HIFO = "hifo"
+    AVERAGE = "average"
+
+
+class Lot(BaseTableModel, table=True):
+    """Quantity of a security acquired by a single buy.
+
+    Lots are numbered per security in acquisition order by `sequence`; sells
+    reduce `remaining_quantity` of the lots they consume.
+    """
+
+    __tablename__: str = "lots"
+    __table_args__ = (
+        UniqueConstraint("security_id", "sequence"),
+        Index("ix_lots_account_id_acquired_at", "account_id", "acquired_at"),
+        # Open lots only, in the order each cost basis method consumes them
+        Index(
+            "ix_lots_security_id_sequence_open",
+            "security_id",
+            "sequence",
+            sqlite_where=text("remaining_quantity > 0"),
+            postgresql_where=text("remaining_quantity > 0"),
+        ),
+        Index(
+            "ix_lots_security_id_price_open",
+            "security_id",
+            text("price DESC"),
+            "sequence",
+            sqlite_where=text("remaining_quantity > 0"),
+            postgresql_where=text("remaining_quantity > 0"),
+        ),
+    )
+
+    account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
+    security_id: UUID = Field(foreign_key="securities.id", ondelete="CASCADE")
+    security: "Security" = Relationship(back_populates="lots")  # type: ignore
+    sequence: int
+    quantity: Decimal = get_decimal_field()
+    remaining_quantity: Decimal = get_decimal_field()
+    price: Decimal = get_decimal_field()
+    acquired_at: datetime
@@ -0,0 +1,25 @@
+from datetime import date
+from decimal import Decimal
+from uuid import UUID
+
+from sqlmodel import SQLModel
+
+
+class SecurityPerformance(SQLModel):
+    security_id: UUID
+    symbol: str
+    twr: Decimal | None = None
+    xirr: Decimal | None = None
+
+
+class AccountPerformance(SQLModel):
+    """Returns of an account and of each security it traded from `since` to
+    `until`. Returns that cannot be computed, such as those of a period
+    without anything invested, are null."""
+
+    account_id: UUID
+    since: date
+    until: date
+    twr: Decimal | None = None
+    xirr: Decimal | None = None
+    securities: list[SecurityPerformance] = []
@@ -0,0 +1,35 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import PrimaryKeyConstraint
+from sqlmodel import SQLModel
+
+from app.models.generic import get_decimal_field
+
+
+class DailyPriceBase(SQLModel):
+    symbol: str
+    date: date
+    close: Decimal = get_decimal_field()
+
+
+class DailyPrice(DailyPriceBase, table=True):
+    """Closing price of a symbol on a day.
+
+    Keyed by ``(symbol, date)`` only, without the id and timestamps of other
+    tables, to keep years of history for many symbols compact.
+    """
+
+    __tablename__: str = "daily_prices"
+    __table_args__ = (PrimaryKeyConstraint("symbol", "date"),)
+
+
+class PriceImportResult(SQLModel):
+    prices: int
+
+
+class PortfolioValuePoint(SQLModel):
+    date: date
+    market_value: Decimal = get_decimal_field()
+    cash: Decimal = get_decimal_field()
+    total: Decimal = get_decimal_field()
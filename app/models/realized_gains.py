@@ -0,0 +1,58 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+from sqlalchemy import Column, Index
+from sqlmodel import JSON, Field, Relationship, SQLModel
+
+from app.models.generic import BaseTableModel, get_decimal_field
+
+
+class RealizedGain(BaseTableModel, table=True):
+    """Gain or loss realized by a single sell.
+
+    `cost` is the purchase cost of the quantity sold, taken from the lots the
+    sell consumed, which are listed in `lots`. `holding_days` is the holding
+    period of those lots, weighted by the quantity taken from each.
+    """
+
+    __tablename__: str = "realized_gains"
+    __table_args__ = (
+        Index("ix_realized_gains_account_id_sold_at", "account_id", "sold_at"),
+    )
+
+    account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
+    security_id: UUID = Field(foreign_key="securities.id", ondelete="CASCADE")
+    security: "Security" = Relationship(back_populates="realized_gains")  # type: ignore
+    trade_id: UUID | None = Field(
+        default=None, foreign_key="trades.id", ondelete="CASCADE", index=True
+    )
+    sold_at: datetime
+    quantity: Decimal = get_decimal_field()
+    proceeds: Decimal = get_decimal_field()
+    cost: Decimal = get_decimal_field()
+    gain: Decimal = get_decimal_field(ge=None)
+    holding_days: Decimal = get_decimal_field(decimal_places=2)
+    lots: list = Field(sa_column=Column(JSON), default_factory=list)
+
+
+class RealizedGainPeriod(str, Enum):
+    DAY = "day"
+    MONTH = "month"
+    YEAR = "year"
+
+
+class RealizedGainSummary(SQLModel):
+    """Realized gains of the sells of a period and/or security, or of every
+    sell if not grouped."""
+
+    period: str | None = None
+    security_id: UUID | None = None
+    symbol: str | None = None
+    sells: int
+    quantity: Decimal
+    proceeds: Decimal
+    cost: Decimal
+    gain: Decimal
+    holding_days: Decimal
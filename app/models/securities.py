@@ -2,10 +2,14 @@ from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
-from sqlalchemy import Column
-from sqlmodel import JSON, Field, Relationship, SQLModel
+from sqlalchemy import Index
+from sqlmodel import Field, Relationship, SQLModel
 
 from app.models.generic import BaseTableModel, get_decimal_field
+from app.models.instruments import Instrument
+from app.models.lots import Lot
+from app.models.realized_gains import RealizedGain
+from app.models.snapshots import PositionSnapshot
 from app.models.trades import Trade
 
 
@@ -16,18 +20,41 @@ class SecurityBase(SQLModel):
 
 class Security(BaseTableModel, SecurityBase, table=True):
     __tablename__: str = "securities"
-
-    name: str = ""
+    __table_args__ = (
+        Index("ix_securities_account_id_created_at", "account_id", "created_at"),
+    )
+
+    symbol: str = Field(foreign_key="instruments.symbol")
+    instrument: Instrument | None = Relationship(
+        sa_relationship_kwargs={"lazy": "joined"}
+    )
     cost_basis: Decimal = get_decimal_field(default=0)
     position: Decimal = get_decimal_field(default=0)
     average_price: Decimal = get_decimal_field(default=0)
-    latest_price: Decimal = get_decimal_field(default=0)
 
     account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
     account: list["Account"] = Relationship(back_populates="securities")  # type: ignore
     trades: list[Trade] = Relationship(back_populates="security", cascade_delete=True)
+    snapshots: list[PositionSnapshot] = Relationship(
+        back_populates="security", cascade_delete=True
+    )
+
+    lots: list[Lot] = Relationship(back_populates="security", cascade_delete=True)
+    realized_gains: list[RealizedGain] = Relationship(
+        back_populates="security", cascade_delete=True
+    )
+    # Sequence of the next lot to open, and of the oldest lot that may be open
+    lot_sequence: int = 0
+    lot_cursor: int = 0
+
+    # Name and latest price are shared by every security with the same symbol
+    @property
+    def name(self) -> str:
+        return self.instrument.name if self.instrument else ""
 
-    fifo_lots: list = Field(sa_column=Column(JSON), default_factory=list)
+    @property
+    def latest_price(self) -> Decimal:
+        return self.instrument.latest_price if self.instrument else Decimal(0)
 
 
 class SecurityCreate(SecurityBase):
@@ -52,8 +79,6 @@ class SecurityUpdate(SQLModel):
 
 
 class SecurityServiceUpdate(SQLModel):
-    name: str | None = None
     cost_basis: Decimal = get_decimal_field(default=None)
     position: Decimal = get_decimal_field(default=None)
     average_price: Decimal = get_decimal_field(default=None)
-    latest_price: Decimal = get_decimal_field(default=None)
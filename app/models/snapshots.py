@@ -0,0 +1,35 @@
+from datetime import date
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import Column, Index, UniqueConstraint
+from sqlmodel import JSON, Field, Relationship, SQLModel
+
+from app.models.generic import BaseTableModel, get_decimal_field
+
+
+class PositionSnapshot(BaseTableModel, table=True):
+    """End-of-day state of a security, written as its trades are processed."""
+
+    __tablename__: str = "position_snapshots"
+    __table_args__ = (
+        UniqueConstraint("security_id", "date"),
+        Index("ix_position_snapshots_account_id_date", "account_id", "date"),
+    )
+
+    account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
+    security_id: UUID = Field(foreign_key="securities.id", ondelete="CASCADE")
+    security: "Security" = Relationship(back_populates="snapshots")  # type: ignore
+    date: date
+    position: Decimal = get_decimal_field(default=0)
+    cost_basis: Decimal = get_decimal_field(default=0)
+    average_price: Decimal = get_decimal_field(default=0)
+    lots: list = Field(sa_column=Column(JSON), default_factory=list)
+
+
+class HoldingRead(SQLModel):
+    security_id: UUID
+    symbol: str
+    position: Decimal
+    cost_basis: Decimal
+    average_price: Decimal
@@ -3,6 +3,7 @@ from decimal import Decimal
 from enum import Enum
 from uuid import UUID
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.models.generic import BaseTableModel, get_decimal_field
@@ -22,6 +23,15 @@ class TradeBase(SQLModel):
 
 class Trade(BaseTableModel, TradeBase, table=True):
     __tablename__: str = "trades"
+    __table_args__ = (
+        Index("ix_trades_account_id_created_at", "account_id", "created_at"),
+        Index(
+            "ix_trades_account_id_security_id_created_at",
+            "account_id",
+            "security_id",
+            "created_at",
+        ),
+    )
 
     account_id: UUID = Field(foreign_key="accounts.id", ondelete="CASCADE")
     account: "Account" = Relationship(back_populates="trades")  # type: ignore
@@ -3,6 +3,7 @@ from typing import Annotated
 from uuid import UUID
 
 from pydantic import AfterValidator, EmailStr, computed_field
+from sqlalchemy import Index, func
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.core.config import settings
@@ -30,6 +31,11 @@ class User(BaseTableModel, UserBase, table=True):
     accounts: list[Account] = Relationship(back_populates="user", cascade_delete=True)
 
 
+Index("ix_users_username", User.username)
+Index("ix_users_lower_username", func.lower(User.username))
+Index("ix_users_lower_email", func.lower(User.email))
+
+
 class UserCreate(UserBase):
     username: str = Field(min_length=3, max_length=settings.USERNAME_MAX_LENGTH)
     email: EmailStr
@@ -1,24 +1,31 @@
 from decimal import Decimal
-from uuid import UUID
 
+import numpy as np
 from fastapi import HTTPException, status
 from sqlmodel import Session
 
 from app.constants.messages import Messages
+from app.core.config import settings
 from app.core.logging_config import logger
-from app.models.accounts import Account, AllocationPlanItem, AllocationStrategy
+from app.models.accounts import (
+    Account,
+    AllocationPlanItem,
+    AllocationStrategy,
+    RebalancePlanCreate,
+    RebalancePlanItem,
+)
 from app.models.generic import DetailItem
-from app.services.securities import fetch_tickers_info, update_securities_info
+from app.services.rebalancing import solve_rebalance
+from app.services.securities import fetch_tickers_info, update_instruments_info
 from app.utils import round_decimal
 
 
 def validate_target_allocation(
-    account: Account, new_allocation: Decimal, exclude: list[UUID] = []
+    account: Account, new_allocation: Decimal, replaced: Decimal = Decimal("0")
 ):
-    total_allocations = sum(
-        s.target_allocation for s in account.securities if s.id not in exclude
-    )
-    total_allocations += new_allocation
+    """Check that the account's total target allocation stays within 1 when
+    `new_allocation` is added, replacing an allocation of `replaced`."""
+    total_allocations = account.total_target_allocation - replaced + new_allocation
     if total_allocations > Decimal("1"):
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -40,27 +47,28 @@ class AccountManager:
         self.account = account
 
     def get_total_value(self) -> Decimal:
-        s = sum([s.latest_price * s.position for s in self.account.securities])
-        return Decimal(s)
+        return self.account.market_value
 
     def get_total_allocation(self) -> Decimal:
-        s = sum([s.target_allocation for s in self.account.securities])
-        return Decimal(s)
+        return self.account.total_target_allocation
+
+    def _refresh_prices(self) -> set[str]:
+        """Fetch the latest prices of the account's securities and return the
+        symbols that could not be fetched, which keep their last known price."""
+        # Prices are kept fresh by the background refresher when it is enabled
+        if settings.PRICE_REFRESH_ENABLED:
+            return set()
+        tickers_info = fetch_tickers_info(
+            self.session, [s.symbol for s in self.account.securities]
+        )
+        update_instruments_info(self.session, tickers_info, fields=["latest_price"])
+        return {s for s, info in tickers_info.items() if info.stale}
 
-    def get_allocation_plan(
+    def _validate_total_allocation(
         self,
-        new_investment_amount: Decimal,
-        allocation_strategy: AllocationStrategy | None = None,
+        total_target_allocation: Decimal,
+        allocation_strategy: AllocationStrategy | None,
     ):
-        logger.info(Messages.Allocation.CREATING)
-        tickers_info = fetch_tickers_info([s.symbol for s in self.account.securities])
-        update_securities_info(
-            self.session, self.account.securities, tickers_info, fields=["latest_price"]
-        )
-        current_total_value = self.get_total_value()
-        new_total = current_total_value + new_investment_amount
-        total_target_allocation = self.get_total_allocation()
-
         if total_target_allocation == Decimal("0"):
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -81,6 +89,18 @@ class AccountManager:
                 ).model_dump(),
             )
 
+    def get_allocation_plan(
+        self,
+        new_investment_amount: Decimal,
+        allocation_strategy: AllocationStrategy | None = None,
+    ):
+        logger.info(Messages.Allocation.CREATING)
+        stale = self._refresh_prices()
+        current_total_value = self.get_total_value()
+        new_total = current_total_value + new_investment_amount
+        total_target_allocation = self.get_total_allocation()
+        self._validate_total_allocation(total_target_allocation, allocation_strategy)
+
         plan = []
 
         for sec in self.account.securities:
@@ -111,9 +131,75 @@ class AccountManager:
                 ideal_value=ideal_value,
                 current_weight=current_weight,
                 needed_investment=needed_investment,
+                price_as_of=sec.instrument.price_updated_at if sec.instrument else None,
+                stale_price=sec.symbol in stale,
             )
 
             plan.append(plan_item)
 
         logger.info(Messages.Allocation.CREATED)
         return plan
+
+    def get_rebalance_plan(self, rebalance_in: RebalancePlanCreate):
+        """Trades that bring the account closest to its target allocation
+        without spending more than the new investment plus the proceeds of any
+        sells. See `solve_rebalance`."""
+        logger.info(Messages.Allocation.REBALANCING)
+        stale = self._refresh_prices()
+        current_total_value = self.get_total_value()
+        new_total = current_total_value + rebalance_in.new_investment
+        total_target_allocation = self.get_total_allocation()
+        self._validate_total_allocation(
+            total_target_allocation, rebalance_in.allocation_strategy
+        )
+
+        securities = list(self.account.securities)
+        targets = [s.target_allocation for s in securities]
+        if rebalance_in.allocation_strategy == AllocationStrategy.SCALE:
+            targets = [t / total_target_allocation for t in targets]
+        result = solve_rebalance(
+            positions=np.array([float(s.position) for s in securities]),
+            prices=np.array([float(s.latest_price) for s in securities]),
+            targets=np.array([float(t) for t in targets]),
+            cash=float(rebalance_in.new_investment),
+            lot_size=float(rebalance_in.lot_size) if rebalance_in.lot_size else None,
+            min_trade=float(rebalance_in.min_trade),
+            allow_sells=rebalance_in.allow_sells,
+        )
+
+        plan = []
+        for sec, target_allocation, quantity in zip(
+            securities, targets, result.quantities
+        ):
+            quantity = round_decimal(Decimal(float(quantity)), 8)
+            amount = quantity * sec.latest_price
+            current_value = sec.latest_price * sec.position
+            value_after = current_value + amount
+            current_weight = (
+                current_value / current_total_value
+                if current_total_value != 0
+                else Decimal("0")
+            )
+            weight_after = value_after / new_total if new_total != 0 else Decimal("0")
+
+            plan.append(
+                RebalancePlanItem(
+                    security_id=sec.id,
+                    symbol=sec.symbol,
+                    price=sec.latest_price,
+                    quantity=quantity,
+                    amount=round_decimal(amount, 8),
+                    current_value=round_decimal(current_value, 8),
+                    value_after=round_decimal(value_after, 8),
+                    effective_target_allocation=round_decimal(target_allocation, 2),
+                    current_weight=round_decimal(current_weight, 2),
+                    weight_after=round_decimal(weight_after, 2),
+                    price_as_of=(
+                        sec.instrument.price_updated_at if sec.instrument else None
+                    ),
+                    stale_price=sec.symbol in stale,
+                )
+            )
+
+        logger.info(Messages.Allocation.REBALANCED)
+        return plan
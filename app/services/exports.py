@@ -0,0 +1,76 @@
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from itertools import batched
+from uuid import UUID
+
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, SQLModel
+
+from app import crud
+from app.core.config import settings
+from app.models.accounts import Account
+from app.models.generic import ExportFormat
+from app.models.ledger import LedgerRead
+from app.models.trades import TradeRead
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _serialize(
+    items: Iterable[SQLModel], read_model: type[SQLModel], format: ExportFormat
+) -> Iterator[str]:
+    """Encode `items` as NDJSON or CSV, one chunk per `EXPORT_BATCH_SIZE` rows."""
+    fields = list(read_model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if format == ExportFormat.CSV:
+        writer.writerow(fields)
+
+    for batch in batched(items, settings.EXPORT_BATCH_SIZE):
+        for item in batch:
+            if format == ExportFormat.CSV:
+                data = item.model_dump(mode="json")
+                writer.writerow("" if data[f] is None else data[f] for f in fields)
+            else:
+                buffer.write(item.model_dump_json())
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_trades(
+    bind: Engine | Connection, account_id: UUID, format: ExportFormat
+) -> Iterator[str]:
+    # The response is streamed after the request's session is closed, so the
+    # export reads through a session of its own.
+    with Session(bind) as session:
+        account = session.get(Account, account_id)
+        rows = crud.trades.stream_for_account(
+            session, account, settings.EXPORT_BATCH_SIZE
+        )
+        trades = (
+            TradeRead.model_validate(t, update={"security_symbol": symbol or ""})
+            for t, symbol in rows
+        )
+        yield from _serialize(trades, TradeRead, format)
+
+
+def export_ledger(
+    bind: Engine | Connection, account_id: UUID, format: ExportFormat
+) -> Iterator[str]:
+    with Session(bind) as session:
+        account = session.get(Account, account_id)
+        rows = crud.ledger.stream_for_account(
+            session, account, settings.EXPORT_BATCH_SIZE
+        )
+        ledger = (LedgerRead.model_validate(item) for item in rows)
+        yield from _serialize(ledger, LedgerRead, format)
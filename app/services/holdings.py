@@ -0,0 +1,80 @@
+from datetime import datetime, time, timedelta
+
+from sqlmodel import Session
+
+from app import crud
+from app.models.accounts import Account
+from app.models.contexts import TradeTransactionContext
+from app.models.securities import Security
+from app.models.snapshots import HoldingRead
+from app.models.trades import TradeCreate
+from app.services.lots import MemoryLotBook, load_lots
+from app.services.transactions import SECURITY_OPERATIONS
+from app.utils import to_naive_utc
+
+
+def get_holdings_at(session: Session, account: Account, at: datetime):
+    """Holdings of an account at a point in time.
+
+    Each security starts from its latest snapshot before the day of `at`, and
+    only the trades made after that snapshot are applied on top of it. Only
+    the trades after the earliest of those snapshots are read.
+    """
+    at = to_naive_utc(at)
+
+    snapshots = {
+        s.security_id: s
+        for s in crud.snapshots.get_latest_before(session, account, at.date())
+    }
+    securities = crud.securities.get_all_for_account(session, account)
+
+    states: dict = {}
+    books: dict = {}
+    for sec in securities:
+        snapshot = snapshots.get(sec.id)
+        states[sec.id] = Security(
+            id=sec.id,
+            symbol=sec.symbol,
+            target_allocation=sec.target_allocation,
+            account_id=sec.account_id,
+            position=snapshot.position if snapshot else 0,
+            cost_basis=snapshot.cost_basis if snapshot else 0,
+            average_price=snapshot.average_price if snapshot else 0,
+        )
+        books[sec.id] = MemoryLotBook(
+            load_lots(snapshot.lots) if snapshot else [], account.cost_basis_method
+        )
+
+    # A snapshot is saved on the day of every trade, so a security without one
+    # before the day of `at` has no trades before that day
+    first_day = min(
+        (s.date + timedelta(days=1) for s in snapshots.values()), default=at.date()
+    )
+    since = datetime.combine(first_day, time())
+
+    for trade in crud.trades.get_all_for_account(session, account, since, at):
+        snapshot = snapshots.get(trade.security_id)
+        if snapshot is not None and trade.created_at.date() <= snapshot.date:
+            continue
+        ctx = TradeTransactionContext(
+            session,
+            account,
+            states[trade.security_id],
+            trade.type,
+            TradeCreate.model_validate(trade),
+            timestamp=trade.created_at,
+            trade_id=trade.id,
+        )
+        SECURITY_OPERATIONS[trade.type](ctx, books[trade.security_id])
+
+    return [
+        HoldingRead(
+            security_id=state.id,
+            symbol=state.symbol,
+            position=state.position,
+            cost_basis=state.cost_basis,
+            average_price=state.average_price,
+        )
+        for state in states.values()
+        if state.position > 0
+    ]
@@ -0,0 +1,290 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app import crud
+from app.constants.messages import Messages
+from app.core.logging_config import logger
+from app.models.accounts import Account
+from app.models.contexts import LedgerTransactionContext, TradeTransactionContext
+from app.models.generic import DetailItem
+from app.models.imports import ImportKind, ImportResult, ImportRow
+from app.models.ledger import Ledger, LedgerCreate
+from app.models.lots import CostBasisMethod, Lot
+from app.models.securities import Security
+from app.models.trades import Trade, TradeCreate
+from app.services.lots import MemoryLotBook
+from app.services.transactions import (
+    ACCOUNT_OPERATIONS,
+    SECURITY_OPERATIONS,
+    record_checkpoint_if_due,
+    record_snapshot,
+    update_account_totals,
+)
+from app.utils import to_naive_utc
+
+
+class _ImportedTransaction(NamedTuple):
+    index: int
+    created_at: datetime
+    transaction: TradeCreate | LedgerCreate
+
+
+class _ImportLotBook(MemoryLotBook):
+    """Open lots of a security during an import.
+
+    Starts from the lots stored in the database; the lots opened and the gains
+    realized by the import are collected so they can be inserted together.
+    """
+
+    def __init__(self, session: Session, security: Security, method: CostBasisMethod):
+        super().__init__(crud.lots.get_open(session, security), method)
+        self.security = security
+        self.next_sequence = security.lot_sequence
+        self.opened: list[Lot] = []
+
+    def open(self, *args, **kwargs) -> Lot:
+        lot = super().open(*args, **kwargs)
+        lot.account_id = self.security.account_id
+        lot.security_id = self.security.id
+        self.opened.append(lot)
+        return lot
+
+
+def parse_import_rows(content: bytes, content_type: str) -> list[dict]:
+    """Rows of a JSON array, or of a CSV file with a header line.
+
+    Raises `ValueError` if `content` cannot be read.
+    """
+    text = content.decode("utf-8-sig")
+    if content_type.startswith("text/csv"):
+        try:
+            reader = csv.DictReader(io.StringIO(text))
+            return [{k: v or None for k, v in row.items()} for row in reader]
+        except csv.Error as e:
+            raise ValueError(str(e)) from e
+
+    rows = json.loads(text)
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Expected a JSON array of objects.")
+    return rows
+
+
+def _validation_errors(index: int, error: ValidationError) -> list[DetailItem]:
+    return [
+        DetailItem(type=e["type"], loc=["body", index, *e["loc"]], msg=e["msg"])
+        for e in error.errors()
+    ]
+
+
+def _validate_rows(
+    rows: list[dict],
+    securities: list[Security],
+    latest: datetime | None,
+) -> tuple[list[_ImportedTransaction], list[DetailItem]]:
+    by_id = {s.id: s for s in securities}
+    by_symbol = {s.symbol: s for s in securities}
+    now = to_naive_utc(datetime.now(timezone.utc))
+
+    transactions: list[_ImportedTransaction] = []
+    errors: list[DetailItem] = []
+    for index, raw in enumerate(rows):
+        try:
+            row = ImportRow.model_validate(raw)
+            if row.kind == ImportKind.TRADE:
+                security = (
+                    by_id.get(row.security_id)
+                    if row.security_id is not None
+                    else by_symbol.get(row.symbol or "")
+                )
+                if security is None:
+                    field = "security_id" if row.security_id is not None else "symbol"
+                    errors.append(
+                        DetailItem(
+                            type="security_not_found",
+                            loc=["body", index, field],
+                            msg=Messages.Security.NOT_FOUND,
+                        )
+                    )
+                    continue
+                transaction = TradeCreate.model_validate(
+                    row, update={"security_id": security.id}
+                )
+            else:
+                transaction = LedgerCreate.model_validate(row)
+        except ValidationError as e:
+            errors.extend(_validation_errors(index, e))
+            continue
+
+        created_at = to_naive_utc(row.created_at) if row.created_at else now
+        if latest is not None and created_at <= latest:
+            errors.append(
+                DetailItem(
+                    type="before_latest_transaction",
+                    loc=["body", index, "created_at"],
+                    msg=Messages.Import.BEFORE_LATEST_TRANSACTION,
+                )
+            )
+            continue
+        transactions.append(_ImportedTransaction(index, created_at, transaction))
+
+    transactions.sort(key=lambda t: (t.created_at, t.index))
+
+    # Reprocessing orders transactions sharing a time by their random ids, so
+    # those rows are moved a microsecond apart to keep the order of the file
+    for i in range(1, len(transactions)):
+        previous = transactions[i - 1].created_at
+        if transactions[i].created_at <= previous:
+            transactions[i] = transactions[i]._replace(
+                created_at=previous + timedelta(microseconds=1)
+            )
+    return transactions, errors
+
+
+def _raise_row_errors(errors: list[DetailItem]):
+    raise HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=[e.model_dump() for e in errors],
+    )
+
+
+def import_transactions(
+    session: Session, account: Account, rows: list[dict]
+) -> ImportResult:
+    """Validate, apply and insert a batch of trades and ledger entries.
+
+    Rows are applied in chronological order, with the account, its securities
+    and their lots kept in memory, and everything is inserted in a single
+    transaction. Imported transactions must come after the account's latest
+    one. If any row is invalid or cannot be processed, nothing is imported
+    and the errors of every row are reported.
+    """
+    logger.info(Messages.Import.importing(len(rows)))
+
+    securities = list(crud.securities.get_all_for_account(session, account))
+    latest = max(
+        filter(
+            None,
+            [
+                crud.trades.get_last_created_at(session, account),
+                crud.ledger.get_last_created_at(session, account),
+            ],
+        ),
+        default=None,
+    )
+    transactions, errors = _validate_rows(rows, securities, latest)
+    if errors:
+        _raise_row_errors(errors)
+
+    by_id = {s.id: s for s in securities}
+    books: dict[UUID, _ImportLotBook] = {}
+    snapshot_days: dict[UUID, date] = {}
+    trades: list[Trade] = []
+    ledger: list[Ledger] = []
+
+    try:
+        for index, created_at, transaction in transactions:
+            if isinstance(transaction, TradeCreate):
+                security = by_id[transaction.security_id]
+                if security.id not in books:
+                    books[security.id] = _ImportLotBook(
+                        session, security, account.cost_basis_method
+                    )
+                lots = books[security.id]
+
+                # A security's snapshot for a day is saved once the import
+                # moves past that day
+                day = snapshot_days.get(security.id)
+                if day is not None and day != created_at.date():
+                    record_snapshot(session, security, lots, day, commit=False)
+
+                trade = Trade.model_validate(
+                    transaction,
+                    update={"account_id": account.id, "created_at": created_at},
+                )
+                ctx = TradeTransactionContext(
+                    session,
+                    account,
+                    security,
+                    transaction.type,
+                    transaction,
+                    timestamp=created_at,
+                    trade_id=trade.id,
+                )
+            else:
+                ctx = LedgerTransactionContext(
+                    session,
+                    account,
+                    transaction.type,
+                    transaction,
+                    timestamp=created_at,
+                )
+
+            buying_power = account.buying_power
+            try:
+                ACCOUNT_OPERATIONS[ctx.type](ctx)
+                if ctx.security is not None:
+                    cost_basis = ctx.security.cost_basis
+                    position = ctx.security.position
+                    SECURITY_OPERATIONS[ctx.type](ctx, lots)
+                    update_account_totals(account, ctx.security, cost_basis, position)
+            except ValueError as e:
+                account.buying_power = buying_power
+                errors.append(
+                    DetailItem(
+                        type="cannot_process_transaction",
+                        loc=["body", index],
+                        msg=str(e),
+                    )
+                )
+                continue
+
+            if ctx.security is not None:
+                snapshot_days[ctx.security.id] = created_at.date()
+                trades.append(trade)
+            else:
+                ledger.append(
+                    Ledger.model_validate(
+                        transaction,
+                        update={"account_id": account.id, "created_at": created_at},
+                    )
+                )
+
+        if errors:
+            _raise_row_errors(errors)
+
+        for security_id, lots in books.items():
+            security = by_id[security_id]
+            security.lot_sequence = lots.next_sequence
+            open_lots = lots.open_lots()
+            security.lot_cursor = (
+                open_lots[0].sequence if open_lots else lots.next_sequence
+            )
+            if security_id in snapshot_days:
+                record_snapshot(
+                    session, security, lots, snapshot_days[security_id], commit=False
+                )
+            crud.lots.create_many(session, lots.opened, commit=False)
+            crud.realized_gains.create_many(session, lots.realized, commit=False)
+            crud.securities.update(session, security, commit=False)
+        crud.accounts.update(session, account, commit=False)
+        crud.trades.create_many(session, trades, commit=False)
+        crud.ledger.create_many(session, ledger, commit=False)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    last_txn = max([*trades, *ledger], key=lambda t: (t.created_at, t.id), default=None)
+    if last_txn is not None:
+        record_checkpoint_if_due(session, account, last_txn)
+
+    logger.info(Messages.Import.IMPORTED)
+    return ImportResult(trades=len(trades), ledger=len(ledger))
@@ -0,0 +1,241 @@
+import heapq
+from collections import deque
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from decimal import Decimal
+
+from sqlmodel import Session, col
+
+from app import crud
+from app.models.lots import CostBasisMethod, Lot
+from app.models.realized_gains import RealizedGain
+from app.models.securities import Security
+
+CONSUME_BATCH_SIZE = 16
+
+# Methods that consume lots in acquisition order; average cost consumes lots
+# first in, first out so the open lots still match the position
+IN_SEQUENCE = {CostBasisMethod.FIFO, CostBasisMethod.AVERAGE}
+
+# Order of the other methods; lots in sequence are read from the cursor
+CONSUME_ORDER = {
+    CostBasisMethod.LIFO: [col(Lot.sequence).desc()],
+    CostBasisMethod.HIFO: [col(Lot.price).desc(), col(Lot.sequence)],
+}
+
+
+class DatabaseLotBook:
+    """Lots of a security stored in the lots table.
+
+    Selling reads the open lots in the order of `method` through a partial
+    index of the open lots, so it only reads and writes the lots it consumes.
+    Changes are added to the session and committed by the caller.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        security: Security,
+        method: CostBasisMethod = CostBasisMethod.FIFO,
+    ):
+        self.session = session
+        self.security = security
+        self.method = method
+
+    def open(self, quantity: Decimal, price: Decimal, acquired_at: datetime) -> Lot:
+        lot = Lot(
+            account_id=self.security.account_id,
+            security_id=self.security.id,
+            sequence=self.security.lot_sequence,
+            quantity=quantity,
+            remaining_quantity=quantity,
+            price=price,
+            acquired_at=acquired_at,
+        )
+        self.security.lot_sequence += 1
+        crud.lots.create(self.session, lot, commit=False)
+        return lot
+
+    def consume(self, quantity: Decimal) -> list[tuple[Lot, Decimal]]:
+        consumed: list[tuple[Lot, Decimal]] = []
+        while quantity > 0:
+            lots = crud.lots.get_open(
+                self.session,
+                self.security,
+                limit=CONSUME_BATCH_SIZE,
+                order_by=CONSUME_ORDER.get(self.method),
+            )
+            if not lots:
+                break
+            for lot in lots:
+                taken = min(lot.remaining_quantity, quantity)
+                lot.remaining_quantity -= taken
+                quantity -= taken
+                consumed.append((lot, taken))
+                crud.lots.update(self.session, lot, commit=False)
+                if lot.remaining_quantity == 0 and self.method in IN_SEQUENCE:
+                    self.security.lot_cursor = lot.sequence + 1
+                if quantity == 0:
+                    break
+        return consumed
+
+    def open_lots(self) -> list[Lot]:
+        return list(crud.lots.get_open(self.session, self.security))
+
+    def realize(self, gain: RealizedGain):
+        crud.realized_gains.create(self.session, gain, commit=False)
+
+
+class _LotQueue:
+    """Open lots consumed first in, first out."""
+
+    def __init__(self, lots: Iterable[Lot]):
+        self.lots = deque(lots)
+
+    def push(self, lot: Lot):
+        self.lots.append(lot)
+
+    def peek(self) -> Lot:
+        return self.lots[0]
+
+    def pop(self):
+        self.lots.popleft()
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+    def __iter__(self) -> Iterator[Lot]:
+        return iter(self.lots)
+
+
+class _LotStack:
+    """Open lots consumed last in, first out."""
+
+    def __init__(self, lots: Iterable[Lot]):
+        self.lots = list(lots)
+
+    def push(self, lot: Lot):
+        self.lots.append(lot)
+
+    def peek(self) -> Lot:
+        return self.lots[-1]
+
+    def pop(self):
+        self.lots.pop()
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+    def __iter__(self) -> Iterator[Lot]:
+        return iter(self.lots)
+
+
+class _LotHeap:
+    """Open lots consumed highest price first, oldest first among equal
+    prices."""
+
+    def __init__(self, lots: Iterable[Lot]):
+        self.lots = [(-lot.price, lot.sequence, lot) for lot in lots]
+        heapq.heapify(self.lots)
+
+    def push(self, lot: Lot):
+        heapq.heappush(self.lots, (-lot.price, lot.sequence, lot))
+
+    def peek(self) -> Lot:
+        return self.lots[0][2]
+
+    def pop(self):
+        heapq.heappop(self.lots)
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+    def __iter__(self) -> Iterator[Lot]:
+        return (lot for _, _, lot in self.lots)
+
+
+LOT_CONTAINERS = {
+    CostBasisMethod.FIFO: _LotQueue,
+    CostBasisMethod.AVERAGE: _LotQueue,
+    CostBasisMethod.LIFO: _LotStack,
+    CostBasisMethod.HIFO: _LotHeap,
+}
+
+
+class MemoryLotBook:
+    """Lots kept in memory, for computations that must not touch the database.
+
+    Open lots are held in a queue, a stack or a heap depending on `method`, so
+    each lot a sell takes costs O(1), or O(log n) with a heap. Realized gains
+    are collected in `realized` rather than stored.
+    """
+
+    def __init__(
+        self,
+        lots: Iterable[Lot] = (),
+        method: CostBasisMethod = CostBasisMethod.FIFO,
+    ):
+        lots = sorted(lots, key=lambda lot: lot.sequence)
+        self.method = method
+        self.lots = LOT_CONTAINERS[method](lots)
+        self.next_sequence = lots[-1].sequence + 1 if lots else 0
+        self.realized: list[RealizedGain] = []
+
+    def open(self, quantity: Decimal, price: Decimal, acquired_at: datetime) -> Lot:
+        lot = Lot(
+            sequence=self.next_sequence,
+            quantity=quantity,
+            remaining_quantity=quantity,
+            price=price,
+            acquired_at=acquired_at,
+        )
+        self.next_sequence += 1
+        self.lots.push(lot)
+        return lot
+
+    def consume(self, quantity: Decimal) -> list[tuple[Lot, Decimal]]:
+        consumed: list[tuple[Lot, Decimal]] = []
+        while quantity > 0 and self.lots:
+            lot = self.lots.peek()
+            taken = min(lot.remaining_quantity, quantity)
+            lot.remaining_quantity -= taken
+            quantity -= taken
+            consumed.append((lot, taken))
+            if lot.remaining_quantity == 0:
+                self.lots.pop()
+        return consumed
+
+    def open_lots(self) -> list[Lot]:
+        return sorted(self.lots, key=lambda lot: lot.sequence)
+
+    def realize(self, gain: RealizedGain):
+        self.realized.append(gain)
+
+
+LotBook = DatabaseLotBook | MemoryLotBook
+
+
+def dump_lots(lots: Iterable[Lot]) -> list[dict]:
+    return [
+        {
+            "sequence": lot.sequence,
+            "quantity": str(lot.quantity),
+            "remaining_quantity": str(lot.remaining_quantity),
+            "price": str(lot.price),
+            "acquired_at": lot.acquired_at.isoformat(),
+        }
+        for lot in lots
+    ]
+
+
+def load_lots(data: Iterable[dict]) -> list[Lot]:
+    return [
+        Lot(
+            sequence=item["sequence"],
+            quantity=Decimal(item["quantity"]),
+            remaining_quantity=Decimal(item["remaining_quantity"]),
+            price=Decimal(item["price"]),
+            acquired_at=datetime.fromisoformat(item["acquired_at"]),
+        )
+        for item in data
+    ]
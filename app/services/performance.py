@@ -0,0 +1,192 @@
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+from sqlmodel import Session
+
+from app.core.performance_cache import performance_cache
+from app.models.accounts import Account
+from app.models.performance import AccountPerformance, SecurityPerformance
+from app.services.valuation import compute_value_series, load_flows
+
+
+def time_weighted_returns(values: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """Time-weighted return of each column of daily `values`.
+
+    Row 0 of `values` is the value before the period, and `flows[d]` is the
+    external flow added at the start of day `d` (row 0 of `flows` is ignored).
+    Days that start with nothing invested are left out, and columns that never
+    have anything invested are NaN.
+    """
+    start = values[:-1] + flows[1:]
+    invested = start > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(invested, values[1:] / start, 1.0)
+    return np.where(invested.any(axis=0), growth.prod(axis=0) - 1, np.nan)
+
+
+def money_weighted_returns(
+    amounts: np.ndarray,
+    years: np.ndarray,
+    low: float = -0.9999,
+    high: float = 100.0,
+    tolerance: float = 1e-10,
+    max_iterations: int = 200,
+) -> np.ndarray:
+    """Annual rate that makes the net present value of each column of
+    `amounts`, received `years[d]` years after the start, zero.
+
+    All columns are solved together by bisection between `low` and `high`,
+    evaluating only the non-zero amounts. Columns whose value does not change
+    sign between the bounds, such as those with amounts of a single sign, are
+    NaN.
+    """
+    n = amounts.shape[1]
+    rows, columns = np.nonzero(amounts)
+    values = amounts[rows, columns]
+    t = years[rows]
+
+    def npv(rates: np.ndarray) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            discounted = values * (1 + rates[columns]) ** -t
+        return np.bincount(columns, weights=discounted, minlength=n)
+
+    lo = np.full(n, low)
+    hi = np.full(n, high)
+    f_lo = npv(lo)
+    solvable = np.sign(f_lo) * np.sign(npv(hi)) < 0
+
+    for _ in range(max_iterations):
+        if not np.any((hi - lo)[solvable] > tolerance):
+            break
+        mid = (lo + hi) / 2
+        f_mid = npv(mid)
+        below = np.sign(f_mid) == np.sign(f_lo)
+        lo = np.where(below, mid, lo)
+        f_lo = np.where(below, f_mid, f_lo)
+        hi = np.where(below, hi, mid)
+
+    return np.where(solvable, (lo + hi) / 2, np.nan)
+
+
+def _daily_amounts(
+    days: pd.DatetimeIndex, ids: pd.Index, frame: pd.DataFrame, key: str
+) -> np.ndarray:
+    """Sum of `frame.amount` per day and `frame[key]`, with amounts from
+    before the first day on row 0."""
+    amounts = np.zeros((len(days), len(ids)))
+    rows = days.searchsorted(pd.to_datetime(frame["created_at"]).dt.normalize())
+    kept = rows < len(days)
+    np.add.at(
+        amounts,
+        (rows[kept], ids.get_indexer(frame[key])[kept]),
+        frame["amount"].to_numpy(dtype=float)[kept],
+    )
+    return amounts
+
+
+def _returns(values: np.ndarray, flows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """TWR and XIRR of each column, from the investor's point of view: the
+    starting value and the flows are paid in, and the final value is received."""
+    amounts = -flows
+    amounts[0] = -values[0]
+    amounts[-1] += values[-1]
+    years = np.arange(len(values)) / 365
+    return time_weighted_returns(values, flows), money_weighted_returns(amounts, years)
+
+
+def _to_decimal(value: float) -> Decimal | None:
+    return None if np.isnan(value) else Decimal(str(round(value, 8)))
+
+
+def compute_performance(
+    session: Session,
+    accounts: Sequence[Account],
+    since: date | None = None,
+    until: date | None = None,
+) -> dict[UUID, AccountPerformance]:
+    """TWR and XIRR of several accounts, and of each security they traded, from
+    `since`, or their first transaction, to `until`, or today.
+
+    Deposits and withdrawals are the external flows of an account, and trades
+    those of a security. Values come from the daily value series, and every
+    account and security is solved in the same vectorized pass.
+    """
+    until = until or datetime.now(timezone.utc).date()
+    account_ids = pd.Index([a.id for a in accounts])
+    flows = load_flows(session, list(account_ids), until)
+    since = since or flows.first_day(until)
+    # The day before the period holds the starting values
+    start = since - timedelta(days=1)
+
+    series = compute_value_series(
+        account_ids, flows.trades, flows.cash_flows, flows.closes, start, until
+    )
+    days = series.total.index
+    account_twr, account_xirr = _returns(
+        series.total.to_numpy(),
+        _daily_amounts(days, account_ids, flows.ledger, "account_id"),
+    )
+
+    # Each security is valued as if it were an account of its own
+    trades = flows.trades.assign(account_id=flows.trades["security_id"])
+    security_ids = pd.Index(trades["security_id"].unique())
+    security_series = compute_value_series(
+        security_ids,
+        trades,
+        pd.DataFrame(columns=["account_id", "created_at", "amount"]),
+        flows.closes,
+        start,
+        until,
+    )
+    security_twr, security_xirr = _returns(
+        security_series.market_value.to_numpy(),
+        _daily_amounts(days, security_ids, trades, "security_id"),
+    )
+
+    securities = flows.trades.drop_duplicates("security_id")
+    by_account: dict[UUID, list[SecurityPerformance]] = {a: [] for a in account_ids}
+    for account_id, security_id, symbol in zip(
+        securities["account_id"], securities["security_id"], securities["symbol"]
+    ):
+        i = security_ids.get_loc(security_id)
+        by_account[account_id].append(
+            SecurityPerformance(
+                security_id=security_id,
+                symbol=symbol,
+                twr=_to_decimal(security_twr[i]),
+                xirr=_to_decimal(security_xirr[i]),
+            )
+        )
+
+    return {
+        account_id: AccountPerformance(
+            account_id=account_id,
+            since=since,
+            until=until,
+            twr=_to_decimal(account_twr[i]),
+            xirr=_to_decimal(account_xirr[i]),
+            securities=by_account[account_id],
+        )
+        for i, account_id in enumerate(account_ids)
+    }
+
+
+def get_account_performance(
+    session: Session,
+    account: Account,
+    since: date | None = None,
+    until: date | None = None,
+) -> AccountPerformance:
+    """Performance of an account, cached until one of its transactions
+    changes."""
+    until = until or datetime.now(timezone.utc).date()
+    key = (since, until)
+    performance = performance_cache.get(account.id, key)
+    if performance is None:
+        performance = compute_performance(session, [account], since, until)[account.id]
+        performance_cache.set(account.id, key, performance)
+    return performance
@@ -0,0 +1,83 @@
+import threading
+from itertools import batched
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from app import crud
+from app.constants.messages import Messages
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.integrations import get_tickers_data
+from app.services.securities import get_price_from_ticker
+
+
+def refresh_latest_prices(session: Session, batch_size: int | None = None) -> int:
+    """Fetch the price of every symbol held in any account, `batch_size` symbols
+    per call, and store it as the latest price of its instrument, updating the
+    market value of the accounts holding it. Returns the number of symbols
+    updated.
+
+    A batch that cannot be fetched is skipped, keeping its previous prices.
+    """
+    logger.info(Messages.Security.REFRESHING_PRICES)
+
+    updated = 0
+    symbols = crud.securities.get_distinct_symbols(session)
+    for batch in batched(symbols, batch_size or settings.PRICE_REFRESH_BATCH_SIZE):
+        try:
+            tickers = get_tickers_data(list(batch))
+        except Exception:
+            logger.exception(Messages.External.could_not_fetch_symbols(list(batch)))
+            continue
+
+        prices = {}
+        for symbol in batch:
+            price = get_price_from_ticker(tickers.get(symbol) or {})
+            if price > 0:
+                prices[symbol] = price
+        crud.instruments.update_latest_prices(session, prices, commit=False)
+        crud.accounts.refresh_market_values(session, list(prices))
+        updated += len(prices)
+
+    logger.info(Messages.Security.prices_refreshed(updated))
+    return updated
+
+
+class PriceRefresher:
+    """Runs `refresh_latest_prices` every `interval` seconds on a daemon thread."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        interval: float | None = None,
+        batch_size: int | None = None,
+    ):
+        self.engine = engine
+        self.interval = interval or settings.PRICE_REFRESH_INTERVAL
+        self.batch_size = batch_size or settings.PRICE_REFRESH_BATCH_SIZE
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def run_once(self) -> int:
+        with Session(self.engine) as session:
+            return refresh_latest_prices(session, self.batch_size)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception(Messages.External.COULD_NOT_FETCH)
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,39 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlmodel import Session
+
+from app import crud
+from app.models.accounts import Account
+from app.models.realized_gains import RealizedGainPeriod, RealizedGainSummary
+
+
+def get_realized_gains(
+    session: Session,
+    account: Account,
+    since: date | None = None,
+    until: date | None = None,
+    period: RealizedGainPeriod | None = None,
+    by_security: bool = False,
+) -> list[RealizedGainSummary]:
+    """Totals of the gains realized by the sells of an account from `since` to
+    `until`, both inclusive, grouped by `period` and/or by security.
+
+    The totals are computed by the database from the gains recorded as each
+    sell is processed, so no transaction is replayed.
+    """
+    rows = crud.realized_gains.summarize(
+        session,
+        account,
+        datetime.combine(since, time()) if since else None,
+        datetime.combine(until + timedelta(days=1), time()) if until else None,
+        period,
+        by_security,
+    )
+    return [
+        RealizedGainSummary.model_validate(
+            row._asdict(), update={"holding_days": round(row.holding_days, 2)}
+        )
+        for row in rows
+        # Without grouping, a single row of empty totals is returned
+        if row.sells
+    ]
@@ -0,0 +1,132 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# Tolerance of the float comparisons on quantities and amounts
+EPSILON = 1e-9
+
+
+class RebalanceResult(NamedTuple):
+    quantities: np.ndarray
+    cash_left: float
+
+
+def fill_deficits(deficits: np.ndarray, cash: float) -> np.ndarray:
+    """Amounts to invest in each position, at most `cash` in total, that
+    minimize the sum of the squared remaining deficits.
+
+    The largest deficits are brought down to a common level, found from the
+    sorted deficits in O(n log n).
+    """
+    deficits = np.maximum(deficits, 0)
+    if cash <= 0:
+        return np.zeros_like(deficits)
+    if deficits.sum() <= cash:
+        return deficits
+
+    ordered = np.sort(deficits)[::-1]
+    # Level reached if the cash is spread over the k largest deficits
+    levels = (np.cumsum(ordered) - cash) / np.arange(1, len(ordered) + 1)
+    level = levels[np.nonzero(ordered > levels)[0][-1]]
+    return np.maximum(deficits - level, 0)
+
+
+def _floor_to_lots(quantities: np.ndarray, lot_size: float | None) -> np.ndarray:
+    if not lot_size:
+        return quantities
+    return np.floor(quantities / lot_size + EPSILON) * lot_size
+
+
+def _fill_above_minimum(
+    deficits: np.ndarray, cash: float, min_trade: float
+) -> np.ndarray:
+    """`fill_deficits` without amounts below `min_trade`: positions that would
+    get less are left out and the cash is spread again over the others."""
+    eligible = deficits > 0
+    while True:
+        amounts = fill_deficits(np.where(eligible, deficits, 0), cash)
+        small = (amounts > 0) & (amounts < min_trade - EPSILON)
+        if not small.any():
+            return amounts
+        eligible &= ~small
+
+
+def _top_up(
+    quantities: np.ndarray,
+    deviations: np.ndarray,
+    prices: np.ndarray,
+    tradable: np.ndarray,
+    cash: float,
+    lot_size: float,
+    min_trade: float,
+) -> float:
+    """Spend the cash left after rounding down to whole lots on one more
+    purchase of the positions whose squared deviation from their goal drops
+    the most, in rounds: each round buys, in order of that drop, as many
+    positions as the cash allows. A position not bought yet takes enough lots
+    to reach `min_trade`.
+
+    Updates `quantities` and `deviations` in place and returns the cash left.
+    """
+    lot_cost = lot_size * prices
+    first_lots = np.maximum(1, np.ceil(min_trade / lot_cost))
+    while True:
+        increments = np.where(quantities > 0, lot_cost, lot_cost * first_lots)
+        gains = deviations**2 - (deviations + increments) ** 2
+        candidates = np.flatnonzero(
+            tradable & (gains > 0) & (increments <= cash + EPSILON)
+        )
+        if not candidates.size:
+            return cash
+        candidates = candidates[np.argsort(-gains[candidates], kind="stable")]
+        # The first candidate is affordable, so every round buys something
+        bought = candidates[np.cumsum(increments[candidates]) <= cash + EPSILON]
+        quantities[bought] += increments[bought] / prices[bought]
+        deviations[bought] += increments[bought]
+        cash -= float(increments[bought].sum())
+
+
+def solve_rebalance(
+    positions: np.ndarray,
+    prices: np.ndarray,
+    targets: np.ndarray,
+    cash: float,
+    lot_size: float | None = None,
+    min_trade: float = 0.0,
+    allow_sells: bool = False,
+) -> RebalanceResult:
+    """Quantities to trade in each position so that its value gets as close as
+    possible to its target weight of the portfolio plus `cash`, minimizing the
+    sum of squared deviations.
+
+    Buys never cost more than `cash` plus the proceeds of the sells, which are
+    only made if `allow_sells`. Quantities are multiples of `lot_size`, or
+    fractional if it is None, and no trade is worth less than `min_trade`.
+    Positions without a price are not traded. Quantities are positive for
+    buys and negative for sells.
+    """
+    tradable = prices > 0
+    safe_prices = np.where(tradable, prices, 1)
+    values = positions * prices
+    goals = targets * (values.sum() + cash)
+    quantities = np.zeros_like(values)
+
+    if allow_sells:
+        excess = np.where(tradable, np.maximum(values - goals, 0), 0)
+        sells = _floor_to_lots(excess / safe_prices, lot_size)
+        sells[sells * prices < min_trade - EPSILON] = 0
+        quantities -= sells
+        cash += float((sells * prices).sum())
+
+    deviations = values + quantities * prices - goals
+    amounts = _fill_above_minimum(np.where(tradable, -deviations, 0), cash, min_trade)
+    buys = _floor_to_lots(amounts / safe_prices, lot_size)
+    buys[buys * prices < min_trade - EPSILON] = 0
+    cash -= float((buys * prices).sum())
+    deviations += buys * prices
+
+    if lot_size:
+        cash = _top_up(
+            buys, deviations, safe_prices, tradable, cash, lot_size, min_trade
+        )
+    return RebalanceResult(quantities + buys, max(float(cash), 0.0))
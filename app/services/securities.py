@@ -1,5 +1,5 @@
-from collections.abc import Iterable
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Literal
 
@@ -9,10 +9,13 @@ from sqlmodel import Session
 from app import crud
 from app.constants.messages import Messages
 from app.core.logging_config import logger
+from app.core.quote_cache import quote_cache
 from app.integrations import get_tickers_data
 from app.models.accounts import Account
 from app.models.generic import DetailItem
-from app.models.securities import Security, SecurityCreate
+from app.models.instruments import Instrument
+from app.models.securities import SecurityCreate
+from app.utils import to_naive_utc
 
 
 @dataclass
@@ -22,67 +25,89 @@ class TickerInfo:
     latest_price: Decimal
     category: str
     type: str
+    # When the price was quoted. If the symbol could not be fetched, `error`
+    # is set and the last known price is used instead
+    as_of: datetime | None = None
+    error: str | None = None
 
+    @property
+    def stale(self) -> bool:
+        return self.error is not None
 
-def _get_price_from_ticker(ticker_info: dict):
+
+def get_price_from_ticker(ticker_info: dict):
     for key in ("bid", "previousClose"):
         if key in ticker_info:
             return Decimal(str(ticker_info[key]))
     return Decimal(0)
 
 
-def fetch_tickers_info(symbols: str | list[str]) -> dict[str, TickerInfo]:
+def _fallback_ticker_info(instrument: Instrument | None, symbol: str) -> TickerInfo:
+    return TickerInfo(
+        symbol=symbol,
+        name=instrument.name if instrument else "",
+        latest_price=instrument.latest_price if instrument else Decimal(0),
+        category="",
+        type="",
+        as_of=instrument.price_updated_at if instrument else None,
+        error=Messages.External.could_not_fetch_symbols(symbol),
+    )
+
+
+def fetch_tickers_info(
+    session: Session, symbols: str | list[str]
+) -> dict[str, TickerInfo]:
+    """Ticker info of each symbol.
+
+    Symbols that cannot be fetched do not fail the others: they are marked with
+    an `error` and keep the name and price last stored in their instrument,
+    quoted `as_of` when that price was stored.
+    """
     logger.info(Messages.Security.FETCHING)
 
     if isinstance(symbols, str):
         symbols = [symbols]
 
     try:
-        tickers = get_tickers_data(symbols)
-        out: dict[str, TickerInfo] = {}
-
-        for symbol in symbols:
-            ticker_info = tickers.get(symbol)
-
-            if not ticker_info:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=DetailItem(
-                        type="external_service_error",
-                        loc=[],
-                        msg=Messages.External.could_not_fetch_symbols(symbol),
-                    ).model_dump(),
-                )
-
-            ticker_info = TickerInfo(
-                symbol=symbol,
-                name=ticker_info.get("longName", ""),
-                latest_price=_get_price_from_ticker(ticker_info),
-                category=ticker_info.get("category", ""),
-                type=ticker_info.get("typeDisp", ""),
-            )
-            out[symbol] = ticker_info
-
-        return out
+        tickers = quote_cache.get_many(symbols, get_tickers_data)
     except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=DetailItem(
-                type="external_service_error",
-                loc=[],
-                msg=Messages.External.could_not_fetch_symbols(symbols),
-            ).model_dump(),
+        logger.exception(Messages.External.could_not_fetch_symbols(symbols))
+        tickers = {}
+
+    now = to_naive_utc(datetime.now(timezone.utc))
+    out: dict[str, TickerInfo] = {}
+    failed: list[str] = []
+    for symbol in symbols:
+        ticker_info = tickers.get(symbol)
+        if not ticker_info:
+            failed.append(symbol)
+            continue
+        out[symbol] = TickerInfo(
+            symbol=symbol,
+            name=ticker_info.get("longName", ""),
+            latest_price=get_price_from_ticker(ticker_info),
+            category=ticker_info.get("category", ""),
+            type=ticker_info.get("typeDisp", ""),
+            as_of=now,
         )
 
+    if failed:
+        logger.warning(Messages.External.could_not_fetch_symbols(failed))
+        known = {i.symbol: i for i in crud.instruments.get_many(session, failed)}
+        for symbol in failed:
+            out[symbol] = _fallback_ticker_info(known.get(symbol), symbol)
+    return out
+
 
 def create_security_with_info(
     session: Session, security_in: SecurityCreate, account: Account
 ):
-    tickers_info = fetch_tickers_info(security_in.symbol)
+    tickers_info = fetch_tickers_info(session, security_in.symbol)
     info = tickers_info.get(security_in.symbol)
-    if info is not None and info.name:
+    if info is not None and not info.stale and info.name:
         security = crud.securities.create(session, security_in, account)
-        update_securities_info(session, security, tickers_info)
+        update_instruments_info(session, tickers_info)
+        session.refresh(security)
         return security
     raise HTTPException(
         status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -94,16 +119,22 @@ def create_security_with_info(
     )
 
 
-def update_securities_info(
+def update_instruments_info(
     session: Session,
-    securities: Security | Iterable[Security],
     new_tickers_info: dict[str, TickerInfo],
     fields: list[Literal["name", "latest_price"]] = ["name", "latest_price"],
 ) -> None:
-    if isinstance(securities, Security):
-        securities = [securities]
-    for sec in securities:
+    """Store the fetched `fields` of each symbol in its instrument, writing one
+    row per symbol and committing once. Stale info is not stored. New prices
+    are reflected in the market value of the accounts holding them."""
+    fetched = [s for s, info in new_tickers_info.items() if not info.stale]
+    for instrument in crud.instruments.get_many(session, fetched):
+        info = new_tickers_info[instrument.symbol]
         for field in fields:
-            new_value = getattr(new_tickers_info[sec.symbol], field)
-            setattr(sec, field, new_value)
-        crud.securities.update(session, sec)
+            setattr(instrument, field, getattr(info, field))
+        if "latest_price" in fields:
+            instrument.price_updated_at = info.as_of
+        crud.instruments.update(session, instrument, commit=False)
+    if "latest_price" in fields:
+        crud.accounts.refresh_market_values(session, fetched, commit=False)
+    session.commit()
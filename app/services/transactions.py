@@ -1,15 +1,24 @@
-from collections import deque
+import random
+import time
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
 from decimal import Decimal
+from functools import partial
 from typing import Callable
 from uuid import UUID
 
 from fastapi import HTTPException, status
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 from sqlmodel import Session
 
 from app import crud
 from app.constants.messages import Messages
+from app.core.account_locks import account_locks
+from app.core.config import settings
 from app.core.logging_config import logger
 from app.models.accounts import Account
+from app.models.checkpoints import TransactionCheckpoint
 from app.models.contexts import (
     LedgerTransactionContext,
     TradeTransactionContext,
@@ -17,12 +26,32 @@ from app.models.contexts import (
 )
 from app.models.generic import DetailItem
 from app.models.ledger import Ledger, LedgerCreate, LedgerType
+from app.models.lots import CostBasisMethod, Lot
+from app.models.realized_gains import RealizedGain
+from app.models.securities import Security
+from app.models.snapshots import PositionSnapshot
 from app.models.trades import Trade, TradeCreate, TradeType
-from app.utils import get_average_price
+from app.services.lots import DatabaseLotBook, LotBook, dump_lots, load_lots
+from app.utils import get_average_price, round_decimal, to_naive_utc
+
+SECONDS_PER_DAY = Decimal(86400)
+
+# Scale of the decimal columns the account and security state is stored in.
+# Computed amounts are rounded to it, so that a replay kept in memory gives the
+# same values as transactions stored one at a time
+DECIMAL_PLACES = 8
+
+
+def _to_scale(value: Decimal) -> Decimal:
+    return round_decimal(value, DECIMAL_PLACES)
+
+
+def _get_timestamp(ctx: TransactionContext) -> datetime:
+    return ctx.timestamp or datetime.now(timezone.utc)
 
 
 def _buy_update_account(ctx: TradeTransactionContext):
-    total = ctx.trade.quantity * ctx.trade.price
+    total = _to_scale(ctx.trade.quantity * ctx.trade.price)
     if total > ctx.account.buying_power:
         raise ValueError(
             Messages.Transaction.Validation.value_cannot_be_greater_than_buying_power(
@@ -33,26 +62,25 @@ def _buy_update_account(ctx: TradeTransactionContext):
 
 
 def _sell_update_account(ctx: TradeTransactionContext):
-    ctx.account.buying_power += ctx.trade.quantity * ctx.trade.price
-
+    ctx.account.buying_power += _to_scale(ctx.trade.quantity * ctx.trade.price)
 
-def _buy_update_security(ctx: TradeTransactionContext):
-    fifo_lots = deque(ctx.security.fifo_lots)
 
-    new_cost_basis = ctx.security.cost_basis + ctx.trade.quantity * ctx.trade.price
+def _buy_update_security(ctx: TradeTransactionContext, lots: LotBook):
+    new_cost_basis = ctx.security.cost_basis + _to_scale(
+        ctx.trade.quantity * ctx.trade.price
+    )
     new_position = ctx.security.position + ctx.trade.quantity
 
-    fifo_lots.append((str(ctx.trade.quantity), str(ctx.trade.price)))
-    ctx.security.fifo_lots = list(fifo_lots)
+    lots.open(ctx.trade.quantity, ctx.trade.price, _get_timestamp(ctx))
 
     ctx.security.cost_basis = new_cost_basis
     ctx.security.position = new_position
-    ctx.security.average_price = get_average_price(new_cost_basis, new_position)
-
+    ctx.security.average_price = _to_scale(
+        get_average_price(new_cost_basis, new_position)
+    )
 
-def _sell_update_security(ctx: TradeTransactionContext):
-    fifo_lots = deque(ctx.security.fifo_lots)
 
+def _sell_update_security(ctx: TradeTransactionContext, lots: LotBook):
     if ctx.security.position < ctx.trade.quantity:
         raise ValueError(
             Messages.Transaction.Validation.quantity_cannot_be_greater_than_position(
@@ -60,34 +88,62 @@ def _sell_update_security(ctx: TradeTransactionContext):
             )
         )
 
-    sell_quantity = ctx.trade.quantity
-    total_cost_removed = Decimal("0")
-
-    # Process FIFO queue
-    while sell_quantity > 0 and fifo_lots:
-        first_lot_quantity, first_lot_price = fifo_lots[0]
-        first_lot_quantity = Decimal(first_lot_quantity)
-        first_lot_price = Decimal(first_lot_price)
-
-        if first_lot_quantity <= sell_quantity:
-            total_cost_removed += first_lot_quantity * first_lot_price
-            sell_quantity -= first_lot_quantity
-            fifo_lots.popleft()
-        else:
-            total_cost_removed += sell_quantity * first_lot_price
-            fifo_lots[0] = (
-                str(first_lot_quantity - sell_quantity),
-                str(first_lot_price),
-            )
-            sell_quantity = 0
-        ctx.security.fifo_lots = list(fifo_lots)
+    consumed = lots.consume(ctx.trade.quantity)
+    if lots.method == CostBasisMethod.AVERAGE:
+        total_cost_removed = _to_scale(
+            ctx.security.cost_basis * ctx.trade.quantity / ctx.security.position
+        )
+    else:
+        total_cost_removed = sum(
+            (_to_scale(quantity * lot.price) for lot, quantity in consumed),
+            Decimal("0"),
+        )
 
     new_cost_basis = ctx.security.cost_basis - total_cost_removed
     new_position = ctx.security.position - ctx.trade.quantity
 
     ctx.security.cost_basis = new_cost_basis
     ctx.security.position = new_position
-    ctx.security.average_price = get_average_price(new_cost_basis, new_position)
+    ctx.security.average_price = _to_scale(
+        get_average_price(new_cost_basis, new_position)
+    )
+
+    lots.realize(_build_realized_gain(ctx, consumed, total_cost_removed))
+
+
+def _build_realized_gain(
+    ctx: TradeTransactionContext, consumed: list[tuple[Lot, Decimal]], cost: Decimal
+) -> RealizedGain:
+    sold_at = to_naive_utc(_get_timestamp(ctx))
+    proceeds = _to_scale(ctx.trade.quantity * ctx.trade.price)
+    seconds_held = sum(
+        (
+            quantity
+            * Decimal((sold_at - to_naive_utc(lot.acquired_at)).total_seconds())
+            for lot, quantity in consumed
+        ),
+        Decimal("0"),
+    )
+    return RealizedGain(
+        account_id=ctx.security.account_id,
+        security_id=ctx.security.id,
+        trade_id=ctx.trade_id,
+        sold_at=sold_at,
+        quantity=ctx.trade.quantity,
+        proceeds=proceeds,
+        cost=cost,
+        gain=proceeds - cost,
+        holding_days=round(seconds_held / ctx.trade.quantity / SECONDS_PER_DAY, 2),
+        lots=[
+            {
+                "sequence": lot.sequence,
+                "quantity": str(quantity),
+                "price": str(lot.price),
+                "acquired_at": lot.acquired_at.isoformat(),
+            }
+            for lot, quantity in consumed
+        ],
+    )
 
 
 def _deposit_update_account(ctx: LedgerTransactionContext):
@@ -114,17 +170,69 @@ SECURITY_OPERATIONS: dict[TradeType | LedgerType, Callable] = {
 }
 
 
-def process_transaction(ctx: TransactionContext):
+def update_account_totals(
+    account: Account, security: Security, cost_basis: Decimal, position: Decimal
+):
+    """Add the change of a security from `cost_basis` and `position` to the
+    totals of its account."""
+    account.total_cost_basis += security.cost_basis - cost_basis
+    account.market_value += (security.position - position) * security.latest_price
+
+
+def reset_account_totals(account: Account, securities: Iterable[Security]):
+    """Set the totals of an account to those of its `securities`."""
+    securities = list(securities)
+    account.total_target_allocation = sum(
+        (s.target_allocation for s in securities), Decimal("0")
+    )
+    account.total_cost_basis = sum((s.cost_basis for s in securities), Decimal("0"))
+    account.market_value = sum(
+        (s.position * s.latest_price for s in securities), Decimal("0")
+    )
+
+
+def record_snapshot(
+    session: Session, security: Security, lots: LotBook, day: date, commit: bool
+):
+    """Save the current state of a security as its snapshot for `day`."""
+    snapshot = crud.snapshots.get_for_day(session, security, day)
+    if snapshot is None:
+        snapshot = PositionSnapshot(
+            account_id=security.account_id, security_id=security.id, date=day
+        )
+    snapshot.position = security.position
+    snapshot.cost_basis = security.cost_basis
+    snapshot.average_price = security.average_price
+    snapshot.lots = dump_lots(lots.open_lots())
+    crud.snapshots.save(session, snapshot, commit=commit)
+
+
+def process_transaction(ctx: TransactionContext, commit: bool = True):
+    """Apply a transaction to its account and security, and update the
+    security's snapshot for the day of the transaction.
+
+    With `commit=False` the changes are only added to the session, so several
+    transactions can be committed together by the caller. A failed transaction
+    rolls the session back.
+    """
     logger.info(Messages.Transaction.processing(ctx.type.value))
     try:
         if ctx.account is not None:
             ACCOUNT_OPERATIONS[ctx.type](ctx)
-            crud.accounts.update(ctx.session, ctx.account)
+            crud.accounts.update(ctx.session, ctx.account, commit=commit)
         if ctx.security is not None:
-            SECURITY_OPERATIONS[ctx.type](ctx)
-            crud.securities.update(ctx.session, ctx.security)
+            lots = DatabaseLotBook(
+                ctx.session, ctx.security, ctx.account.cost_basis_method
+            )
+            cost_basis, position = ctx.security.cost_basis, ctx.security.position
+            SECURITY_OPERATIONS[ctx.type](ctx, lots)
+            update_account_totals(ctx.account, ctx.security, cost_basis, position)
+            day = _get_timestamp(ctx).date()
+            record_snapshot(ctx.session, ctx.security, lots, day, commit=False)
+            crud.securities.update(ctx.session, ctx.security, commit=commit)
         logger.info(Messages.Transaction.PROCESSED)
     except ValueError as e:
+        ctx.session.rollback()
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=DetailItem(
@@ -135,44 +243,260 @@ def process_transaction(ctx: TransactionContext):
         )
 
 
+def _is_write_conflict(error: Exception) -> bool:
+    """Whether `error` means another transaction changed the account first:
+    its version changed, SQLite's write lock timed out, or PostgreSQL aborted
+    the transaction as a serialization failure or deadlock."""
+    if isinstance(error, StaleDataError):
+        return True
+    if isinstance(error, OperationalError):
+        return "database is locked" in str(error.orig) or getattr(
+            error.orig, "pgcode", None
+        ) in ("40001", "40P01")
+    return False
+
+
+def run_account_write[T](
+    session: Session, account: Account, write: Callable[[], T]
+) -> T:
+    """Run `write`, which changes `account` and commits, after the other writes
+    to the account.
+
+    Writes from this process wait for each other, and a write that conflicts
+    with one from another process is rolled back and run again, with the
+    account reloaded, up to ACCOUNT_WRITE_RETRIES times. `write` must read
+    everything it changes, so that running it again is safe.
+    """
+    with account_locks.hold(account.id) as waited:
+        if waited:
+            session.expire_all()
+        attempt = 0
+        while True:
+            try:
+                return write()
+            except (StaleDataError, OperationalError) as e:
+                session.rollback()
+                if not _is_write_conflict(e):
+                    raise
+                if attempt >= settings.ACCOUNT_WRITE_RETRIES:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=DetailItem(
+                            type="account_write_conflict",
+                            loc=[],
+                            msg=Messages.Account.WRITE_CONFLICT,
+                        ).model_dump(),
+                    )
+                attempt += 1
+                logger.warning(Messages.Account.retrying_write(attempt))
+                time.sleep(
+                    random.uniform(0, settings.ACCOUNT_WRITE_BACKOFF * 2**attempt)
+                )
+
+
+def _sort_key(txn: Trade | Ledger):
+    return (txn.created_at, txn.id)
+
+
+def _get_transaction(session: Session, id: UUID) -> Trade | Ledger | None:
+    return session.get(Trade, id) or session.get(Ledger, id)
+
+
+def _build_checkpoint(
+    session: Session,
+    account: Account,
+    securities: Iterable[Security],
+    last_txn: Trade | Ledger,
+    transaction_count: int,
+):
+    return TransactionCheckpoint(
+        account_id=account.id,
+        transaction_count=transaction_count,
+        last_transaction_at=last_txn.created_at,
+        last_transaction_id=last_txn.id,
+        buying_power=_to_scale(account.buying_power),
+        securities={
+            str(s.id): {
+                "position": str(_to_scale(s.position)),
+                "cost_basis": str(_to_scale(s.cost_basis)),
+                "average_price": str(_to_scale(s.average_price)),
+                "lot_sequence": s.lot_sequence,
+                "lot_cursor": s.lot_cursor,
+                "lots": dump_lots(DatabaseLotBook(session, s).open_lots()),
+            }
+            for s in securities
+        },
+    )
+
+
+def _restore_checkpoint(
+    session: Session,
+    account: Account,
+    securities: Iterable[Security],
+    checkpoint: TransactionCheckpoint | None,
+):
+    """Reset the account, its securities and their lots to the state saved in
+    `checkpoint`, or to an empty state if there is no checkpoint."""
+    securities = list(securities)
+    account.buying_power = _to_scale(
+        checkpoint.buying_power if checkpoint else Decimal("0")
+    )
+    saved = checkpoint.securities if checkpoint else {}
+    for s in securities:
+        state = saved.get(str(s.id), {})
+        s.position = _to_scale(Decimal(state.get("position", "0")))
+        s.cost_basis = _to_scale(Decimal(state.get("cost_basis", "0")))
+        s.average_price = _to_scale(Decimal(state.get("average_price", "0")))
+        s.lot_sequence = state.get("lot_sequence", 0)
+        s.lot_cursor = state.get("lot_cursor", 0)
+
+        # Lots opened later are dropped; lots consumed later are reopened
+        crud.lots.delete_from_sequence(session, s, s.lot_sequence, commit=False)
+        for lot in load_lots(state.get("lots", [])):
+            crud.lots.set_remaining_quantity(
+                session, s, lot.sequence, lot.remaining_quantity, commit=False
+            )
+    reset_account_totals(account, securities)
+
+
+def record_checkpoint_if_due(
+    session: Session, account: Account, last_txn: Trade | Ledger, commit: bool = True
+):
+    """Save the current account state if enough transactions were processed
+    since the latest checkpoint. `last_txn` must be the newest transaction."""
+    transaction_count = crud.trades.count_for_account(
+        session, account
+    ) + crud.ledger.count_for_account(session, account)
+    latest = crud.checkpoints.get_latest(session, account)
+    covered = latest.transaction_count if latest else 0
+    if transaction_count - covered < settings.TRANSACTION_CHECKPOINT_INTERVAL:
+        return
+
+    securities = crud.securities.get_all_for_account(session, account)
+    checkpoint = _build_checkpoint(
+        session, account, securities, last_txn, transaction_count
+    )
+    crud.checkpoints.create(session, checkpoint, commit=commit)
+
+
 def reprocess_transactions_excluding(
     session: Session, account: Account, exclude: list[UUID]
 ):
-    """Reprocess all transactions for a given account, excluding some by id."""
+    """Reprocess the transactions of an account, excluding some by id.
+
+    Replay starts from the latest checkpoint preceding the earliest excluded
+    transaction, so only the transactions after it are processed again; with
+    nothing excluded, every transaction is. Snapshots are rebuilt from the
+    checkpoint's day, starting from the checkpoint's state for securities
+    traded earlier that day. Everything, including the checkpoints replacing
+    those that covered an excluded transaction, is committed at once; on
+    failure the account is left untouched.
+    """
     logger.info(Messages.Transaction.REPROCESSING_ALL)
-    account.buying_power = Decimal("0")
 
-    securities = list(crud.securities.get_all_for_account(session, account))
-    for s in securities:
-        s.position = Decimal("0")
-        s.cost_basis = Decimal("0")
-        s.average_price = Decimal("0")
-        s.fifo_lots = []
-
-    trade_items = list(crud.trades.get_all_for_account(session, account))
-    ledger_items = list(crud.ledger.get_all_for_account(session, account))
-
-    transactions = trade_items + ledger_items
-    transactions.sort(key=lambda item: item.updated_at)
-
-    for txn in transactions:
-        if txn.id in exclude:
-            continue
-        if isinstance(txn, Trade):
-            ctx = TradeTransactionContext(
-                session,
-                account,
-                txn.security,
-                txn.type,
-                TradeCreate.model_validate(txn),
+    excluded = [txn for txn in map(partial(_get_transaction, session), exclude) if txn]
+    boundary = min((txn.created_at for txn in excluded), default=None)
+    checkpoint = (
+        crud.checkpoints.get_latest_before(session, account, boundary)
+        if boundary is not None
+        else None
+    )
+    if checkpoint is not None:
+        logger.info(
+            Messages.Transaction.reprocessing_from_checkpoint(
+                checkpoint.transaction_count
             )
-        if isinstance(txn, Ledger):
-            ctx = LedgerTransactionContext(
-                session,
-                account,
-                txn.type,
-                LedgerCreate.model_validate(txn),
-            )
-        process_transaction(ctx)
+        )
+
+    try:
+        start = checkpoint.last_transaction_at.date() if checkpoint else None
+        traded_on_start = (
+            {
+                snapshot.security_id
+                for snapshot in crud.snapshots.get_all_for_day(session, account, start)
+            }
+            if start is not None
+            else set()
+        )
+        crud.snapshots.delete_from(session, account, start, commit=False)
+        securities = list(crud.securities.get_all_for_account(session, account))
+        _restore_checkpoint(session, account, securities, checkpoint)
+        for s in securities:
+            if s.id in traded_on_start:
+                record_snapshot(
+                    session, s, DatabaseLotBook(session, s), start, commit=False
+                )
+
+        since = checkpoint.last_transaction_at if checkpoint else None
+        checkpoint_key = (
+            (checkpoint.last_transaction_at, checkpoint.last_transaction_id)
+            if checkpoint
+            else None
+        )
+        crud.realized_gains.delete_after(session, account, checkpoint_key, commit=False)
+        transactions = [
+            *crud.trades.get_all_for_account(session, account, since),
+            *crud.ledger.get_all_for_account(session, account, since),
+        ]
+        if checkpoint_key is not None:
+            transactions = [t for t in transactions if _sort_key(t) > checkpoint_key]
+        transactions.sort(key=_sort_key)
+
+        transaction_count = checkpoint.transaction_count if checkpoint else 0
+        new_checkpoints = []
+        for txn in transactions:
+            if txn.id in exclude:
+                continue
+            if isinstance(txn, Trade):
+                ctx = TradeTransactionContext(
+                    session,
+                    account,
+                    txn.security,
+                    txn.type,
+                    TradeCreate.model_validate(txn),
+                    timestamp=txn.created_at,
+                    trade_id=txn.id,
+                )
+            if isinstance(txn, Ledger):
+                ctx = LedgerTransactionContext(
+                    session,
+                    account,
+                    txn.type,
+                    LedgerCreate.model_validate(txn),
+                    timestamp=txn.created_at,
+                )
+            process_transaction(ctx, commit=False)
+
+            transaction_count += 1
+            if transaction_count % settings.TRANSACTION_CHECKPOINT_INTERVAL == 0:
+                new_checkpoints.append(
+                    _build_checkpoint(
+                        session, account, securities, txn, transaction_count
+                    )
+                )
+
+        crud.checkpoints.delete_from(session, account, boundary, commit=False)
+        for new_checkpoint in new_checkpoints:
+            crud.checkpoints.create(session, new_checkpoint, commit=False)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
 
     logger.info(Messages.Transaction.REPROCESSED_ALL)
+
+
+def change_cost_basis_method(
+    session: Session, account: Account, method: CostBasisMethod
+):
+    """Switch an account to another cost basis method.
+
+    Every transaction of the account is replayed with the new method, and its
+    securities, lots, snapshots, checkpoints and realized gains are replaced
+    in a single commit.
+    """
+    if method == account.cost_basis_method:
+        return
+    logger.info(Messages.Account.changing_cost_basis_method(method.value))
+    account.cost_basis_method = method
+    reprocess_transactions_excluding(session, account, exclude=[])
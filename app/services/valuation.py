@@ -0,0 +1,285 @@
+from collections.abc import Sequence
+from datetime import date, datetime, time, timezone
+from typing import NamedTuple
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app import crud
+from app.constants.messages import Messages
+from app.core.logging_config import logger
+from app.core.performance_cache import performance_cache
+from app.models.accounts import Account
+from app.models.generic import DetailItem
+from app.models.ledger import LedgerType
+from app.models.prices import DailyPriceBase, PortfolioValuePoint, PriceImportResult
+from app.models.trades import TradeType
+
+
+class ValueSeries(NamedTuple):
+    """Daily market value of the holdings and cash of several accounts, as
+    frames with a row per day and a column per account."""
+
+    market_value: pd.DataFrame
+    cash: pd.DataFrame
+
+    @property
+    def total(self) -> pd.DataFrame:
+        return self.market_value + self.cash
+
+
+def import_prices(session: Session, rows: list[dict]) -> PriceImportResult:
+    """Validate and store rows of `(symbol, date, close)`, replacing the closes
+    already stored for the same symbol and day. Nothing is stored if any row is
+    invalid."""
+    logger.info(Messages.Price.importing(len(rows)))
+
+    prices: list[DailyPriceBase] = []
+    errors: list[DetailItem] = []
+    for index, row in enumerate(rows):
+        try:
+            prices.append(DailyPriceBase.model_validate(row))
+        except ValidationError as e:
+            errors.extend(
+                DetailItem(
+                    type=err["type"], loc=["body", index, *err["loc"]], msg=err["msg"]
+                )
+                for err in e.errors()
+            )
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[e.model_dump() for e in errors],
+        )
+
+    crud.prices.upsert_many(session, prices)
+    # Returns are computed from the closes, so cached ones may be outdated
+    performance_cache.clear()
+    logger.info(Messages.Price.IMPORTED)
+    return PriceImportResult(prices=len(prices))
+
+
+def _day_rows(days: pd.DatetimeIndex, timestamps: pd.Series) -> np.ndarray:
+    """Row of the day of each timestamp; days before the first one map to the
+    first row and days after the last one to `len(days)`."""
+    return days.searchsorted(pd.to_datetime(timestamps).dt.normalize())
+
+
+def compute_value_series(
+    account_ids: Sequence[UUID],
+    trades: pd.DataFrame,
+    cash_flows: pd.DataFrame,
+    closes: pd.DataFrame,
+    start: date,
+    end: date,
+    chunk_size: int = 256,
+) -> ValueSeries:
+    """Value of each account on every day from `start` to `end`.
+
+    `trades` has a row per trade with `account_id`, `symbol`, `created_at` and
+    the signed `quantity` bought; `cash_flows` has `account_id`, `created_at`
+    and the signed `amount` added to cash. `closes` has a row per day and a
+    column per symbol; each close holds until the next one, and symbols
+    without a close yet are valued at 0.
+
+    Positions are kept in a matrix with a row per day and a column per
+    `(account, symbol)` pair, built `chunk_size` pairs at a time to bound
+    memory, multiplied by the closes and summed per account.
+    """
+    days = pd.date_range(start, end, freq="D")
+    accounts = pd.Index(account_ids)
+
+    cash = np.zeros((len(days), len(accounts)))
+    rows = _day_rows(days, cash_flows["created_at"])
+    kept = rows < len(days)
+    np.add.at(
+        cash,
+        (rows[kept], accounts.get_indexer(cash_flows["account_id"])[kept]),
+        cash_flows["amount"].to_numpy(dtype=float)[kept],
+    )
+    cash.cumsum(axis=0, out=cash)
+
+    # Matrices below have a row per account or pair and a column per day, so
+    # that cumulative sums run over contiguous memory
+    market_value = np.zeros((len(accounts), len(days)))
+    if len(trades):
+        symbols = pd.Index(trades["symbol"].unique())
+        closes.index = pd.to_datetime(closes.index)
+        prices = (
+            closes.reindex(columns=symbols)
+            .reindex(closes.index.union(days))
+            .ffill()
+            .reindex(days)
+            .fillna(0)
+            .to_numpy(dtype=float)
+            .T.copy()
+        )
+
+        # Pairs are numbered in (account, symbol) order, so the pairs of an
+        # account are contiguous
+        grouped = trades.groupby(["account_id", "symbol"], sort=True)
+        pair = grouped.ngroup().to_numpy()
+        keys = grouped.size().index
+        pair_account = accounts.get_indexer(keys.get_level_values(0))
+        pair_symbol = symbols.get_indexer(keys.get_level_values(1))
+
+        order = np.argsort(pair, kind="stable")
+        pair = pair[order]
+        rows = _day_rows(days, trades["created_at"])[order]
+        quantity = trades["quantity"].to_numpy(dtype=float)[order]
+
+        for first in range(0, len(keys), chunk_size):
+            last = min(first + chunk_size, len(keys))
+            lo, hi = pair.searchsorted([first, last])
+            kept = rows[lo:hi] < len(days)
+
+            positions = np.zeros((last - first, len(days)))
+            np.add.at(
+                positions,
+                (pair[lo:hi][kept] - first, rows[lo:hi][kept]),
+                quantity[lo:hi][kept],
+            )
+            positions.cumsum(axis=1, out=positions)
+            positions *= prices[pair_symbol[first:last]]
+
+            chunk_accounts = pair_account[first:last]
+            starts = np.flatnonzero(
+                np.r_[True, chunk_accounts[1:] != chunk_accounts[:-1]]
+            )
+            market_value[chunk_accounts[starts]] += np.add.reduceat(
+                positions, starts, axis=0
+            )
+
+    return ValueSeries(
+        market_value=pd.DataFrame(market_value.T, index=days, columns=accounts),
+        cash=pd.DataFrame(cash, index=days, columns=accounts),
+    )
+
+
+class AccountFlows(NamedTuple):
+    """Transactions of several accounts and closes of the symbols they traded,
+    as frames.
+
+    `trades` has `account_id`, `security_id`, `symbol`, `created_at`, the
+    signed `quantity` bought and the signed `amount` invested; `ledger` has
+    `account_id`, `created_at` and the signed `amount` deposited; `closes` has a
+    row per day and a column per symbol.
+    """
+
+    trades: pd.DataFrame
+    ledger: pd.DataFrame
+    closes: pd.DataFrame
+
+    @property
+    def cash_flows(self) -> pd.DataFrame:
+        """Signed amounts added to cash by deposits, withdrawals and trades."""
+        return pd.DataFrame(
+            {
+                "account_id": np.concatenate(
+                    [
+                        self.ledger["account_id"].to_numpy(),
+                        self.trades["account_id"].to_numpy(),
+                    ]
+                ),
+                "created_at": pd.to_datetime(
+                    np.concatenate(
+                        [
+                            self.ledger["created_at"].to_numpy(),
+                            self.trades["created_at"].to_numpy(),
+                        ]
+                    )
+                ),
+                "amount": np.concatenate(
+                    [
+                        self.ledger["amount"].to_numpy(dtype=float),
+                        -self.trades["amount"].to_numpy(dtype=float),
+                    ]
+                ),
+            }
+        )
+
+    def first_day(self, default: date) -> date:
+        first = self.cash_flows["created_at"].min()
+        return first.date() if not pd.isna(first) else default
+
+
+def load_flows(session: Session, account_ids: list[UUID], until: date) -> AccountFlows:
+    until_at = datetime.combine(until, time.max)
+    trades = pd.DataFrame(
+        crud.trades.get_flows_for_accounts(session, account_ids, until_at),
+        columns=[
+            "account_id",
+            "security_id",
+            "symbol",
+            "created_at",
+            "type",
+            "quantity",
+            "price",
+        ],
+    )
+    ledger = pd.DataFrame(
+        crud.ledger.get_flows_for_accounts(session, account_ids, until_at),
+        columns=["account_id", "created_at", "type", "amount"],
+    )
+
+    sign = np.where(trades["type"] == TradeType.BUY, 1.0, -1.0)
+    trades["quantity"] = sign * trades["quantity"].to_numpy(dtype=float)
+    trades["amount"] = trades["quantity"] * trades["price"].to_numpy(dtype=float)
+    sign = np.where(ledger["type"] == LedgerType.DEPOSIT, 1.0, -1.0)
+    ledger["amount"] = sign * ledger["amount"].to_numpy(dtype=float)
+
+    closes = pd.DataFrame(
+        crud.prices.get_closes(session, list(trades["symbol"].unique()), until),
+        columns=["symbol", "date", "close"],
+    )
+    closes["close"] = closes["close"].astype(float)
+    closes = closes.pivot(index="date", columns="symbol", values="close")
+
+    return AccountFlows(trades, ledger, closes)
+
+
+def get_value_series(
+    session: Session,
+    accounts: Sequence[Account],
+    since: date | None = None,
+    until: date | None = None,
+) -> ValueSeries:
+    """Daily value of `accounts` from `since`, or their first transaction, to
+    `until`, or today."""
+    until = until or datetime.now(timezone.utc).date()
+    account_ids = [a.id for a in accounts]
+    flows = load_flows(session, account_ids, until)
+    return compute_value_series(
+        account_ids,
+        flows.trades,
+        flows.cash_flows,
+        flows.closes,
+        since or flows.first_day(until),
+        until,
+    )
+
+
+def get_account_value_history(
+    session: Session,
+    account: Account,
+    since: date | None = None,
+    until: date | None = None,
+) -> list[PortfolioValuePoint]:
+    series = get_value_series(session, [account], since, until)
+    return [
+        PortfolioValuePoint(
+            date=day.date(),
+            market_value=round(market_value, 8),
+            cash=round(cash, 8),
+            total=round(market_value + cash, 8),
+        )
+        for day, market_value, cash in zip(
+            series.market_value.index,
+            series.market_value[account.id],
+            series.cash[account.id],
+        )
+    ]
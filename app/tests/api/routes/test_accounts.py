@@ -6,8 +6,11 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session
 
 from app.core.config import settings
+from app.models.trades import TradeType
 from app.tests.utils import (
     create_account,
+    create_and_process_ledger,
+    create_and_process_trade,
     create_security,
     create_user,
     get_token_headers,
@@ -23,6 +26,12 @@ from app.tests.utils import (
         ("patch", "/1"),
         ("delete", "/1"),
         ("post", "/1/plan"),
+        ("post", "/1/rebalance"),
+        ("get", "/1/holdings"),
+        ("post", "/1/import"),
+        ("get", "/1/value"),
+        ("get", "/1/performance"),
+        ("get", "/1/realized-gains"),
     ],
 )
 def test_account_unauthorized(client: TestClient, method: str, endpoint: str):
@@ -38,6 +47,12 @@ def test_account_unauthorized(client: TestClient, method: str, endpoint: str):
         ("patch", "/{account_id}", {"name": "new_name"}),
         ("delete", "/{account_id}", None),
         ("post", "/{account_id}/plan", {"new_investment": 1000}),
+        ("post", "/{account_id}/rebalance", {"new_investment": 1000}),
+        ("get", "/{account_id}/holdings", None),
+        ("post", "/{account_id}/import", []),
+        ("get", "/{account_id}/value", None),
+        ("get", "/{account_id}/performance", None),
+        ("get", "/{account_id}/realized-gains", None),
     ],
 )
 def test_account_forbidden(
@@ -81,6 +96,30 @@ def test_get_account_list(
     assert len(data) == 1
 
 
+def test_get_account_list_only_own_accounts_paginated(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    other_user = create_user(session)
+    own = [create_account(session, current_user=user) for _ in range(3)]
+    create_account(session, current_user=other_user)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}"
+
+    first = client.get(url, headers=token_headers, params={"limit": 2}).json()
+    second = client.get(
+        url,
+        headers=token_headers,
+        params={"limit": 2, "cursor": first["meta"]["next_cursor"]},
+    ).json()
+
+    assert first["meta"]["count"] == 3
+    assert {a["id"] for a in first["data"] + second["data"]} == {str(a.id) for a in own}
+    assert second["meta"]["next_cursor"] is None
+
+
 def test_get_account_detail(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -99,6 +138,25 @@ def test_get_account_detail(
     assert data["id"] == str(account.id)
 
 
+def test_get_account_list_and_detail_include_securities(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    create_security(session, account=account, symbol="ONE")
+    create_security(session, account=account, symbol="TWO")
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}"
+
+    listed = client.get(url, headers=token_headers).json()["data"][0]
+    detail = client.get(f"{url}/{account.id}", headers=token_headers).json()["data"]
+
+    for data in (listed, detail):
+        assert sorted(s["symbol"] for s in data["securities"]) == ["ONE", "TWO"]
+
+
 def test_create_account(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -152,6 +210,41 @@ def test_update_account(
     assert data["name"] == "new_account_name"
 
 
+def test_update_account_cost_basis_method(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    for type_, price in [
+        (TradeType.BUY, 100),
+        (TradeType.BUY, 200),
+        (TradeType.SELL, 150),
+    ]:
+        create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            type_=type_,
+            price=Decimal(price),
+        )
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}",
+        headers=token_headers,
+        json={"cost_basis_method": "lifo"},
+    )
+
+    assert r.status_code == status.HTTP_200_OK
+    data = r.json()["data"]
+    assert data["cost_basis_method"] == "lifo"
+    assert Decimal(data["securities"][0]["cost_basis"]) == 100
+
+
 def test_delete_account(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -200,6 +293,43 @@ def test_account_deleted_when_user_deleted(
     assert r_get_deleted.status_code == status.HTTP_404_NOT_FOUND
 
 
+def test_read_holdings(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    security = create_security(session, account=account)
+    create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        quantity=Decimal("2"),
+        price=Decimal("100"),
+    )
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/holdings",
+        headers=token_headers,
+    )
+    assert r.status_code == status.HTTP_200_OK
+    data = r.json()["data"]
+    assert len(data) == 1
+    assert data[0]["security_id"] == str(security.id)
+    assert Decimal(data[0]["position"]) == 2
+
+    r_before = client.get(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/holdings",
+        headers=token_headers,
+        params={"at": "2000-01-01T00:00:00Z"},
+    )
+    assert r_before.status_code == status.HTTP_200_OK
+    assert r_before.json()["data"] == []
+
+
 def test_create_allocation_plan(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -223,3 +353,181 @@ def test_create_allocation_plan(
     assert r.status_code == status.HTTP_200_OK
     data = r.json()["data"]
     assert data[0]["needed_investment"] == "1000.00000000"
+
+
+def test_create_rebalance_plan(
+    client: TestClient,
+    session: Session,
+    test_username: str,
+    test_password: str,
+    mock_get_tickers_data,
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    create_security(
+        session, account=account, symbol="ONE", target_allocation=Decimal("1")
+    )
+
+    r = client.post(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/rebalance",
+        headers=token_headers,
+        json={"new_investment": 1200, "lot_size": 1},
+    )
+
+    assert r.status_code == status.HTTP_200_OK
+    [item] = r.json()["data"]
+    assert item["quantity"] == "2.00000000"
+    assert item["amount"] == "1000.00000000"
+
+
+def test_import_transactions(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account, symbol="ONE")
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/import"
+
+    r_json = client.post(
+        url,
+        headers=token_headers,
+        json=[
+            {"kind": "ledger", "type": "deposit", "amount": 1000},
+            {
+                "kind": "trade",
+                "type": "buy",
+                "symbol": "ONE",
+                "quantity": 2,
+                "price": 100,
+            },
+        ],
+    )
+    r_csv = client.post(
+        url,
+        headers={**token_headers, "Content-Type": "text/csv"},
+        content=f"kind,type,security_id,quantity,price\ntrade,sell,{security.id},1,150\n",
+    )
+
+    assert r_json.status_code == status.HTTP_201_CREATED
+    assert r_json.json()["data"] == {"trades": 1, "ledger": 1}
+    assert r_csv.status_code == status.HTTP_201_CREATED
+    assert r_csv.json()["data"] == {"trades": 1, "ledger": 0}
+    session.refresh(account)
+    session.refresh(security)
+    assert account.buying_power == Decimal("950")
+    assert security.position == Decimal("1")
+
+
+def test_import_transactions_invalid(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/import"
+
+    r_file = client.post(url, headers=token_headers, content=b"not json")
+    r_rows = client.post(
+        url,
+        headers=token_headers,
+        json=[
+            {"kind": "ledger", "type": "deposit", "amount": 1000},
+            {"kind": "ledger", "type": "withdrawal", "amount": -1},
+        ],
+    )
+
+    assert r_file.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert r_file.json()["detail"]["type"] == "invalid_import_file"
+    assert r_rows.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [e["loc"] for e in r_rows.json()["detail"]] == [["body", 1, "amount"]]
+
+
+def test_read_value_history(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/value"
+
+    response = client.get(url, headers=token_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert len(data) == 1
+    assert Decimal(data[0]["cash"]) == Decimal("1000")
+    assert Decimal(data[0]["total"]) == Decimal("1000")
+
+
+def test_read_performance(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = (
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/performance"
+    )
+
+    response = client.get(url, headers=token_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert data["account_id"] == str(account.id)
+    assert Decimal(data["twr"]) == 0
+    assert data["securities"] == []
+
+
+def test_read_realized_gains(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    account_url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}"
+    for type_, quantity, price in [("buy", 2, 100), ("sell", 1, 130), ("sell", 1, 90)]:
+        response = client.post(
+            f"{account_url}/{settings.TRADES_ROUTE_STR}/",
+            headers=token_headers,
+            json={
+                "type": type_,
+                "quantity": quantity,
+                "price": price,
+                "security_id": str(security.id),
+            },
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.get(
+        f"{account_url}/realized-gains",
+        headers=token_headers,
+        params={"period": "month", "by_security": True},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert len(data) == 1
+    assert data[0]["security_id"] == str(security.id)
+    assert data[0]["symbol"] == security.symbol
+    assert data[0]["sells"] == 2
+    assert Decimal(data[0]["proceeds"]) == 220
+    assert Decimal(data[0]["cost"]) == 200
+    assert Decimal(data[0]["gain"]) == 20
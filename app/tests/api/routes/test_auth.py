@@ -0,0 +1,41 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.password_hasher import password_hasher
+from app.tests.utils import create_user
+
+
+def test_login(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    create_user(session, username=test_username, password=test_password)
+    url = f"{settings.API_V1_STR}/auth/token"
+
+    r = client.post(url, data={"username": test_username, "password": test_password})
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["token_type"] == "bearer"
+
+    r = client.post(url, data={"username": test_username, "password": "wrong"})
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_login_when_password_hasher_is_busy(
+    client: TestClient,
+    session: Session,
+    test_username: str,
+    test_password: str,
+    monkeypatch,
+):
+    create_user(session, username=test_username, password=test_password)
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    r = client.post(
+        f"{settings.API_V1_STR}/auth/token",
+        data={"username": test_username, "password": test_password},
+    )
+
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert r.headers["Retry-After"] == "1"
+    assert r.json()["detail"]["type"] == "password_hasher_busy"
@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 from decimal import Decimal
 
 import pytest
@@ -6,7 +9,7 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session
 
 from app.core.config import settings
-from app.models.ledger import LedgerType
+from app.models.ledger import LedgerRead, LedgerType
 from app.tests.utils import (
     create_account,
     create_and_process_ledger,
@@ -21,6 +24,7 @@ from app.tests.utils import (
     [
         ("get", "/{transaction_id}", False),
         ("get", "", False),
+        ("get", "/export", False),
         ("post", "", True),
         ("delete", "/{transaction_id}", False),
     ],
@@ -52,6 +56,7 @@ def test_transaction_unauthorized(
     [
         ("get", "/{transaction_id}", False),
         ("get", "", False),
+        ("get", "/export", False),
         ("post", "", True),
         ("delete", "/{transaction_id}", False),
     ],
@@ -102,6 +107,69 @@ def test_get_transaction_list(
     assert len(data) == 1
 
 
+def test_get_transaction_list_pagination_and_filters(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    for type_ in [LedgerType.DEPOSIT, LedgerType.WITHDRAWAL] * 3:
+        create_ledger_item(session, account=account, type_=type_)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.LEDGER_ROUTE_STR}"
+
+    r = client.get(url, headers=token_headers, params={"type": "deposit", "limit": 2})
+    body = r.json()
+    assert r.status_code == status.HTTP_200_OK
+    assert body["meta"]["count"] == 3
+    assert len(body["data"]) == 2
+    assert body["meta"]["prev_cursor"] is None
+
+    r = client.get(
+        url,
+        headers=token_headers,
+        params={"type": "deposit", "limit": 2, "cursor": body["meta"]["next_cursor"]},
+    )
+    body = r.json()
+    assert len(body["data"]) == 1
+    assert body["meta"]["next_cursor"] is None
+    assert all(item["type"] == "deposit" for item in body["data"])
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_transaction_list(
+    client: TestClient,
+    session: Session,
+    test_username: str,
+    test_password: str,
+    monkeypatch,
+    format: str,
+):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    items = [create_ledger_item(session, account=account) for _ in range(3)]
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.LEDGER_ROUTE_STR}/export",
+        headers=token_headers,
+        params={"format": format},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    if format == "csv":
+        rows = list(csv.DictReader(io.StringIO(r.text)))
+    else:
+        rows = [json.loads(line) for line in r.text.splitlines()]
+
+    assert [row["id"] for row in rows] == [str(i.id) for i in items]
+    assert all(set(row) == set(LedgerRead.model_fields) for row in rows)
+    assert all(Decimal(row["amount"]) == Decimal("1000") for row in rows)
+
+
 def test_get_transaction_detail(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.prices import DailyPrice
+
+URL = f"{settings.API_V1_STR}/{settings.PRICES_ROUTE_STR}/history"
+
+
+def test_import_price_history_unauthorized(client: TestClient):
+    response = client.post(URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_import_price_history_forbidden(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+):
+    response = client.post(URL, headers=normal_user_token_headers, json=[])
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_import_price_history(
+    client: TestClient, session: Session, admin_token_headers: dict[str, str]
+):
+    response = client.post(
+        URL,
+        headers={**admin_token_headers, "Content-Type": "text/csv"},
+        content="symbol,date,close\nONE,2024-01-02,10.5\nONE,2024-01-03,11\n",
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["data"] == {"prices": 2}
+    closes = session.exec(select(DailyPrice.close).order_by(DailyPrice.date)).all()
+    assert closes == [Decimal("10.5"), Decimal("11")]
+
+
+def test_import_price_history_invalid(
+    client: TestClient, admin_token_headers: dict[str, str]
+):
+    response = client.post(
+        URL, headers=admin_token_headers, json=[{"symbol": "ONE", "close": "-1"}]
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert {tuple(e["loc"]) for e in response.json()["detail"]} == {
+        ("body", 0, "date"),
+        ("body", 0, "close"),
+    }
@@ -113,6 +113,35 @@ def test_get_security_list(
     assert len(data) == 1
 
 
+def test_get_security_list_pagination(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    for symbol in ["ONE", "TWO", "THREE"]:
+        create_security(session, account=account, symbol=symbol)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.SECURITIES_ROUTE_STR}"
+
+    first = client.get(url, headers=token_headers, params={"limit": 2}).json()
+    second = client.get(
+        url,
+        headers=token_headers,
+        params={"limit": 2, "cursor": first["meta"]["next_cursor"]},
+    ).json()
+
+    assert [s["symbol"] for s in first["data"] + second["data"]] == [
+        "ONE",
+        "TWO",
+        "THREE",
+    ]
+    assert first["meta"]["count"] == 3
+    assert second["meta"]["count"] is None
+    assert second["meta"]["next_cursor"] is None
+
+
 def test_get_security_detail(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
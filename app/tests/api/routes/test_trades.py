@@ -1,19 +1,33 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from decimal import Decimal
 
 import pytest
 from fastapi import Response, status
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, SQLModel, func, select
 
+from app.api.dependencies import get_session
 from app.core.config import settings
+from app.core.db import ENGINE_PROFILES, create_db_engine
+from app.core.user_cache import user_cache
+from app.main import app
+from app.models.accounts import Account
 from app.models.ledger import LedgerType
-from app.models.trades import TradeType
+from app.models.securities import Security
+from app.models.trades import Trade, TradeRead, TradeType
 from app.tests.utils import (
     create_account,
     create_and_process_ledger,
     create_security,
     create_trade,
     create_user,
+    get_open_lots,
     get_token_headers,
 )
 
@@ -23,6 +37,7 @@ from app.tests.utils import (
     [
         ("get", "/{trade_id}", False),
         ("get", "", False),
+        ("get", "/export", False),
         ("post", "", True),
         ("delete", "/{trade_id}", False),
     ],
@@ -66,6 +81,7 @@ def test_transaction_unauthorized(
     [
         ("get", "/{trade_id}", False),
         ("get", "", False),
+        ("get", "/export", False),
         ("post", "", True),
         ("delete", "/{trade_id}", False),
     ],
@@ -125,6 +141,238 @@ def test_get_transaction_list(
     assert len(data) == 1
 
 
+def test_get_transaction_list_query_count(
+    client: TestClient,
+    session: Session,
+    async_engine: AsyncEngine,
+    test_username: str,
+    test_password: str,
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    account_id = account.id
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account_id}/{settings.TRADES_ROUTE_STR}"
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def get_statement_count(trade_count: int):
+        account_db = session.get(Account, account_id)
+        for i in range(trade_count):
+            security = create_security(session, account=account_db, symbol=f"S{i}")
+            create_trade(session, account=account_db, security=security)
+        # Start from a cold identity map and user cache, as a fresh request
+        # session in a new process would
+        session.expunge_all()
+        user_cache.clear()
+        statements.clear()
+        engine = async_engine.sync_engine
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            r = client.get(url, headers=token_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        assert r.status_code == status.HTTP_200_OK
+        return r.json(), len(statements)
+
+    _, few = get_statement_count(2)
+    body, many = get_statement_count(20)
+
+    assert few > 0
+    assert many == few
+    assert body["meta"]["count"] == 22
+    assert all(t["security_symbol"].startswith("S") for t in body["data"])
+
+
+def test_get_transaction_list_pagination(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    trades = [
+        create_trade(session, account=account, security=security) for _ in range(5)
+    ]
+    # Same timestamp for every trade, so ordering falls back to the id
+    for trade in trades:
+        trade.created_at = datetime(2024, 1, 1)
+        session.add(trade)
+    session.commit()
+    expected_ids = sorted(str(t.id) for t in trades)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.TRADES_ROUTE_STR}"
+
+    pages = []
+    params = {"limit": 2}
+    while True:
+        r = client.get(url, headers=token_headers, params=params)
+        assert r.status_code == status.HTTP_200_OK
+        body = r.json()
+        assert body["meta"]["count"] == (5 if "cursor" not in params else None)
+        pages.append(body)
+        if body["meta"]["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": body["meta"]["next_cursor"]}
+
+    assert [len(p["data"]) for p in pages] == [2, 2, 1]
+    assert [t["id"] for p in pages for t in p["data"]] == expected_ids
+    assert pages[0]["meta"]["prev_cursor"] is None
+
+    r = client.get(
+        url,
+        headers=token_headers,
+        params={"limit": 2, "cursor": pages[-1]["meta"]["prev_cursor"]},
+    )
+    assert r.json()["data"] == pages[1]["data"]
+    assert r.json()["meta"]["prev_cursor"] is not None
+
+
+def test_get_transaction_list_counts_only_first_page(
+    client: TestClient,
+    session: Session,
+    async_engine: AsyncEngine,
+    test_username: str,
+    test_password: str,
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    for _ in range(3):
+        create_trade(session, account=account, security=security)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.TRADES_ROUTE_STR}"
+    counts = []
+
+    def count_counts(conn, cursor, statement, *args):
+        if "count(" in statement:
+            counts.append(statement)
+
+    first = client.get(url, headers=token_headers, params={"limit": 2}).json()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_counts)
+    try:
+        r = client.get(
+            url,
+            headers=token_headers,
+            params={"limit": 2, "cursor": first["meta"]["next_cursor"]},
+        )
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_counts)
+
+    assert first["meta"]["count"] == 3
+    assert len(r.json()["data"]) == 1
+    assert counts == []
+
+
+def test_get_transaction_list_filters(
+    client: TestClient, session: Session, test_username: str, test_password: str
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security_1 = create_security(session, account=account, symbol="ONE")
+    security_2 = create_security(session, account=account, symbol="TWO")
+    rows = [
+        (security_1, TradeType.BUY, datetime(2024, 1, 1)),
+        (security_1, TradeType.SELL, datetime(2024, 2, 1)),
+        (security_2, TradeType.BUY, datetime(2024, 3, 1)),
+        (security_2, TradeType.SELL, datetime(2024, 4, 1)),
+    ]
+    for security, type_, created_at in rows:
+        trade = create_trade(session, account=account, security=security, type_=type_)
+        trade.created_at = created_at
+        session.add(trade)
+    session.commit()
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+    url = f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.TRADES_ROUTE_STR}"
+
+    def get_symbols_and_types(params: dict):
+        r = client.get(url, headers=token_headers, params=params)
+        assert r.status_code == status.HTTP_200_OK
+        body = r.json()
+        assert body["meta"]["count"] == len(body["data"])
+        return [(t["security_symbol"], t["type"]) for t in body["data"]]
+
+    assert get_symbols_and_types({"type": "sell"}) == [("ONE", "sell"), ("TWO", "sell")]
+    assert get_symbols_and_types({"security_id": str(security_2.id)}) == [
+        ("TWO", "buy"),
+        ("TWO", "sell"),
+    ]
+    assert get_symbols_and_types(
+        {"since": "2024-02-01T00:00:00Z", "until": "2024-03-01T00:00:00Z"}
+    ) == [("ONE", "sell"), ("TWO", "buy")]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bmV4dHxub3QtYS1kYXRlfGFiYw=="])
+def test_get_transaction_list_invalid_cursor(
+    client: TestClient,
+    session: Session,
+    test_username: str,
+    test_password: str,
+    cursor: str,
+):
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.TRADES_ROUTE_STR}",
+        headers=token_headers,
+        params={"cursor": cursor},
+    )
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert r.json()["detail"]["type"] == "invalid_cursor"
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_transaction_list(
+    client: TestClient,
+    session: Session,
+    test_username: str,
+    test_password: str,
+    monkeypatch,
+    format: str,
+):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    user = create_user(session, username=test_username, password=test_password)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account, symbol="ONE")
+    trades = [
+        create_trade(session, account=account, security=security) for _ in range(5)
+    ]
+    token_headers = get_token_headers(
+        client=client, username=test_username, password=test_password
+    )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account.id}/{settings.TRADES_ROUTE_STR}/export",
+        headers=token_headers,
+        params={"format": format},
+    )
+    assert r.status_code == status.HTTP_200_OK
+    if format == "csv":
+        assert r.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(r.text)))
+    else:
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in r.text.splitlines()]
+
+    assert [row["id"] for row in rows] == [str(t.id) for t in trades]
+    assert all(set(row) == set(TradeRead.model_fields) for row in rows)
+    assert all(row["security_symbol"] == "ONE" for row in rows)
+
+
 def test_get_transaction_detail(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -176,6 +424,80 @@ def test_create_trade(
     assert data["id"]
 
 
+def test_concurrent_trades_keep_account_invariants(
+    tmp_path, test_username: str, test_password: str
+):
+    # A file database, as requests on several threads need their own sessions
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path}/test.db", ENGINE_PROFILES["sqlite"]
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = create_user(session, username=test_username, password=test_password)
+        targets = []
+        for name in ("first", "second"):
+            account = create_account(session, current_user=user, name=name)
+            create_and_process_ledger(
+                session,
+                account=account,
+                type_=LedgerType.DEPOSIT,
+                amount=Decimal("1000"),
+            )
+            security = create_security(session, account=account)
+            targets.append((account.id, security.id))
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_test_session
+    try:
+        with TestClient(app) as client:
+            token_headers = get_token_headers(
+                client=client, username=test_username, password=test_password
+            )
+
+            def buy(target):
+                account_id, security_id = target
+                return client.post(
+                    f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account_id}/{settings.TRADES_ROUTE_STR}/",
+                    headers=token_headers,
+                    json={
+                        "type": "buy",
+                        "quantity": 1,
+                        "price": 30,
+                        "security_id": str(security_id),
+                    },
+                ).status_code
+
+            # 40 buys of 30 against each account, of which 1000 // 30 fit
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                codes = list(executor.map(buy, targets * 40))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert codes.count(status.HTTP_201_CREATED) == 66
+    assert codes.count(status.HTTP_422_UNPROCESSABLE_ENTITY) == 14
+    with Session(engine) as session:
+        for account_id, security_id in targets:
+            account = session.get(Account, account_id)
+            security = session.get(Security, security_id)
+            trade_count = session.exec(
+                select(func.count())
+                .select_from(Trade)
+                .where(Trade.account_id == account_id)
+            ).one()
+            open_lots = get_open_lots(session, security)
+
+            assert trade_count == 33
+            assert account.buying_power == Decimal("10")
+            assert security.position == Decimal("33")
+            assert security.cost_basis == Decimal("990")
+            assert account.total_cost_basis == security.cost_basis
+            assert sum(lot.remaining_quantity for lot in open_lots) == security.position
+    engine.dispose()
+
+
 def test_create_trade_invalid_security_id(
     client: TestClient, session: Session, test_username: str, test_password: str
 ):
@@ -1,6 +1,7 @@
 import pytest
 from fastapi import Response, status
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session
 
 from app.core.config import settings
@@ -563,6 +564,36 @@ def test_update_user_me(client: TestClient, normal_user_token_headers: dict[str,
     assert data["username"] == "new_username"
 
 
+def test_current_user_is_cached_until_updated(
+    client: TestClient, session: Session, normal_user_token_headers: dict[str, str]
+):
+    url = f"{settings.API_V1_STR}/{settings.USERS_ROUTE_STR}/me"
+    user_lookups = []
+
+    def count_user_lookups(conn, cursor, statement, *args):
+        if statement.startswith("SELECT") and "FROM users" in statement:
+            user_lookups.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", count_user_lookups)
+    try:
+        for _ in range(3):
+            r = client.get(url, headers=normal_user_token_headers)
+            assert r.status_code == status.HTTP_200_OK
+        assert len(user_lookups) == 1
+
+        r = client.patch(
+            url, headers=normal_user_token_headers, json={"first_name": "New"}
+        )
+        assert r.status_code == status.HTTP_200_OK
+        user_lookups.clear()
+
+        r = client.get(url, headers=normal_user_token_headers)
+        assert r.json()["data"]["first_name"] == "New"
+        assert len(user_lookups) == 1
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count_user_lookups)
+
+
 def test_update_user_me_invalid_password(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ):
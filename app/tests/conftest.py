@@ -1,12 +1,21 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.pool import StaticPool
 
-from app.api.dependencies import get_session
+from app.api.dependencies import get_async_session, get_session
 from app.core.config import settings
+from app.core.db import to_async_url
+from app.core.performance_cache import performance_cache
+from app.core.quote_cache import quote_cache
+from app.core.user_cache import user_cache
 from app.main import app
 from app.models.generic import SQLModel
 from app.tests.utils import (
@@ -17,10 +26,20 @@ from app.tests.utils import (
 )
 
 
+@pytest.fixture(scope="function")
+def database_url() -> str:
+    url = make_url(settings.TEST_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # A named in-memory database, so that the async engine's connections
+        # see the same data as the session's
+        return f"sqlite:///file:test-{uuid4().hex}?mode=memory&cache=shared&uri=true"
+    return settings.TEST_DATABASE_URL
+
+
 @pytest.fixture(scope="function", autouse=True)
-def session() -> Generator[Session, None, None]:
+def session(database_url: str) -> Generator[Session, None, None]:
     engine = create_engine(
-        settings.TEST_DATABASE_URL,
+        database_url,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
@@ -30,11 +49,38 @@ def session() -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client(session) -> Generator[TestClient, None, None]:
+def async_engine(database_url: str, session: Session) -> AsyncEngine:
+    # The session's connection keeps the in-memory database alive, so these
+    # connections don't need to be pooled
+    return create_async_engine(to_async_url(database_url), poolclass=NullPool)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_quote_cache():
+    quote_cache.clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_performance_cache():
+    performance_cache.clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def client(session, async_engine) -> Generator[TestClient, None, None]:
     def override_get_session():
         return session
 
+    async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_async_session] = override_get_async_session
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -0,0 +1,43 @@
+import threading
+from uuid import uuid4
+
+from app.core.account_locks import AccountLocks
+
+
+def test_writes_to_an_account_wait_for_each_other():
+    locks = AccountLocks()
+    account_id = uuid4()
+    held = threading.Event()
+    release = threading.Event()
+    waited = []
+
+    def hold_first():
+        with locks.hold(account_id):
+            held.set()
+            release.wait()
+
+    first = threading.Thread(target=hold_first)
+    first.start()
+    held.wait()
+
+    def hold_second():
+        with locks.hold(account_id) as w:
+            waited.append(w)
+
+    second = threading.Thread(target=hold_second)
+    second.start()
+    second.join(timeout=0.05)
+    assert second.is_alive()
+
+    release.set()
+    first.join()
+    second.join()
+    assert waited == [True]
+
+
+def test_writes_to_other_accounts_do_not_wait():
+    locks = AccountLocks()
+
+    with locks.hold(uuid4()) as first, locks.hold(uuid4()) as second:
+        assert (first, second) == (False, False)
+    assert len(locks.locks) == 0
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+    yield hasher
+    hasher.executor.shutdown()
+
+
+def test_hash_and_verify(hasher: PasswordHasher):
+    password_hash = hasher.hash("Password1!")
+
+    assert password_hash.startswith("$2b$04$")
+    assert hasher.verify("Password1!", password_hash)
+    assert not hasher.verify("Password2!", password_hash)
+    assert asyncio.run(hasher.verify_async("Password1!", password_hash))
+    assert (hasher.stats.submitted, hasher.stats.completed) == (4, 4)
+
+
+def test_operations_beyond_max_pending_are_rejected(hasher: PasswordHasher):
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    running = hasher.submit(block)
+    started.wait()
+    queued = hasher.submit(lambda: None)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.submit(lambda: None)
+    assert (hasher.stats.running, hasher.stats.queued) == (1, 1)
+
+    release.set()
+    running.result()
+    queued.result()
+    assert hasher.stats.rejected == 1
+    assert hasher.stats.max_queued == 1
+    assert (hasher.stats.running, hasher.stats.queued) == (0, 0)
+    assert hasher.stats.wait_seconds > 0
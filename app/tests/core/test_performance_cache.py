@@ -0,0 +1,33 @@
+from uuid import uuid4
+
+from app.core.performance_cache import PerformanceCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PerformanceCache(max_size=2)
+    account_id = uuid4()
+
+    cache.set(account_id, ("2024-01-01", None), 1)
+    cache.set(account_id, ("2024-02-01", None), 2)
+    assert cache.get(account_id, ("2024-01-01", None)) == 1
+    cache.set(account_id, ("2024-03-01", None), 3)
+
+    assert len(cache.entries) == 2
+    assert cache.get(account_id, ("2024-02-01", None)) is None
+    assert cache.get(account_id, ("2024-01-01", None)) == 1
+    assert cache.get(account_id, ("2024-03-01", None)) == 3
+
+
+def test_invalidate_drops_only_the_accounts_entries():
+    cache = PerformanceCache(max_size=10)
+    changed, unchanged = uuid4(), uuid4()
+    cache.set(changed, "first", 1)
+    cache.set(changed, "second", 2)
+    cache.set(unchanged, "first", 3)
+
+    cache.invalidate([changed])
+
+    assert cache.get(changed, "first") is None
+    assert cache.get(changed, "second") is None
+    assert cache.get(unchanged, "first") == 3
+    assert changed not in cache.keys
@@ -0,0 +1,122 @@
+import pytest
+
+from app.core.quote_cache import QuoteCache, SQLiteQuoteStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetch:
+    def __init__(self, unknown: tuple[str, ...] = ()):
+        self.calls: list[list[str]] = []
+        self.unknown = unknown
+
+    def __call__(self, symbols: list[str]) -> dict:
+        self.calls.append(list(symbols))
+        return {
+            s: {"bid": len(self.calls), "longName": s}
+            for s in symbols
+            if s not in self.unknown
+        }
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_hits_and_misses(clock):
+    cache = QuoteCache(ttl=60, max_size=10, clock=clock)
+    fetch = FakeFetch()
+
+    first = cache.get_many(["AAA", "BBB"], fetch)
+    second = cache.get_many(["AAA", "BBB", "CCC"], fetch)
+
+    assert fetch.calls == [["AAA", "BBB"], ["CCC"]]
+    assert first["AAA"] == second["AAA"]
+    assert (cache.stats.hits, cache.stats.misses) == (2, 3)
+
+
+def test_expired_quotes_are_fetched_again(clock):
+    cache = QuoteCache(ttl=60, max_size=10, clock=clock)
+    fetch = FakeFetch()
+    cache.get_many(["AAA"], fetch)
+
+    clock.now += 60
+    result = cache.get_many(["AAA"], fetch)
+
+    assert fetch.calls == [["AAA"], ["AAA"]]
+    assert result["AAA"]["bid"] == 2
+
+
+def test_unknown_symbols_are_not_cached(clock):
+    cache = QuoteCache(ttl=60, max_size=10, clock=clock)
+    fetch = FakeFetch(unknown=("NOPE",))
+
+    assert cache.get_many(["NOPE"], fetch) == {}
+    assert cache.get_many(["NOPE"], fetch) == {}
+    assert len(fetch.calls) == 2
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = QuoteCache(ttl=60, max_size=2, clock=clock)
+    fetch = FakeFetch()
+    cache.get_many(["AAA", "BBB"], fetch)
+    cache.get_many(["AAA"], fetch)
+
+    cache.get_many(["CCC"], fetch)
+    cache.get_many(["AAA", "BBB"], fetch)
+
+    assert fetch.calls[-1] == ["BBB"]
+    assert cache.stats.evictions == 2
+
+
+def test_stale_while_revalidate(clock):
+    refreshes = []
+    cache = QuoteCache(
+        ttl=60,
+        max_size=10,
+        stale_while_revalidate=True,
+        clock=clock,
+        run_in_background=refreshes.append,
+    )
+    fetch = FakeFetch()
+    cache.get_many(["AAA"], fetch)
+    clock.now += 120
+
+    stale = cache.get_many(["AAA"], fetch)
+    cache.get_many(["AAA"], fetch)
+
+    assert stale["AAA"]["bid"] == 1
+    assert cache.stats.stale_hits == 2
+    # A refresh is already pending for the symbol
+    assert len(refreshes) == 1
+
+    refreshes[0]()
+    fresh = cache.get_many(["AAA"], fetch)
+
+    assert fresh["AAA"]["bid"] == 2
+    assert cache.stats.refreshes == 1
+    assert cache.stats.hits == 1
+
+
+def test_disk_tier_survives_restart(clock, tmp_path):
+    path = str(tmp_path / "quotes.db")
+    fetch = FakeFetch()
+    QuoteCache(ttl=60, max_size=10, store=SQLiteQuoteStore(path), clock=clock).get_many(
+        ["AAA"], fetch
+    )
+
+    restarted = QuoteCache(
+        ttl=60, max_size=10, store=SQLiteQuoteStore(path), clock=clock
+    )
+    result = restarted.get_many(["AAA"], fetch)
+
+    assert result == {"AAA": {"bid": 1, "longName": "AAA"}}
+    assert len(fetch.calls) == 1
+    assert restarted.stats.hits == 1
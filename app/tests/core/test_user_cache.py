@@ -0,0 +1,74 @@
+import pytest
+from sqlmodel import Session
+
+from app.core.user_cache import UserCache
+from app.tests.utils import create_user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_users_are_cached_until_ttl(session: Session, clock):
+    cache = UserCache(ttl=60, max_size=10, clock=clock)
+    user = create_user(session)
+
+    cache.set("token", user)
+    cached = cache.get("token")
+
+    assert cached is not None
+    assert cached is not user
+    assert (cached.id, cached.username) == (user.id, user.username)
+
+    clock.now += 60
+    assert cache.get("token") is None
+
+
+def test_entries_expire_with_the_token(session: Session, clock):
+    cache = UserCache(ttl=60, max_size=10, clock=clock)
+    user = create_user(session)
+
+    cache.set("token", user, token_expires_at=clock.now + 10)
+    clock.now += 10
+    assert cache.get("token") is None
+
+    cache.set("expired", user, token_expires_at=clock.now)
+    assert cache.get("expired") is None
+
+
+def test_invalidate_drops_every_token_of_the_user(session: Session, clock):
+    cache = UserCache(ttl=60, max_size=10, clock=clock)
+    user = create_user(session, username="user")
+    other = create_user(session, username="other", email="other@example.com")
+    cache.set("first", user)
+    cache.set("second", user)
+    cache.set("third", other)
+
+    cache.invalidate(user.id)
+
+    assert cache.get("first") is None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_least_recently_used_tokens_are_evicted(session: Session, clock):
+    cache = UserCache(ttl=60, max_size=2, clock=clock)
+    user = create_user(session)
+    cache.set("first", user)
+    cache.set("second", user)
+    cache.get("first")
+
+    cache.set("third", user)
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.tokens[user.id] == {"first", "third"}
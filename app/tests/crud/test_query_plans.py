@@ -0,0 +1,144 @@
+from collections.abc import Callable
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import Session, select
+
+from app import crud
+from app.api.dependencies import validate_unique_email, validate_unique_username
+from app.models.lots import Lot
+from app.models.users import User, UserUpdate
+from app.tests.utils import create_account, create_security, create_user
+
+
+def _query_plans(session: Session, table: str, call: Callable[[], object]) -> list[str]:
+    """Run ``call`` and return the SQLite query plan of each SELECT on ``table``."""
+    connection = session.connection()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and f"FROM {table}" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+    plans = []
+    for statement, parameters in statements:
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+        plans.append("\n".join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.fixture
+def account(session: Session):
+    user = create_user(session)
+    return create_account(session, current_user=user)
+
+
+@pytest.mark.parametrize(
+    "table, query, index",
+    [
+        (
+            "trades",
+            lambda session, account, security: crud.trades.get_all_for_account(
+                session, account, since=datetime(2024, 1, 1)
+            ),
+            "ix_trades_account_id_created_at",
+        ),
+        (
+            "trades",
+            lambda session, account, security: crud.trades.get_all_for_security(
+                session, account, security
+            ),
+            "ix_trades_account_id_security_id_created_at",
+        ),
+        (
+            "ledger",
+            lambda session, account, security: crud.ledger.get_all_for_account(
+                session, account, since=datetime(2024, 1, 1)
+            ),
+            "ix_ledger_account_id_created_at",
+        ),
+        (
+            "securities",
+            lambda session, account, security: crud.securities.get_all_for_account(
+                session, account
+            ),
+            "ix_securities_account_id_created_at",
+        ),
+        (
+            "transaction_checkpoints",
+            lambda session, account, security: crud.checkpoints.get_latest(
+                session, account
+            ),
+            "ix_transaction_checkpoints_account_id_last_transaction_at",
+        ),
+    ],
+)
+def test_account_scoped_queries_use_index(
+    session: Session, account, table, query, index
+):
+    security = create_security(session, account=account)
+
+    plans = _query_plans(session, table, lambda: query(session, account, security))
+
+    assert plans
+    assert all(index in plan for plan in plans), plans
+    assert not any("TEMP B-TREE" in plan for plan in plans), plans
+
+
+@pytest.mark.parametrize(
+    "name", ["ix_lots_security_id_sequence_open", "ix_lots_security_id_price_open"]
+)
+def test_open_lot_indexes_are_partial_on_postgresql(name):
+    [index] = [i for i in Lot.__table__.indexes if i.name == name]
+
+    sql = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+    assert sql.endswith("WHERE remaining_quantity > 0")
+
+
+def test_username_lookup_uses_index(session: Session):
+    user = create_user(session)
+
+    plans = _query_plans(
+        session,
+        "users",
+        lambda: session.exec(
+            select(User).where(User.username == user.username)
+        ).first(),
+    )
+
+    assert "ix_users_username" in plans[0]
+
+
+@pytest.mark.parametrize(
+    "validate, user_in, index",
+    [
+        (
+            validate_unique_username,
+            UserUpdate(username="SomeValue"),
+            "ix_users_lower_username",
+        ),
+        (
+            validate_unique_email,
+            UserUpdate(email="Some@Value.com"),
+            "ix_users_lower_email",
+        ),
+    ],
+)
+def test_case_insensitive_lookup_uses_index(session: Session, validate, user_in, index):
+    create_user(session)
+
+    plans = _query_plans(session, "users", lambda: validate(session, user_in))
+
+    assert index in plans[0]
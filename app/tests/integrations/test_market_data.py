@@ -0,0 +1,66 @@
+import asyncio
+
+from app.constants.messages import Messages
+from app.integrations.fake import FakeMarketDataProvider
+from app.integrations.market_data import MarketDataClient
+
+QUOTES = {f"S{i}": {"bid": i} for i in range(10)}
+
+
+def _client(
+    provider: FakeMarketDataProvider, sleeps: list[float] | None = None, **kwargs
+):
+    async def sleep(seconds: float):
+        if sleeps is not None:
+            sleeps.append(seconds)
+
+    options = {"max_concurrency": 3, "timeout": 1, "retries": 2, "backoff": 0.5}
+    return MarketDataClient(provider, sleep=sleep, **{**options, **kwargs})
+
+
+def test_fetch_many_bounds_concurrency():
+    provider = FakeMarketDataProvider(QUOTES, latency=0.01)
+
+    batch = asyncio.run(_client(provider).fetch_many(QUOTES))
+
+    assert batch.quotes == QUOTES
+    assert batch.errors == {}
+    assert provider.max_in_flight == 3
+
+
+def test_fetch_many_retries_with_backoff():
+    provider = FakeMarketDataProvider(QUOTES, failures={"S1": 2})
+    sleeps: list[float] = []
+
+    batch = asyncio.run(_client(provider, sleeps).fetch_many(["S1"]))
+
+    assert batch.quotes == {"S1": {"bid": 1}}
+    assert provider.calls["S1"] == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_fetch_many_reports_partial_failures():
+    provider = FakeMarketDataProvider(QUOTES, failures={"S2": 10})
+
+    batch = asyncio.run(_client(provider).fetch_many(["S1", "S2", "UNKNOWN"]))
+
+    assert batch.quotes == {"S1": {"bid": 1}}
+    assert batch.errors == {
+        "S2": "Failed to fetch 'S2'.",
+        "UNKNOWN": Messages.External.SYMBOL_NOT_FOUND,
+    }
+    # Unknown symbols are not retried
+    assert provider.calls["UNKNOWN"] == 1
+    assert provider.calls["S2"] == 3
+
+
+def test_fetch_many_times_out():
+    provider = FakeMarketDataProvider(QUOTES, latency=1)
+
+    batch = asyncio.run(
+        _client(provider, timeout=0.01, retries=0).fetch_many(["S1", "S1"])
+    )
+
+    assert batch.quotes == {}
+    assert batch.errors == {"S1": Messages.External.timed_out(0.01)}
+    assert provider.calls["S1"] == 1
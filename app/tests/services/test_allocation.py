@@ -1,21 +1,31 @@
+from datetime import datetime
 from decimal import Decimal
 
 import pytest
 from fastapi import HTTPException
 from sqlmodel import Session
 
+from app import crud
+from app.core.config import settings
 from app.models.accounts import AllocationPlanItem, AllocationStrategy
-from app.models.securities import SecurityCreate
+from app.models.securities import SecurityCreate, SecurityUpdate
+from app.models.trades import TradeType
 from app.services.allocation import AccountManager, validate_target_allocation
+from app.services.transactions import reprocess_transactions_excluding
 from app.tests.utils import (
     create_account,
     create_and_process_ledger,
     create_and_process_trade,
     create_security,
     create_user,
+    delete_trade,
 )
 
 
+def _without_quote_times(plan: list[AllocationPlanItem]) -> list[dict]:
+    return [item.model_dump(exclude={"price_as_of"}) for item in plan]
+
+
 def test_validate_target_allocation(session: Session):
     user = create_user(session)
     account = create_account(session, current_user=user)
@@ -38,6 +48,87 @@ def test_validate_max_target_allocation_raises(session: Session):
         validate_target_allocation(account, new_sec_in.target_allocation)
 
 
+def test_validate_target_allocation_replacing_existing(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(
+        session, account=account, symbol="ONE", target_allocation=Decimal("0.6")
+    )
+    create_security(
+        session, account=account, symbol="TWO", target_allocation=Decimal("0.4")
+    )
+
+    validate_target_allocation(
+        account, Decimal("0.5"), replaced=security.target_allocation
+    )
+    with pytest.raises(HTTPException):
+        validate_target_allocation(
+            account, Decimal("0.7"), replaced=security.target_allocation
+        )
+
+
+def _totals(account) -> tuple[Decimal, Decimal, Decimal]:
+    return (
+        account.total_target_allocation,
+        account.total_cost_basis,
+        account.market_value,
+    )
+
+
+def _recomputed_totals(session: Session, account) -> tuple[Decimal, Decimal, Decimal]:
+    securities = crud.securities.get_all_for_account(session, account)
+    return (
+        sum((s.target_allocation for s in securities), Decimal("0")),
+        sum((s.cost_basis for s in securities), Decimal("0")),
+        sum((s.position * s.latest_price for s in securities), Decimal("0")),
+    )
+
+
+def test_account_totals_are_maintained(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("5000"))
+    sec_1 = create_security(
+        session, account=account, symbol="ONE", target_allocation=Decimal("0.3")
+    )
+    sec_2 = create_security(
+        session, account=account, symbol="TWO", target_allocation=Decimal("0.5")
+    )
+    crud.instruments.update_latest_prices(
+        session, {"ONE": Decimal("10"), "TWO": Decimal("20")}
+    )
+    buy = create_and_process_trade(
+        session, account=account, security=sec_1, quantity=Decimal("3")
+    )
+    create_and_process_trade(
+        session, account=account, security=sec_2, quantity=Decimal("2")
+    )
+    create_and_process_trade(
+        session,
+        account=account,
+        security=sec_2,
+        type_=TradeType.SELL,
+        price=Decimal("120"),
+    )
+    assert _totals(account) == (Decimal("0.8"), 400, 50)
+
+    crud.securities.update(
+        session, sec_1, SecurityUpdate(target_allocation=Decimal("0.1"))
+    )
+    crud.instruments.update_latest_prices(session, {"ONE": Decimal("30")}, commit=False)
+    crud.accounts.refresh_market_values(session, ["ONE"])
+    assert _totals(account) == (Decimal("0.6"), 400, 110)
+    assert _totals(account) == _recomputed_totals(session, account)
+
+    reprocess_transactions_excluding(session, account, exclude=[buy.id])
+    delete_trade(session, trade=buy)
+    assert _totals(account) == (Decimal("0.6"), 100, 20)
+
+    crud.securities.delete(session, sec_2)
+    assert _totals(account) == (Decimal("0.1"), 0, 0)
+    assert _totals(account) == _recomputed_totals(session, account)
+
+
 def test_portfolio_get_allocation_plan_negative_needed_investment_becomes_zero(
     session, mock_get_tickers_data
 ):
@@ -75,6 +166,7 @@ def test_portfolio_get_allocation_plan_negative_needed_investment_becomes_zero(
 
     new_investment_amount = Decimal("1000")
     plan = portfolio.get_allocation_plan(new_investment_amount)
+    assert all(item.price_as_of is not None for item in plan)
 
     expected_plan = [
         AllocationPlanItem(
@@ -97,7 +189,7 @@ def test_portfolio_get_allocation_plan_negative_needed_investment_becomes_zero(
         ),
     ]
 
-    assert plan == expected_plan
+    assert _without_quote_times(plan) == _without_quote_times(expected_plan)
 
 
 def test_portfolio_get_allocation_plan(session, mock_get_tickers_data):
@@ -157,7 +249,7 @@ def test_portfolio_get_allocation_plan(session, mock_get_tickers_data):
         ),
     ]
 
-    assert plan == expected_plan
+    assert _without_quote_times(plan) == _without_quote_times(expected_plan)
 
 
 def test_portfolio_get_allocation_plan_partial_allocation_scale(
@@ -221,7 +313,7 @@ def test_portfolio_get_allocation_plan_partial_allocation_scale(
         ),
     ]
 
-    assert plan == expected_plan
+    assert _without_quote_times(plan) == _without_quote_times(expected_plan)
 
 
 def test_portfolio_get_allocation_plan_partial_allocation_fixed(
@@ -283,7 +375,7 @@ def test_portfolio_get_allocation_plan_partial_allocation_fixed(
         ),
     ]
 
-    assert plan == expected_plan
+    assert _without_quote_times(plan) == _without_quote_times(expected_plan)
 
 
 def test_portfolio_get_allocation_plan_partial_allocation_no_strategy(
@@ -350,3 +442,71 @@ def test_portfolio_get_allocation_plan_zero_allocation(session, mock_get_tickers
 
     with pytest.raises(HTTPException):
         portfolio.get_allocation_plan(new_investment_amount)
+
+
+def test_get_allocation_plan_uses_stored_prices_with_refresher(
+    session: Session, monkeypatch
+):
+    def get_tickers_data(symbols):
+        raise AssertionError("Prices must not be fetched")
+
+    monkeypatch.setattr(settings, "PRICE_REFRESH_ENABLED", True)
+    monkeypatch.setattr("app.services.securities.get_tickers_data", get_tickers_data)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    security = create_security(
+        session, account=account, symbol="ONE", target_allocation=Decimal("1")
+    )
+    create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        quantity=Decimal("2"),
+        price=Decimal("100"),
+    )
+    security.instrument.latest_price = Decimal("150")
+    session.add(security.instrument)
+    session.commit()
+
+    plan = AccountManager(session, account).get_allocation_plan(Decimal("100"))
+
+    assert plan[0].current_value == Decimal("300")
+
+
+def test_get_allocation_plan_uses_last_known_price_of_failed_symbols(
+    session: Session, monkeypatch
+):
+    def get_tickers_data(symbols):
+        return {"ONE": {"bid": 200}}
+
+    monkeypatch.setattr("app.services.securities.get_tickers_data", get_tickers_data)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    securities = [
+        create_security(
+            session, account=account, symbol=s, target_allocation=Decimal("0.5")
+        )
+        for s in ["ONE", "DELISTED"]
+    ]
+    for security in securities:
+        create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            quantity=Decimal("1"),
+            price=Decimal("100"),
+        )
+    delisted = securities[1].instrument
+    delisted.latest_price = Decimal("50")
+    delisted.price_updated_at = datetime(2024, 1, 1)
+    session.add(delisted)
+    session.commit()
+
+    plan = AccountManager(session, account).get_allocation_plan(Decimal("100"))
+
+    assert [item.current_value for item in plan] == [Decimal("200"), Decimal("50")]
+    assert [item.stale_price for item in plan] == [False, True]
+    assert plan[1].price_as_of == datetime(2024, 1, 1)
+    assert plan[0].price_as_of > datetime(2024, 1, 1)
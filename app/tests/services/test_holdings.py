@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models.trades import TradeType
+from app.services import holdings
+from app.services.holdings import get_holdings_at
+from app.services.transactions import (
+    record_checkpoint_if_due,
+    reprocess_transactions_excluding,
+)
+from app.tests.utils import (
+    create_account,
+    create_and_process_ledger,
+    create_and_process_trade,
+    create_ledger_item,
+    create_security,
+    create_trade,
+    create_user,
+)
+
+START = datetime(2024, 1, 1, 12)
+
+
+def _create_history(session: Session):
+    """Deposit on day 0, then one trade per day; a sell every third day."""
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    rows = [create_ledger_item(session, account=account, amount=Decimal("10000"))]
+    for i in range(1, 10):
+        rows.append(
+            create_trade(
+                session,
+                account=account,
+                security=security,
+                type_=TradeType.SELL if i % 3 == 0 else TradeType.BUY,
+                quantity=Decimal(i),
+                price=Decimal(100 + i),
+            )
+        )
+    for day, row in enumerate(rows):
+        row.created_at = START + timedelta(days=day)
+        session.add(row)
+    session.commit()
+    reprocess_transactions_excluding(session, account, exclude=[])
+    return account, security
+
+
+def test_snapshots_written_per_day(session: Session):
+    account, security = _create_history(session)
+
+    snapshots = crud.snapshots.get_latest_before(
+        session, account, (START + timedelta(days=30)).date()
+    )
+
+    assert len(snapshots) == 1
+    assert snapshots[0].date == (START + timedelta(days=9)).date()
+    assert snapshots[0].position == security.position
+    assert snapshots[0].cost_basis == security.cost_basis
+
+
+def test_get_holdings_at(session: Session):
+    account, security = _create_history(session)
+
+    # Buys of 1 and 2, sell of 3, buy of 4
+    result = get_holdings_at(session, account, START + timedelta(days=4, hours=1))
+
+    assert len(result) == 1
+    assert result[0].security_id == security.id
+    assert result[0].position == 4
+    assert result[0].cost_basis == 4 * 104
+
+
+def test_get_holdings_before_first_trade(session: Session):
+    account, _ = _create_history(session)
+
+    assert get_holdings_at(session, account, START) == []
+
+
+def test_get_holdings_applies_only_trades_after_snapshot(session: Session, monkeypatch):
+    account, security = _create_history(session)
+    applied = []
+    for type_, operation in holdings.SECURITY_OPERATIONS.items():
+        monkeypatch.setitem(
+            holdings.SECURITY_OPERATIONS,
+            type_,
+            lambda ctx, lots, operation=operation: applied.append(operation(ctx, lots)),
+        )
+
+    result = get_holdings_at(session, account, START + timedelta(days=6, hours=1))
+
+    assert len(applied) == 1
+    assert result[0].position == Decimal("1") + 2 - 3 + 4 + 5 - 6
+
+
+def test_get_holdings_reads_only_trades_after_snapshots(session: Session, monkeypatch):
+    account, security = _create_history(session)
+    # Never traded, so it has no snapshot
+    create_security(session, account=account, symbol="NEW")
+    read = []
+    get_all_for_account = crud.trades.get_all_for_account
+
+    def get_all_for_account_spy(*args, **kwargs):
+        trades = get_all_for_account(*args, **kwargs)
+        read.extend(trades)
+        return trades
+
+    monkeypatch.setattr(crud.trades, "get_all_for_account", get_all_for_account_spy)
+
+    result = get_holdings_at(session, account, START + timedelta(days=6, hours=1))
+
+    assert [t.created_at for t in read] == [START + timedelta(days=6)]
+    assert [h.security_id for h in result] == [security.id]
+
+
+def test_delete_keeps_snapshots_of_trades_before_same_day_checkpoint(
+    session: Session, monkeypatch
+):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 2)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security_a = create_security(session, account=account, symbol="A")
+    security_b = create_security(session, account=account, symbol="B")
+    ledger = create_and_process_ledger(session, account=account, amount=Decimal("100"))
+    record_checkpoint_if_due(session, account, ledger)
+    trades = []
+    for security in (security_a, security_b):
+        trade = create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            quantity=Decimal("1"),
+            price=Decimal("10"),
+        )
+        record_checkpoint_if_due(session, account, trade)
+        trades.append(trade)
+
+    # Replay starts from the checkpoint after the buy of A, made the same day
+    reprocess_transactions_excluding(session, account, exclude=[trades[1].id])
+    crud.trades.delete(session, trades[1])
+
+    tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+    result = get_holdings_at(session, account, tomorrow)
+    assert [(h.security_id, h.position) for h in result] == [(security_a.id, 1)]
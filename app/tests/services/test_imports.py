@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import crud
+from app.services.imports import import_transactions, parse_import_rows
+from app.services.transactions import reprocess_transactions_excluding
+from app.tests.utils import (
+    convert_lots_to_numeric,
+    create_account,
+    create_and_process_ledger,
+    create_security,
+    create_user,
+    get_open_lots,
+)
+
+START = datetime(2024, 1, 1, 12)
+
+
+def _at(days: int) -> str:
+    return (START + timedelta(days=days)).isoformat()
+
+
+def _rows(security_id):
+    """A deposit and a few trades over several days, listed out of order."""
+    return [
+        {
+            "kind": "trade",
+            "type": "sell",
+            "symbol": "SYM",
+            "quantity": "3",
+            "price": "120",
+            "created_at": _at(3),
+        },
+        {"kind": "ledger", "type": "deposit", "amount": "10000", "created_at": _at(0)},
+        {
+            "kind": "trade",
+            "type": "buy",
+            "security_id": str(security_id),
+            "quantity": "2",
+            "price": "100",
+            "created_at": _at(1),
+        },
+        {
+            "kind": "trade",
+            "type": "buy",
+            "symbol": "SYM",
+            "quantity": "4",
+            "price": "110",
+            "created_at": _at(2),
+        },
+        {
+            "kind": "trade",
+            "type": "buy",
+            "symbol": "SYM",
+            "quantity": "1",
+            "price": "130",
+            "created_at": _at(3) + "+00:00",
+        },
+    ]
+
+
+def _state(session: Session, account, security):
+    session.refresh(account)
+    session.refresh(security)
+    return (
+        account.buying_power,
+        security.position,
+        security.cost_basis,
+        convert_lots_to_numeric(get_open_lots(session, security)),
+    )
+
+
+def test_import_transactions(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+
+    result = import_transactions(session, account, _rows(security.id))
+
+    assert (result.trades, result.ledger) == (4, 1)
+    assert account.buying_power == Decimal(10000 - 200 - 440 + 360 - 130)
+    assert security.position == 4
+    # The sell consumes the first lot and one unit of the second
+    assert security.cost_basis == 3 * 110 + 130
+    assert len(crud.trades.get_all_for_account(session, account)) == 4
+    assert len(crud.ledger.get_all_for_account(session, account)) == 1
+
+    snapshots = crud.snapshots.get_latest_before(
+        session, account, (START + timedelta(days=30)).date()
+    )
+    assert len(snapshots) == 1
+    assert snapshots[0].date == (START + timedelta(days=3)).date()
+    assert snapshots[0].position == 4
+
+
+def test_import_matches_reprocessing(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    import_transactions(session, account, _rows(security.id))
+    imported = _state(session, account, security)
+
+    reprocess_transactions_excluding(session, account, exclude=[])
+
+    assert _state(session, account, security) == imported
+
+
+def test_import_after_existing_transactions(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("500"))
+
+    rows = [
+        {"kind": "trade", "type": "buy", "symbol": "SYM", "quantity": 1, "price": 100},
+        {"kind": "trade", "type": "buy", "symbol": "SYM", "quantity": 2, "price": 50},
+    ]
+    import_transactions(session, account, rows)
+    import_transactions(
+        session,
+        account,
+        [{"kind": "trade", "type": "sell", "symbol": "SYM", "quantity": 2, "price": 1}],
+    )
+
+    assert account.buying_power == Decimal("302")
+    assert security.position == 1
+    assert security.cost_basis == 50
+    assert [lot.sequence for lot in get_open_lots(session, security)] == [1]
+    assert security.lot_cursor == 1
+
+
+def test_import_commits_once(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(session, "after_commit", count_commit)
+    try:
+        import_transactions(session, account, _rows(security.id))
+    finally:
+        event.remove(session, "after_commit", count_commit)
+
+    assert len(commits) == 1
+
+
+def test_import_reports_errors_per_row(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_security(session, account=account)
+    rows = [
+        {"kind": "ledger", "type": "deposit", "amount": "100"},
+        {"kind": "ledger", "type": "buy", "amount": "100"},
+        {"kind": "trade", "type": "buy", "symbol": "SYM", "price": "1"},
+        {"kind": "trade", "type": "buy", "symbol": "NOPE", "quantity": 1, "price": 1},
+        {"kind": "other"},
+    ]
+
+    with pytest.raises(HTTPException) as exc_info:
+        import_transactions(session, account, rows)
+
+    errors = {(e["loc"][1], e["type"]) for e in exc_info.value.detail}
+    assert errors == {
+        (1, "enum"),
+        (2, "decimal_type"),
+        (3, "security_not_found"),
+        (4, "enum"),
+        (4, "missing"),
+    }
+    assert crud.ledger.get_all_for_account(session, account) == []
+
+
+def test_import_reports_processing_errors_and_imports_nothing(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    rows = [
+        {"kind": "ledger", "type": "deposit", "amount": "100"},
+        {"kind": "trade", "type": "buy", "symbol": "SYM", "quantity": 2, "price": 100},
+        {"kind": "trade", "type": "buy", "symbol": "SYM", "quantity": 1, "price": 50},
+        {"kind": "trade", "type": "sell", "symbol": "SYM", "quantity": 2, "price": 1},
+    ]
+
+    with pytest.raises(HTTPException) as exc_info:
+        import_transactions(session, account, rows)
+
+    assert [e["loc"] for e in exc_info.value.detail] == [["body", 1], ["body", 3]]
+    assert all(e["type"] == "cannot_process_transaction" for e in exc_info.value.detail)
+    assert _state(session, account, security) == (0, 0, 0, [])
+    assert crud.trades.get_all_for_account(session, account) == []
+    assert crud.ledger.get_all_for_account(session, account) == []
+
+
+def test_import_rejects_rows_before_latest_transaction(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account)
+
+    with pytest.raises(HTTPException) as exc_info:
+        import_transactions(
+            session,
+            account,
+            [{"kind": "ledger", "type": "deposit", "amount": 1, "created_at": _at(0)}],
+        )
+
+    assert exc_info.value.detail[0]["type"] == "before_latest_transaction"
+
+
+def test_parse_import_rows():
+    csv_content = (
+        b"kind,type,symbol,quantity,price,amount\n"
+        b"ledger,deposit,,,,100\n"
+        b"trade,buy,SYM,1,10,\n"
+    )
+
+    assert parse_import_rows(csv_content, "text/csv; charset=utf-8") == [
+        {
+            "kind": "ledger",
+            "type": "deposit",
+            "symbol": None,
+            "quantity": None,
+            "price": None,
+            "amount": "100",
+        },
+        {
+            "kind": "trade",
+            "type": "buy",
+            "symbol": "SYM",
+            "quantity": "1",
+            "price": "10",
+            "amount": None,
+        },
+    ]
+    assert parse_import_rows(b'[{"kind": "ledger"}]', "application/json") == [
+        {"kind": "ledger"}
+    ]
+    with pytest.raises(ValueError):
+        parse_import_rows(b'{"kind": "ledger"}', "application/json")
+
+
+def test_import_keeps_file_order_of_rows_sharing_a_time(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    rows = [
+        {"kind": "ledger", "type": "deposit", "amount": 300, "created_at": _at(0)},
+        *[
+            {
+                "kind": "trade",
+                "type": "buy",
+                "symbol": "SYM",
+                "quantity": 1,
+                "price": 100,
+                "created_at": _at(0),
+            }
+            for _ in range(3)
+        ],
+    ]
+    import_transactions(session, account, rows)
+    trades = crud.trades.get_all_for_account(session, account)
+
+    # Each buy needs the deposit, and the later ones the lots of the former
+    reprocess_transactions_excluding(session, account, exclude=[trades[1].id])
+    crud.trades.delete(session, trades[1])
+
+    assert _state(session, account, security)[:3] == (100, 2, 200)
+    assert [lot.sequence for lot in get_open_lots(session, security)] == [0, 1]
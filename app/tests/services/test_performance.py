@@ -0,0 +1,111 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlmodel import Session
+
+from app.services.imports import import_transactions
+from app.services.performance import (
+    compute_performance,
+    get_account_performance,
+    money_weighted_returns,
+    time_weighted_returns,
+)
+from app.services.valuation import import_prices
+from app.tests.utils import (
+    create_account,
+    create_and_process_ledger,
+    create_security,
+    create_user,
+)
+
+
+def test_time_weighted_returns():
+    # A deposit of 100 grows 10%, then another 100 is deposited and the total
+    # grows 10% again; the second column never has anything invested
+    values = np.array([[0, 0], [100, 0], [110, 0], [231, 0]], dtype=float)
+    flows = np.array([[0, 0], [100, 0], [0, 0], [100, 0]], dtype=float)
+
+    twr = time_weighted_returns(values, flows)
+
+    assert twr[0] == pytest.approx(0.21)
+    assert np.isnan(twr[1])
+
+
+def test_money_weighted_returns():
+    amounts = np.zeros((366, 3))
+    amounts[0] = [-100, -100, -100]
+    amounts[365] = [110, 80, 0]
+    amounts[182, 1] = -50
+    years = np.arange(366) / 365
+
+    rates = money_weighted_returns(amounts, years)
+
+    assert rates[0] == pytest.approx(0.1)
+    npv = sum(a * (1 + rates[1]) ** -t for a, t in zip(amounts[:, 1], years))
+    assert npv == pytest.approx(0, abs=1e-6)
+    assert np.isnan(rates[2])
+
+
+def _rows(symbol: str) -> list[dict]:
+    return [
+        {
+            "kind": "ledger",
+            "type": "deposit",
+            "amount": 1000,
+            "created_at": "2024-01-01T10:00:00",
+        },
+        {
+            "kind": "trade",
+            "type": "buy",
+            "symbol": symbol,
+            "quantity": 10,
+            "price": 100,
+            "created_at": "2024-01-01T11:00:00",
+        },
+    ]
+
+
+def test_compute_performance(session: Session):
+    user = create_user(session)
+    accounts = [create_account(session, current_user=user) for _ in range(2)]
+    securities = [
+        create_security(session, account=account, symbol=symbol)
+        for account, symbol in zip(accounts, ["ONE", "TWO"])
+    ]
+    for account, security in zip(accounts, securities):
+        import_transactions(session, account, _rows(security.symbol))
+    import_prices(
+        session,
+        [
+            {"symbol": "ONE", "date": "2024-01-01", "close": "100"},
+            {"symbol": "ONE", "date": "2024-12-31", "close": "110"},
+            {"symbol": "TWO", "date": "2024-01-01", "close": "100"},
+            {"symbol": "TWO", "date": "2024-12-31", "close": "90"},
+        ],
+    )
+
+    performance = compute_performance(session, accounts, until=date(2024, 12, 31))
+
+    one, two = (performance[a.id] for a in accounts)
+    assert one.since == date(2024, 1, 1)
+    assert one.twr == Decimal("0.1")
+    assert two.twr == Decimal("-0.1")
+    # A year passes from the deposit on Jan 1 to the end of Dec 31
+    assert float(one.xirr) == pytest.approx(0.1)
+    assert [(s.symbol, s.twr) for s in one.securities] == [("ONE", Decimal("0.1"))]
+    assert [(s.symbol, s.twr) for s in two.securities] == [("TWO", Decimal("-0.1"))]
+
+
+def test_account_performance_is_cached_until_a_transaction(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("100"))
+
+    performance = get_account_performance(session, account)
+    assert get_account_performance(session, account) is performance
+
+    create_and_process_ledger(session, account=account, amount=Decimal("100"))
+
+    assert get_account_performance(session, account) is not performance
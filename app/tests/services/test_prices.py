@@ -0,0 +1,88 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlmodel import Session
+
+from app.services.prices import PriceRefresher, refresh_latest_prices
+from app.tests.utils import create_account, create_security, create_user
+
+
+@pytest.fixture
+def stub_tickers(monkeypatch):
+    calls: list[list[str]] = []
+    prices = {"ONE": 10, "TWO": 20, "THREE": 30}
+
+    def get_tickers_data(symbols: list[str]):
+        calls.append(symbols)
+        if "FAIL" in symbols:
+            raise ConnectionError
+        return {s: {"bid": prices[s]} for s in symbols if s in prices}
+
+    monkeypatch.setattr("app.services.prices.get_tickers_data", get_tickers_data)
+    return calls
+
+
+def test_refresh_latest_prices(session: Session, stub_tickers):
+    user = create_user(session)
+    account_1 = create_account(session, current_user=user)
+    account_2 = create_account(session, current_user=user)
+    securities = [
+        create_security(session, account=account_1, symbol="ONE"),
+        create_security(session, account=account_1, symbol="TWO"),
+        create_security(session, account=account_2, symbol="ONE"),
+        create_security(session, account=account_2, symbol="UNKNOWN"),
+    ]
+
+    updated = refresh_latest_prices(session, batch_size=2)
+
+    assert updated == 2
+    assert stub_tickers == [["ONE", "TWO"], ["UNKNOWN"]]
+    for security in securities:
+        session.refresh(security)
+    assert [s.latest_price for s in securities] == [10, 20, 10, 0]
+
+
+def test_refresh_skips_failed_batches(session: Session, stub_tickers):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    failing = create_security(session, account=account, symbol="FAIL")
+    failing.instrument.latest_price = Decimal("5")
+    session.add(failing.instrument)
+    session.commit()
+    other = create_security(session, account=account, symbol="TWO")
+
+    updated = refresh_latest_prices(session, batch_size=1)
+
+    assert updated == 1
+    session.refresh(failing)
+    session.refresh(other)
+    assert failing.latest_price == 5
+    assert other.latest_price == 20
+
+
+def test_price_refresher_runs_in_background(session: Session, monkeypatch):
+    ran = threading.Event()
+
+    def run_once(self):
+        ran.set()
+        return 0
+
+    monkeypatch.setattr(PriceRefresher, "run_once", run_once)
+    refresher = PriceRefresher(session.get_bind(), interval=60)
+
+    refresher.start()
+    assert ran.wait(timeout=5)
+    refresher.stop()
+
+    assert refresher.thread is None
+
+
+def test_price_refresher_run_once(session: Session, stub_tickers):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account, symbol="THREE")
+
+    assert PriceRefresher(session.get_bind()).run_once() == 1
+    session.refresh(security)
+    assert security.latest_price == 30
@@ -0,0 +1,168 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session
+
+from app import crud
+from app.models.realized_gains import RealizedGainPeriod
+from app.models.trades import TradeType
+from app.services.imports import import_transactions
+from app.services.realized_gains import get_realized_gains
+from app.services.transactions import reprocess_transactions_excluding
+from app.tests.utils import (
+    create_account,
+    create_and_process_ledger,
+    create_and_process_trade,
+    create_security,
+    create_user,
+)
+
+
+def _import(session: Session, account, rows: list[dict]):
+    deposit = {
+        "kind": "ledger",
+        "type": "deposit",
+        "amount": "10000",
+        "created_at": "2023-12-31T00:00:00",
+    }
+    import_transactions(session, account, [deposit, *rows])
+
+
+def _trade(type_: str, symbol: str, quantity, price, created_at: str) -> dict:
+    return {
+        "kind": "trade",
+        "type": type_,
+        "symbol": symbol,
+        "quantity": str(quantity),
+        "price": str(price),
+        "created_at": created_at,
+    }
+
+
+def test_sell_records_realized_gain(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    create_and_process_trade(
+        session, account=account, security=security, quantity=Decimal("2")
+    )
+    create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        quantity=Decimal("2"),
+        price=Decimal("110"),
+    )
+    sell = create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        type_=TradeType.SELL,
+        quantity=Decimal("3"),
+        price=Decimal("120"),
+    )
+
+    [gain] = crud.realized_gains.get_all_for_account(session, account)
+
+    assert gain.trade_id == sell.id
+    assert gain.security_id == security.id
+    assert (gain.quantity, gain.proceeds, gain.cost, gain.gain) == (3, 360, 310, 50)
+    assert [(lot["sequence"], Decimal(lot["quantity"])) for lot in gain.lots] == [
+        (0, 2),
+        (1, 1),
+    ]
+
+
+def test_import_records_realized_gains_with_holding_period(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_security(session, account=account)
+
+    _import(
+        session,
+        account,
+        [
+            _trade("buy", "SYM", 2, 100, "2024-01-01T00:00:00"),
+            _trade("buy", "SYM", 2, 110, "2024-01-11T00:00:00"),
+            _trade("sell", "SYM", 3, 90, "2024-01-21T00:00:00"),
+        ],
+    )
+
+    [gain] = crud.realized_gains.get_all_for_account(session, account)
+    assert gain.sold_at == datetime(2024, 1, 21)
+    assert gain.gain == 270 - 310
+    # Two units held for 20 days and one for 10
+    assert gain.holding_days == Decimal("16.67")
+
+
+def test_reprocessing_replaces_realized_gains(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    first_buy = create_and_process_trade(
+        session, account=account, security=security, price=Decimal("50")
+    )
+    create_and_process_trade(session, account=account, security=security)
+    create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        type_=TradeType.SELL,
+        price=Decimal("120"),
+    )
+
+    reprocess_transactions_excluding(session, account, exclude=[first_buy.id])
+
+    [gain] = crud.realized_gains.get_all_for_account(session, account)
+    assert gain.cost == 100
+    assert gain.gain == 20
+
+
+def test_get_realized_gains_groups_by_period_and_security(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_security(session, account=account, symbol="AAA")
+    create_security(session, account=account, symbol="BBB")
+    _import(
+        session,
+        account,
+        [
+            _trade("buy", "AAA", 4, 100, "2024-01-01T00:00:00"),
+            _trade("buy", "BBB", 4, 50, "2024-01-01T00:00:00"),
+            _trade("sell", "AAA", 1, 110, "2024-01-15T00:00:00"),
+            _trade("sell", "BBB", 1, 40, "2024-01-20T00:00:00"),
+            _trade("sell", "AAA", 2, 130, "2024-02-10T00:00:00"),
+        ],
+    )
+
+    [total] = get_realized_gains(session, account)
+    assert (total.sells, total.proceeds, total.cost, total.gain) == (3, 410, 350, 60)
+
+    by_month = get_realized_gains(session, account, period=RealizedGainPeriod.MONTH)
+    assert [(g.period, g.gain) for g in by_month] == [("2024-01", 0), ("2024-02", 60)]
+
+    by_security = get_realized_gains(session, account, by_security=True)
+    assert [(g.symbol, g.gain) for g in by_security] == [("AAA", 70), ("BBB", -10)]
+
+    january = get_realized_gains(
+        session, account, since=date(2024, 1, 1), until=date(2024, 1, 31)
+    )
+    assert [(g.sells, g.gain) for g in january] == [(2, 0)]
+
+    assert get_realized_gains(session, account, since=date(2025, 1, 1)) == []
+
+
+def test_period_expression_on_postgresql():
+    expression = crud.realized_gains.period_expression(
+        "postgresql", RealizedGainPeriod.MONTH
+    )
+
+    sql = str(
+        expression.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert sql == "to_char(realized_gains.sold_at, 'YYYY-MM')"
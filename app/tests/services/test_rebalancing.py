@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlmodel import Session
+
+from app.models.accounts import AllocationStrategy, RebalancePlanCreate
+from app.services.allocation import AccountManager
+from app.services.rebalancing import fill_deficits, solve_rebalance
+from app.tests.utils import (
+    create_account,
+    create_and_process_ledger,
+    create_and_process_trade,
+    create_security,
+    create_user,
+)
+
+
+def test_fill_deficits_spreads_cash_over_largest_deficits():
+    deficits = np.array([500.0, 300.0, -10.0])
+
+    assert fill_deficits(deficits, 400).tolist() == [300, 100, 0]
+    assert fill_deficits(deficits, 1000).tolist() == [500, 300, 0]
+    assert fill_deficits(deficits, 0).tolist() == [0, 0, 0]
+
+
+def test_solve_rebalance_buys_within_cash():
+    result = solve_rebalance(
+        positions=np.array([2.0, 2.0]),
+        prices=np.array([500.0, 500.0]),
+        targets=np.array([0.3, 0.7]),
+        cash=1000.0,
+    )
+
+    assert result.quantities.tolist() == [0, 2]
+    assert result.cash_left == 0
+
+
+def test_solve_rebalance_sells_overweight_positions():
+    result = solve_rebalance(
+        positions=np.array([2.0, 2.0]),
+        prices=np.array([500.0, 500.0]),
+        targets=np.array([0.3, 0.7]),
+        cash=1000.0,
+        allow_sells=True,
+    )
+
+    assert result.quantities == pytest.approx([-0.2, 2.2])
+    assert result.cash_left == pytest.approx(0)
+
+
+@pytest.mark.parametrize(
+    "min_trade, expected_quantities, expected_cash_left",
+    [
+        # Rounded down to 16, 4 and 4 shares, then one more share of the
+        # most underweight position fits in the cash left
+        (0.0, [17, 4, 4], 30),
+        # 200 for the last position is below the minimum and 6 shares to
+        # reach it no longer fit
+        (250.0, [17, 4, 0], 210),
+    ],
+)
+def test_solve_rebalance_whole_shares(
+    min_trade: float, expected_quantities: list[int], expected_cash_left: float
+):
+    prices = np.array([30.0, 70.0, 45.0])
+    result = solve_rebalance(
+        positions=np.zeros(3),
+        prices=prices,
+        targets=np.array([0.5, 0.3, 0.2]),
+        cash=1000.0,
+        lot_size=1.0,
+        min_trade=min_trade,
+    )
+
+    assert result.quantities.tolist() == expected_quantities
+    assert result.cash_left == pytest.approx(expected_cash_left)
+    assert (result.quantities * prices).sum() <= 1000
+
+
+def test_solve_rebalance_respects_constraints_at_scale():
+    rng = np.random.default_rng(0)
+    n = 1_000
+    positions = rng.integers(0, 100, n).astype(float)
+    prices = rng.uniform(5, 500, n)
+    prices[:10] = 0
+
+    result = solve_rebalance(
+        positions=positions,
+        prices=prices,
+        targets=rng.dirichlet(np.ones(n)),
+        cash=100_000.0,
+        lot_size=1.0,
+        min_trade=50.0,
+        allow_sells=True,
+    )
+
+    amounts = result.quantities * prices
+    assert (result.quantities[:10] == 0).all()
+    assert (result.quantities == np.round(result.quantities)).all()
+    assert (-result.quantities <= positions).all()
+    assert (np.abs(amounts[amounts != 0]) >= 50).all()
+    assert amounts.sum() + result.cash_left == pytest.approx(100_000)
+    assert result.cash_left >= 0
+
+
+def test_get_rebalance_plan(session: Session, mock_get_tickers_data):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("2000"))
+    sec_1 = create_security(
+        session, account=account, symbol="ONE", target_allocation=Decimal("0.2")
+    )
+    sec_2 = create_security(
+        session, account=account, symbol="TWO", target_allocation=Decimal("0.6")
+    )
+    for sec in (sec_1, sec_2):
+        create_and_process_trade(
+            session,
+            account=account,
+            security=sec,
+            quantity=Decimal("2"),
+            price=Decimal("500"),
+        )
+
+    plan = AccountManager(session, account).get_rebalance_plan(
+        RebalancePlanCreate(
+            new_investment=Decimal("1100"),
+            allocation_strategy=AllocationStrategy.SCALE,
+            lot_size=Decimal("0.1"),
+            allow_sells=True,
+        )
+    )
+
+    # Targets of 775 and 2325 out of 3100: 225 of ONE is over its target and
+    # 200 of it can be sold in lots of 0.1, which pays for part of TWO's deficit
+    assert [(item.symbol, item.quantity, item.amount) for item in plan] == [
+        ("ONE", Decimal("-0.4"), -200),
+        ("TWO", Decimal("2.6"), 1300),
+    ]
+    assert [item.effective_target_allocation for item in plan] == [
+        Decimal("0.25"),
+        Decimal("0.75"),
+    ]
+    assert [item.weight_after for item in plan] == [Decimal("0.26"), Decimal("0.74")]
@@ -0,0 +1,119 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import crud
+from app.services.securities import (
+    TickerInfo,
+    fetch_tickers_info,
+    update_instruments_info,
+)
+from app.tests.utils import create_account, create_security, create_user
+
+
+def _ticker_info(symbol: str, price: str) -> TickerInfo:
+    return TickerInfo(
+        symbol=symbol,
+        name=f"{symbol} name",
+        latest_price=Decimal(price),
+        category="",
+        type="",
+        as_of=datetime(2024, 1, 1),
+    )
+
+
+def test_securities_share_instrument(session: Session):
+    user = create_user(session)
+    account_1 = create_account(session, current_user=user)
+    account_2 = create_account(session, current_user=user)
+    security_1 = create_security(session, account=account_1, symbol="ONE")
+    security_2 = create_security(session, account=account_2, symbol="ONE")
+
+    assert security_1.instrument is not None
+    assert security_1.instrument.id == security_2.instrument.id
+    assert len(crud.instruments.get_many(session, ["ONE"])) == 1
+
+
+def test_update_instruments_info_writes_once_per_symbol(session: Session):
+    user = create_user(session)
+    securities = [
+        create_security(
+            session, account=create_account(session, current_user=user), symbol=s
+        )
+        for s in ["ONE", "ONE", "ONE", "TWO"]
+    ]
+
+    rows = []
+    account_updates = []
+    commits = []
+
+    def count_update(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE instruments"):
+            rows.extend(parameters if executemany else [parameters])
+        elif statement.startswith("UPDATE"):
+            assert statement.startswith("UPDATE accounts")
+            account_updates.append(statement)
+
+    def count_commit(session):
+        commits.append(session)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_update)
+    event.listen(session, "after_commit", count_commit)
+    try:
+        update_instruments_info(
+            session,
+            {"ONE": _ticker_info("ONE", "10"), "TWO": _ticker_info("TWO", "20")},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count_update)
+        event.remove(session, "after_commit", count_commit)
+
+    assert len(rows) == 2
+    # The market values of all four accounts are updated by one statement
+    assert len(account_updates) == 1
+    assert len(commits) == 1
+    assert [s.latest_price for s in securities] == [10, 10, 10, 20]
+    assert securities[0].name == "ONE name"
+    assert securities[0].instrument.price_updated_at == datetime(2024, 1, 1)
+
+
+def test_fetch_tickers_info_falls_back_to_last_known_price(
+    session: Session, monkeypatch
+):
+    def get_tickers_data(symbols):
+        return {"ONE": {"longName": "One", "bid": 10}}
+
+    monkeypatch.setattr("app.services.securities.get_tickers_data", get_tickers_data)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account, symbol="KNOWN")
+    security.instrument.name = "Known"
+    security.instrument.latest_price = Decimal("5")
+    security.instrument.price_updated_at = datetime(2024, 1, 1)
+    session.add(security.instrument)
+    session.commit()
+
+    info = fetch_tickers_info(session, ["ONE", "KNOWN", "UNKNOWN"])
+
+    assert not info["ONE"].stale
+    assert info["ONE"].latest_price == 10
+    assert info["KNOWN"].stale
+    assert (info["KNOWN"].name, info["KNOWN"].latest_price) == ("Known", 5)
+    assert info["KNOWN"].as_of == datetime(2024, 1, 1)
+    assert info["UNKNOWN"].stale
+    assert (info["UNKNOWN"].latest_price, info["UNKNOWN"].as_of) == (0, None)
+
+
+def test_fetch_tickers_info_when_provider_fails(session: Session, monkeypatch):
+    def get_tickers_data(symbols):
+        raise ConnectionError
+
+    monkeypatch.setattr("app.services.securities.get_tickers_data", get_tickers_data)
+
+    info = fetch_tickers_info(session, ["ONE", "TWO"])
+
+    assert all(i.stale for i in info.values())
+    assert set(info) == {"ONE", "TWO"}
@@ -1,26 +1,41 @@
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 import pytest
-from fastapi import HTTPException
-from sqlmodel import Session
-
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session, create_engine, select
+
+from app import crud
+from app.core.config import settings
+from app.models.accounts import Account
+from app.models.checkpoints import TransactionCheckpoint
 from app.models.contexts import (
     TradeTransactionContext,
 )
 from app.models.ledger import LedgerType
+from app.models.lots import CostBasisMethod
 from app.models.trades import TradeCreate, TradeType
+from app.services import transactions
+from app.services.imports import import_transactions
 from app.services.transactions import (
+    change_cost_basis_method,
     process_transaction,
+    record_checkpoint_if_due,
     reprocess_transactions_excluding,
+    run_account_write,
 )
 from app.tests.utils import (
-    convert_fifo_lots_to_numeric,
+    convert_lots_to_numeric,
     create_account,
     create_and_process_ledger,
+    create_and_process_trade,
     create_security,
     create_trade,
     create_user,
     delete_trade,
+    get_open_lots,
 )
 
 
@@ -106,7 +121,7 @@ def test_buy_at_different_price(session: Session):
     assert security.cost_basis == 2000  # 1000 + (5 * 200)
     assert security.position == 15  # 10 + 5
     assert security.average_price == Decimal("133.33333333")  # 2000 / 15
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [10, 100],  # First lot (from first buy)
         [5, 200],  # Second lot (from second buy)
     ]
@@ -176,7 +191,7 @@ def test_sell_some_security_fifo_applies(session: Session):
     assert security.cost_basis == 1500  # (10 * 100) + (5 * 200) - (5 * 100)
     assert security.position == 10  # 5 + 5
     assert security.average_price == 150  # 1500 / 10
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [5, 100],  # Remaining from first buy
         [5, 200],  # Second lot still untouched
     ]
@@ -246,7 +261,7 @@ def test_sell_full_fifo_lot_and_part_next(session: Session):
     assert security.cost_basis == 600  # (5 * 200) - (5 * 100) - (2 * 200)
     assert security.position == 3  # 5 + 5 - 7
     assert security.average_price == 200  # 600 / 3
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [3, 200],  # Remaining from second buy
     ]
 
@@ -315,7 +330,7 @@ def test_sell_all_remaining_security(session: Session):
     assert security.cost_basis == 0  # All security sold
     assert security.position == 0
     assert security.average_price == 0
-    assert security.fifo_lots == []  # Empty FIFO queue
+    assert get_open_lots(session, security) == []  # Empty FIFO queue
 
 
 def test_sell_more_than_available_security(session: Session):
@@ -446,7 +461,7 @@ def test_buy_after_selling_all_security(session: Session):
     assert security.cost_basis == 1000
     assert security.position == 4
     assert security.average_price == 250
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [4, 250],
     ]
 
@@ -480,7 +495,7 @@ def test_buy_trade_exceeds_buying_power(session: Session):
     assert security.cost_basis == 0
     assert security.average_price == 0
     assert security.position == 0
-    assert security.fifo_lots == []
+    assert get_open_lots(session, security) == []
     assert account.buying_power == Decimal("1000")
 
 
@@ -586,7 +601,7 @@ def test_delete_buy_trade(session: Session):
     assert account.buying_power == Decimal("9500")  # 10000 - (5 * 100)
     assert security.position == Decimal("5")
     assert security.cost_basis == Decimal("500")
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [5, 100],
     ]
 
@@ -596,7 +611,7 @@ def test_delete_buy_trade(session: Session):
     assert account.buying_power == Decimal("10000")
     assert security.position == Decimal("0")
     assert security.cost_basis == Decimal("0")
-    assert security.fifo_lots == []
+    assert get_open_lots(session, security) == []
 
 
 def test_delete_previous_buy_trade(session: Session):
@@ -628,7 +643,7 @@ def test_delete_previous_buy_trade(session: Session):
     assert account.buying_power == Decimal("9500")  # 10000 - (5 * 100)
     assert security.position == Decimal("5")
     assert security.cost_basis == Decimal("500")
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [5, 100],
     ]
 
@@ -656,7 +671,7 @@ def test_delete_previous_buy_trade(session: Session):
     assert account.buying_power == Decimal("8000")
     assert security.position == Decimal("10")
     assert security.cost_basis == Decimal("2000")
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [10, 200],
     ]
 
@@ -706,7 +721,7 @@ def test_delete_sell_trade(session: Session):
     assert account.buying_power == Decimal("9950")  # 10000 - 500 + 450
     assert security.position == Decimal("2")  # 5 - 3
     assert security.cost_basis == Decimal("200")
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [2, 100],
     ]
 
@@ -716,11 +731,370 @@ def test_delete_sell_trade(session: Session):
     assert account.buying_power == Decimal("9500")  # 10000 - 500
     assert security.position == Decimal("5")
     assert security.cost_basis == Decimal("500")
-    assert convert_fifo_lots_to_numeric(security.fifo_lots) == [
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
         [5, 100],
     ]
 
 
+def test_sell_only_touches_consumed_lots(session: Session, monkeypatch):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("10000"))
+    security = create_security(session, account=account)
+    for quantity, price in ((10, 100), (5, 200), (5, 300)):
+        create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            quantity=Decimal(quantity),
+            price=Decimal(price),
+        )
+
+    updated = []
+    update = crud.lots.update
+
+    def spy(session, lot, **kwargs):
+        updated.append(lot)
+        update(session, lot, **kwargs)
+
+    monkeypatch.setattr(crud.lots, "update", spy)
+    create_and_process_trade(
+        session,
+        account=account,
+        security=security,
+        type_=TradeType.SELL,
+        quantity=Decimal("12"),
+        price=Decimal("400"),
+    )
+
+    assert [lot.sequence for lot in updated] == [0, 1]
+    assert security.lot_sequence == 3
+    assert security.lot_cursor == 1
+    assert security.cost_basis == 2100  # 3500 - (10 * 100) - (2 * 200)
+    assert convert_lots_to_numeric(get_open_lots(session, security)) == [
+        [3, 200],
+        [5, 300],
+    ]
+
+
+def test_get_open_lots_older_than(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(session, account=account, amount=Decimal("10000"))
+    security = create_security(session, account=account)
+    for _ in range(2):
+        create_and_process_trade(session, account=account, security=security)
+    old_lot = get_open_lots(session, security)[0]
+    old_lot.acquired_at = datetime.now(timezone.utc) - timedelta(days=400)
+    session.add(old_lot)
+    session.commit()
+
+    lots = crud.lots.get_open_for_account(
+        session,
+        account,
+        acquired_before=datetime.now(timezone.utc) - timedelta(days=365),
+    )
+
+    assert lots == [old_lot]
+
+
+def _create_history_with_checkpoints(session: Session, account, security):
+    trades = []
+    ledger = create_and_process_ledger(session, account=account, amount=Decimal("5000"))
+    record_checkpoint_if_due(session, account, ledger)
+    for i in range(1, 9):
+        trade = create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            type_=TradeType.SELL if i % 3 == 0 else TradeType.BUY,
+            quantity=Decimal(i),
+            price=Decimal(100 + i),
+        )
+        record_checkpoint_if_due(session, account, trade)
+        trades.append(trade)
+    return trades
+
+
+def _state(session: Session, account, security):
+    return (
+        account.buying_power,
+        security.position,
+        security.cost_basis,
+        security.average_price,
+        convert_lots_to_numeric(get_open_lots(session, security)),
+    )
+
+
+def test_checkpoints_recorded_at_interval(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 3)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    _create_history_with_checkpoints(session, account, security)
+
+    latest = crud.checkpoints.get_latest(session, account)
+    assert latest is not None
+    assert latest.transaction_count == 9
+    assert latest.buying_power == account.buying_power
+    assert latest.securities[str(security.id)]["position"] == str(security.position)
+
+
+def test_delete_reprocesses_from_checkpoint(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 3)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    trades = _create_history_with_checkpoints(session, account, security)
+
+    processed = []
+
+    def spy(ctx, **kwargs):
+        processed.append(ctx)
+        process_transaction(ctx, **kwargs)
+
+    monkeypatch.setattr(transactions, "process_transaction", spy)
+
+    # 7th transaction; the checkpoint after the 6th one is reused
+    deleted = trades[5]
+    reprocess_transactions_excluding(session, account, exclude=[deleted.id])
+    delete_trade(session, trade=deleted)
+
+    assert len(processed) == 2
+
+
+def test_delete_from_checkpoint_matches_full_replay(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 2)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    trades = _create_history_with_checkpoints(session, account, security)
+
+    deleted = trades[6]
+    reprocess_transactions_excluding(session, account, exclude=[deleted.id])
+    delete_trade(session, trade=deleted)
+    incremental_state = _state(session, account, security)
+
+    crud.checkpoints.delete_all_for_account(session, account)
+    reprocess_transactions_excluding(session, account, exclude=[])
+    full_replay_state = _state(session, account, security)
+
+    assert incremental_state == full_replay_state
+    latest = crud.checkpoints.get_latest(session, account)
+    assert latest is not None
+    assert latest.transaction_count == 8
+
+
+def test_delete_from_checkpoint_matches_full_replay_with_average_cost(
+    session: Session, monkeypatch
+):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 5)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    account.cost_basis_method = CostBasisMethod.AVERAGE
+    crud.accounts.update(session, account)
+    security = create_security(session, account=account)
+    ledger = create_and_process_ledger(
+        session, account=account, amount=Decimal("10000")
+    )
+    record_checkpoint_if_due(session, account, ledger)
+    # Average costs of these trades do not fit in 8 decimal places
+    trades = []
+    for type_, quantity, price in [
+        (TradeType.BUY, 2, "153.83"),
+        (TradeType.BUY, 4, "169.75"),
+        (TradeType.SELL, 4, "118.15"),
+        (TradeType.BUY, 4, "78.41"),
+        (TradeType.BUY, 1, "172.41"),
+        (TradeType.BUY, 5, "158.38"),
+        (TradeType.BUY, 5, "121.44"),
+        (TradeType.BUY, 4, "99.5"),
+        (TradeType.BUY, 1, "95.57"),
+        (TradeType.BUY, 4, "22.14"),
+        (TradeType.SELL, 1, "128.67"),
+        (TradeType.SELL, 8, "16.74"),
+        (TradeType.SELL, 5, "134.17"),
+        (TradeType.SELL, 1, "78.16"),
+        (TradeType.BUY, 1, "1"),
+    ]:
+        trade = create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            type_=type_,
+            quantity=Decimal(quantity),
+            price=Decimal(price),
+        )
+        record_checkpoint_if_due(session, account, trade)
+        trades.append(trade)
+
+    def state():
+        session.refresh(account)
+        session.refresh(security)
+        gains = crud.realized_gains.get_all_for_account(session, account)
+        return (
+            _state(session, account, security),
+            account.total_cost_basis,
+            sorted((g.proceeds, g.cost, g.gain) for g in gains),
+        )
+
+    reprocess_transactions_excluding(session, account, exclude=[trades[-1].id])
+    delete_trade(session, trade=trades[-1])
+    incremental_state = state()
+
+    crud.checkpoints.delete_all_for_account(session, account)
+    reprocess_transactions_excluding(session, account, exclude=[])
+
+    assert state() == incremental_state
+
+
+def test_failed_delete_keeps_checkpoints(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 2)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    trades = _create_history_with_checkpoints(session, account, security)
+    latest = crud.checkpoints.get_latest(session, account)
+    state = _state(session, account, security)
+
+    # Removing the first buy makes the first sell exceed the position
+    with pytest.raises(HTTPException):
+        reprocess_transactions_excluding(session, account, exclude=[trades[0].id])
+
+    assert crud.checkpoints.get_latest(session, account) == latest
+    assert _state(session, account, security) == state
+
+
+def test_reprocess_commits_once(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 2)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    trades = _create_history_with_checkpoints(session, account, security)
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(session, "after_commit", count_commit)
+    try:
+        reprocess_transactions_excluding(session, account, exclude=[trades[6].id])
+    finally:
+        event.remove(session, "after_commit", count_commit)
+
+    assert len(commits) == 1
+
+
+COST_BASIS_TRADES = [
+    (TradeType.BUY, 2, 100),
+    (TradeType.BUY, 2, 150),
+    (TradeType.BUY, 2, 120),
+    (TradeType.SELL, 3, 200),
+]
+
+
+@pytest.mark.parametrize(
+    "method, cost_removed, open_lots",
+    [
+        (CostBasisMethod.FIFO, 350, [(1, 150, 1), (2, 120, 2)]),
+        (CostBasisMethod.LIFO, 390, [(0, 100, 2), (1, 150, 1)]),
+        (CostBasisMethod.HIFO, 420, [(0, 100, 2), (2, 120, 1)]),
+        (CostBasisMethod.AVERAGE, 370, [(1, 150, 1), (2, 120, 2)]),
+    ],
+)
+def test_sell_with_cost_basis_method(session: Session, method, cost_removed, open_lots):
+    user = create_user(session)
+    processed = create_account(session, current_user=user)
+    imported = create_account(session, current_user=user)
+    for account in (processed, imported):
+        account.cost_basis_method = method
+        crud.accounts.update(session, account)
+
+    security = create_security(session, account=processed)
+    create_and_process_ledger(session, account=processed, amount=Decimal("1000"))
+    for type_, quantity, price in COST_BASIS_TRADES:
+        create_and_process_trade(
+            session,
+            account=processed,
+            security=security,
+            type_=type_,
+            quantity=Decimal(quantity),
+            price=Decimal(price),
+        )
+
+    # Imports apply the same trades to lots kept in memory
+    imported_security = create_security(session, account=imported)
+    import_transactions(
+        session,
+        imported,
+        [
+            {"kind": "ledger", "type": "deposit", "amount": "1000"},
+            *[
+                {
+                    "kind": "trade",
+                    "type": type_.value,
+                    "symbol": "SYM",
+                    "quantity": quantity,
+                    "price": price,
+                }
+                for type_, quantity, price in COST_BASIS_TRADES
+            ],
+        ],
+    )
+
+    for sec in (security, imported_security):
+        session.refresh(sec)
+        assert sec.cost_basis == 740 - cost_removed
+        assert [
+            (lot.sequence, lot.price, lot.remaining_quantity)
+            for lot in get_open_lots(session, sec)
+        ] == open_lots
+    [gain] = crud.realized_gains.get_all_for_account(session, processed)
+    assert gain.cost == cost_removed
+
+
+def test_change_cost_basis_method_recomputes_account(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSACTION_CHECKPOINT_INTERVAL", 2)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    security = create_security(session, account=account)
+    create_and_process_ledger(session, account=account, amount=Decimal("1000"))
+    for type_, quantity, price in COST_BASIS_TRADES:
+        trade = create_and_process_trade(
+            session,
+            account=account,
+            security=security,
+            type_=type_,
+            quantity=Decimal(quantity),
+            price=Decimal(price),
+        )
+        record_checkpoint_if_due(session, account, trade)
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(session, "after_commit", count_commit)
+    try:
+        change_cost_basis_method(session, account, CostBasisMethod.HIFO)
+    finally:
+        event.remove(session, "after_commit", count_commit)
+
+    assert len(commits) == 1
+    assert account.cost_basis_method == CostBasisMethod.HIFO
+    assert security.cost_basis == 320
+    [gain] = crud.realized_gains.get_all_for_account(session, account)
+    assert gain.cost == 420
+    checkpoints = session.exec(
+        select(TransactionCheckpoint).where(
+            TransactionCheckpoint.account_id == account.id
+        )
+    ).all()
+    assert [c.transaction_count for c in checkpoints] == [2, 4]
+
+
 # todo: test service for ledger
 def test_deposit(session: Session):
     user = create_user(session)
@@ -764,3 +1138,52 @@ def test_withdraw_more_than_buying_power(session: Session):
             type_=LedgerType.WITHDRAWAL,
             amount=Decimal("1000"),
         )
+
+
+def test_run_account_write_retries_when_account_changed_concurrently(
+    session: Session, database_url: str, monkeypatch
+):
+    monkeypatch.setattr(settings, "ACCOUNT_WRITE_BACKOFF", 0)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_and_process_ledger(
+        session, account=account, type_=LedgerType.DEPOSIT, amount=Decimal("1000")
+    )
+    other_engine = create_engine(database_url)
+    attempts = []
+
+    def write():
+        buying_power = account.buying_power
+        attempts.append(buying_power)
+        if len(attempts) == 1:
+            with Session(other_engine) as other_session:
+                other_account = other_session.get(Account, account.id)
+                other_account.buying_power += Decimal("500")  # type: ignore
+                other_session.commit()
+        account.buying_power = buying_power + Decimal("100")
+        session.commit()
+
+    run_account_write(session, account, write)
+    other_engine.dispose()
+
+    assert attempts == [Decimal("1000"), Decimal("1500")]
+    session.refresh(account)
+    assert account.buying_power == Decimal("1600")
+
+
+def test_run_account_write_gives_up_after_retries(session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNT_WRITE_RETRIES", 2)
+    monkeypatch.setattr(settings, "ACCOUNT_WRITE_BACKOFF", 0)
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    attempts = []
+
+    def write():
+        attempts.append(None)
+        raise StaleDataError()
+
+    with pytest.raises(HTTPException) as e:
+        run_account_write(session, account, write)
+
+    assert e.value.status_code == status.HTTP_409_CONFLICT
+    assert len(attempts) == 3
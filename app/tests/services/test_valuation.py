@@ -0,0 +1,143 @@
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+from app import crud
+from app.models.prices import DailyPrice
+from app.services.imports import import_transactions
+from app.services.valuation import (
+    compute_value_series,
+    get_account_value_history,
+    import_prices,
+)
+from app.tests.utils import create_account, create_security, create_user
+
+
+def test_compute_value_series():
+    account_1, account_2 = uuid4(), uuid4()
+    trades = pd.DataFrame(
+        [
+            (account_1, "ONE", datetime(2023, 12, 31, 15), 2.0),
+            (account_1, "TWO", datetime(2024, 1, 2, 10), 1.0),
+            (account_1, "ONE", datetime(2024, 1, 3, 10), -1.0),
+            (account_2, "ONE", datetime(2024, 1, 2, 10), 5.0),
+            (account_2, "NONE", datetime(2024, 1, 2, 10), 5.0),
+            (account_2, "ONE", datetime(2024, 1, 9, 10), 5.0),
+        ],
+        columns=["account_id", "symbol", "created_at", "quantity"],
+    )
+    cash_flows = pd.DataFrame(
+        [(account_1, datetime(2024, 1, 2, 10), 100.0)],
+        columns=["account_id", "created_at", "amount"],
+    )
+    closes = pd.DataFrame(
+        {"ONE": [10.0, None, 12.0], "TWO": [None, 20.0, None]},
+        index=[date(2023, 12, 29), date(2024, 1, 2), date(2024, 1, 3)],
+    )
+
+    series = compute_value_series(
+        [account_1, account_2],
+        trades,
+        cash_flows,
+        closes,
+        date(2024, 1, 1),
+        date(2024, 1, 3),
+        chunk_size=2,
+    )
+
+    assert series.market_value[account_1].tolist() == [20, 40, 32]
+    assert series.market_value[account_2].tolist() == [0, 50, 60]
+    assert series.cash[account_1].tolist() == [0, 100, 100]
+    assert series.total[account_1].tolist() == [20, 140, 132]
+
+
+def test_get_account_value_history(session: Session):
+    user = create_user(session)
+    account = create_account(session, current_user=user)
+    create_security(session, account=account, symbol="ONE")
+    import_transactions(
+        session,
+        account,
+        [
+            {
+                "kind": "ledger",
+                "type": "deposit",
+                "amount": 1000,
+                "created_at": "2024-01-01T10:00:00",
+            },
+            {
+                "kind": "trade",
+                "type": "buy",
+                "symbol": "ONE",
+                "quantity": 4,
+                "price": 100,
+                "created_at": "2024-01-02T10:00:00",
+            },
+            {
+                "kind": "trade",
+                "type": "sell",
+                "symbol": "ONE",
+                "quantity": 1,
+                "price": 120,
+                "created_at": "2024-01-04T10:00:00",
+            },
+        ],
+    )
+    import_prices(
+        session,
+        [
+            {"symbol": "ONE", "date": "2024-01-02", "close": "110"},
+            {"symbol": "ONE", "date": "2024-01-04", "close": "120"},
+        ],
+    )
+
+    history = get_account_value_history(session, account, until=date(2024, 1, 4))
+
+    assert [(p.date.day, p.market_value, p.cash, p.total) for p in history] == [
+        (1, 0, 1000, 1000),
+        (2, 440, 600, 1040),
+        (3, 440, 600, 1040),
+        (4, 360, 720, 1080),
+    ]
+
+
+def test_import_prices_replaces_existing_closes(session: Session):
+    import_prices(session, [{"symbol": "ONE", "date": "2024-01-02", "close": "1"}])
+    result = import_prices(
+        session,
+        [
+            {"symbol": "ONE", "date": "2024-01-02", "close": "2"},
+            {"symbol": "ONE", "date": "2024-01-03", "close": "3"},
+        ],
+    )
+
+    assert result.prices == 2
+    closes = session.exec(select(DailyPrice.close).order_by(DailyPrice.date)).all()
+    assert closes == [Decimal("2"), Decimal("3")]
+
+
+def test_import_prices_reports_invalid_rows(session: Session):
+    with pytest.raises(HTTPException) as exc_info:
+        import_prices(
+            session,
+            [
+                {"symbol": "ONE", "date": "2024-01-02", "close": "1"},
+                {"symbol": "ONE", "date": "not a date", "close": "1"},
+            ],
+        )
+
+    assert [e["loc"] for e in exc_info.value.detail] == [["body", 1, "date"]]
+    assert session.exec(select(DailyPrice)).all() == []
+
+
+def test_upsert_prices_statement_on_postgresql():
+    statement = crud.prices.upsert_statement("postgresql")
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (symbol, date) DO UPDATE SET close = excluded.close" in sql
@@ -10,6 +10,7 @@ from app.core.config import settings
 from app.models.accounts import Account, AccountCreate
 from app.models.contexts import LedgerTransactionContext, TradeTransactionContext
 from app.models.ledger import LedgerCreate, LedgerType
+from app.models.lots import Lot
 from app.models.securities import Security, SecurityCreate
 from app.models.trades import Trade, TradeCreate, TradeType
 from app.models.users import User, UserCreate
@@ -131,7 +132,12 @@ def create_and_process_trade(
         price=price,
     )
     ctx = TradeTransactionContext(
-        session, account, security, type_, TradeCreate.model_validate(trade)
+        session,
+        account,
+        security,
+        type_,
+        TradeCreate.model_validate(trade),
+        trade_id=trade.id,
     )
     process_transaction(ctx)
     return trade
@@ -182,5 +188,9 @@ def get_token_headers(
     return headers
 
 
-def convert_fifo_lots_to_numeric(fifo_lots: list[list]):
-    return [[float(x) for x in lot] for lot in fifo_lots]
+def get_open_lots(session: Session, security: Security) -> list[Lot]:
+    return list(crud.lots.get_open(session, security))
+
+
+def convert_lots_to_numeric(lots: list[Lot]):
+    return [[float(lot.remaining_quantity), float(lot.price)] for lot in lots]
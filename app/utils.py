@@ -1,4 +1,5 @@
 import re
+from datetime import datetime, timezone
 from decimal import ROUND_HALF_EVEN, Decimal
 
 from pydantic_core import PydanticCustomError
@@ -31,6 +32,12 @@ def validate_password(password: str):
     return password
 
 
+def to_naive_utc(value: datetime):
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 def get_average_price(cost_basis: Decimal, position: Decimal):
     return cost_basis / position if position != 0 else Decimal("0")
 
@@ -0,0 +1,119 @@
+"""Trade throughput of N concurrent writers, all buying in the same account or
+each in its own account, and how many buys were retried or failed.
+
+Requests run through the app on a file SQLite database with the "sqlite"
+engine profile. Writes to one account run one at a time; writes to separate
+accounts only share SQLite's single write lock.
+
+Usage: python -m benchmarks.account_writes [N ...]
+"""
+
+import logging
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+
+from app.api.dependencies import get_session
+from app.core.config import settings
+from app.core.db import ENGINE_PROFILES, create_db_engine
+from app.core.logging_config import logger
+from app.core.user_cache import user_cache
+from app.main import app
+from app.models.ledger import LedgerType
+from app.tests.utils import (
+    create_account,
+    create_and_process_ledger,
+    create_security,
+    create_user,
+    get_token_headers,
+)
+
+DEFAULT_SIZES = [1, 4, 16]
+TRADES = 50
+PASSWORD = "Password1!"
+
+
+class RetryCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if "retrying" in record.getMessage():
+            self.count += 1
+
+
+def measure(n: int, spread: bool) -> tuple[float, int, int]:
+    directory = tempfile.TemporaryDirectory()
+    engine = create_db_engine(
+        f"sqlite:///{directory.name}/bench.db", ENGINE_PROFILES["sqlite"]
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = create_user(session, username="bench", password=PASSWORD)
+        targets = []
+        for _ in range(n if spread else 1):
+            account = create_account(session, current_user=user)
+            create_and_process_ledger(
+                session,
+                account=account,
+                type_=LedgerType.DEPOSIT,
+                amount=Decimal(TRADES * n),
+            )
+            security = create_security(session, account=account)
+            targets.append((account.id, security.id))
+
+    def get_bench_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_bench_session
+    user_cache.clear()
+    retries = RetryCounter()
+    logger.addHandler(retries)
+    try:
+        with TestClient(app) as client:
+            headers = get_token_headers(client, username="bench", password=PASSWORD)
+
+            def buy(i: int) -> int:
+                account_id, security_id = targets[i % len(targets)]
+                return client.post(
+                    f"{settings.API_V1_STR}/{settings.ACCOUNTS_ROUTE_STR}/{account_id}/{settings.TRADES_ROUTE_STR}/",
+                    headers=headers,
+                    json={
+                        "type": "buy",
+                        "quantity": 1,
+                        "price": 1,
+                        "security_id": str(security_id),
+                    },
+                ).status_code
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                codes = list(executor.map(buy, range(TRADES * n)))
+            elapsed = time.perf_counter() - start
+    finally:
+        logger.removeHandler(retries)
+        app.dependency_overrides.clear()
+        engine.dispose()
+        directory.cleanup()
+    failed = sum(code != 201 for code in codes)
+    return (len(codes) - failed) / elapsed, retries.count, failed
+
+
+def main(sizes: list[int]):
+    logger.setLevel(logging.WARNING)
+    print(f"{'N':>8} {'accounts':>9} {'trades/s':>9} {'retries':>8} {'failed':>7}")
+    for n in sizes:
+        for name, spread in (("same", False), ("spread", True)):
+            throughput, retries, failed = measure(n, spread)
+            print(f"{n:>8} {name:>9} {throughput:>9.1f} {retries:>8} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
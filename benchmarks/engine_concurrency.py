@@ -0,0 +1,92 @@
+"""Write and read throughput of a file SQLite database with N writer and N
+reader threads, and how many transactions fail with "database is locked".
+
+Each writer reads the instruments count and inserts an instrument in a single
+transaction, WRITES times, while readers count the instruments until writers
+are done. Errors also count transactions that timed out waiting for a pooled
+connection. Compares SQLAlchemy's defaults with the "sqlite" engine profile.
+
+Usage: python -m benchmarks.engine_concurrency [N ...]
+"""
+
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError, TimeoutError
+from sqlmodel import Session, SQLModel, func, select
+
+from app.core.db import ENGINE_PROFILES, EngineProfile, create_db_engine
+from app.models.instruments import Instrument
+
+DEFAULT_SIZES = [1, 4, 16]
+WRITES = 100
+
+
+def measure(n: int, profile: EngineProfile) -> tuple[float, float, int]:
+    directory = tempfile.TemporaryDirectory()
+    engine = create_db_engine(f"sqlite:///{directory.name}/bench.db", profile)
+    SQLModel.metadata.create_all(engine)
+    count = select(func.count()).select_from(Instrument)
+    lock = threading.Lock()
+    writes = reads = errors = 0
+    writing = threading.Event()
+    writing.set()
+
+    def write(worker: int):
+        nonlocal writes, errors
+        for i in range(WRITES):
+            try:
+                with Session(engine) as session:
+                    session.exec(count).one()
+                    session.add(Instrument(symbol=f"S{worker}-{i}"))
+                    session.commit()
+                with lock:
+                    writes += 1
+            except (OperationalError, TimeoutError):
+                with lock:
+                    errors += 1
+
+    def read():
+        nonlocal reads, errors
+        while writing.is_set():
+            try:
+                with Session(engine) as session:
+                    session.exec(count).one()
+                with lock:
+                    reads += 1
+            except (OperationalError, TimeoutError):
+                with lock:
+                    errors += 1
+
+    writers = [threading.Thread(target=write, args=(i,)) for i in range(n)]
+    readers = [threading.Thread(target=read) for _ in range(n)]
+    start = time.perf_counter()
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writing.clear()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    directory.cleanup()
+    return writes / elapsed, reads / elapsed, errors
+
+
+def main(sizes: list[int]):
+    print(f"{'N':>8} {'profile':>8} {'writes/s':>9} {'reads/s':>9} {'errors':>7}")
+    for n in sizes:
+        for name, profile in (
+            ("default", EngineProfile()),
+            ("sqlite", ENGINE_PROFILES["sqlite"]),
+        ):
+            writes, reads, errors = measure(n, profile)
+            print(f"{n:>8} {name:>8} {writes:>9.1f} {reads:>9.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
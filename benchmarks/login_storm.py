@@ -0,0 +1,148 @@
+"""Login throughput, and p99 latency of other requests, during a storm of N
+concurrent logins.
+
+Compares verifying passwords inline in the request threadpool, as logins did
+before, with the bounded `password_hasher` pool, which rejects logins beyond
+PASSWORD_HASH_MAX_PENDING with a 503. Passwords are hashed with
+ROUNDS rounds of bcrypt so the storm stays short.
+
+Usage: python -m benchmarks.login_storm [N ...]
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+
+import bcrypt
+import httpx
+import numpy as np
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.api.dependencies import (
+    AuthFormDepAnnotated,
+    SessionDepAnnotated,
+    authenticate_user,
+    get_session,
+)
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.user_cache import user_cache
+from app.main import app
+from app.models.users import User
+
+DEFAULT_SIZES = [50, 200]
+ROUNDS = 10
+PASSWORD = "Password1!"
+# Seconds between requests to another endpoint during the storm
+PROBE_INTERVAL = 0.01
+
+
+def authenticate_user_inline(
+    session: SessionDepAnnotated, form_data: AuthFormDepAnnotated
+):
+    statement = select(User).where(User.username == form_data.username)
+    user = session.exec(statement).first()
+    if not user:
+        return False
+    if not bcrypt.checkpw(
+        form_data.password.encode("utf-8"), user.password_hash.encode("utf-8")
+    ):
+        return False
+    return user
+
+
+async def storm(n: int) -> tuple[int, int, float, list[float]]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        login_url = f"{settings.API_V1_STR}/auth/token"
+        me_url = f"{settings.API_V1_STR}/{settings.USERS_ROUTE_STR}/me"
+        credentials = {"username": "bench", "password": PASSWORD}
+        r = await client.post(login_url, data=credentials)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        await client.get(me_url, headers=headers)
+
+        latencies: list[float] = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                r = await client.get(me_url, headers=headers)
+                assert r.status_code == 200
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        probing = asyncio.create_task(probe())
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post(login_url, data=credentials) for _ in range(n))
+        )
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probing
+        succeeded = sum(r.status_code == 200 for r in responses)
+        rejected = sum(r.status_code == 503 for r in responses)
+        assert succeeded + rejected == n
+        return succeeded, rejected, elapsed, latencies
+
+
+def measure(n: int, inline: bool) -> tuple[float, int, float]:
+    directory = tempfile.TemporaryDirectory()
+    # A connection per session, as requests run on many threads at once
+    engine = create_engine(
+        f"sqlite:///{directory.name}/bench.db",
+        connect_args={"check_same_thread": False},
+        poolclass=NullPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            User(
+                username="bench",
+                email="bench@example.com",
+                first_name="bench",
+                last_name="bench",
+                password_hash=bcrypt.hashpw(
+                    PASSWORD.encode("utf-8"), bcrypt.gensalt(ROUNDS)
+                ).decode("utf-8"),
+            )
+        )
+        session.commit()
+
+    def get_bench_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_bench_session
+    if inline:
+        app.dependency_overrides[authenticate_user] = authenticate_user_inline
+    user_cache.clear()
+    try:
+        succeeded, rejected, elapsed, latencies = asyncio.run(storm(n))
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        directory.cleanup()
+    return succeeded / elapsed, rejected, float(np.percentile(latencies, 99))
+
+
+def main(sizes: list[int]):
+    logger.setLevel(logging.ERROR)
+    print(
+        f"{'N':>8} {'mode':>8} {'logins/s':>9} {'rejected':>9} {'p99 other (ms)':>15}"
+    )
+    for n in sizes:
+        for mode, inline in (("inline", True), ("pool", False)):
+            throughput, rejected, p99 = measure(n, inline)
+            print(
+                f"{n:>8} {mode:>8} {throughput:>9.1f} {rejected:>9} {p99 * 1000:>15.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,46 @@
+"""Wall time to fetch quotes for N symbols from a provider with fixed latency.
+
+Compares fetching one symbol at a time, as the synchronous yfinance loop did,
+with the bounded concurrency of `MarketDataClient`.
+
+Usage: python -m benchmarks.market_data [N ...]
+"""
+
+import asyncio
+import sys
+import time
+
+from app.core.config import settings
+from app.integrations.fake import FakeMarketDataProvider
+from app.integrations.market_data import MarketDataClient
+
+DEFAULT_SIZES = [10, 50, 200]
+LATENCY = 0.05
+
+
+def measure(n: int, max_concurrency: int) -> float:
+    quotes = {f"SYM{i}": {"bid": i} for i in range(n)}
+    client = MarketDataClient(
+        FakeMarketDataProvider(quotes, latency=LATENCY),
+        max_concurrency=max_concurrency,
+        timeout=settings.MARKET_DATA_TIMEOUT,
+        retries=settings.MARKET_DATA_RETRIES,
+        backoff=settings.MARKET_DATA_BACKOFF,
+    )
+    start = time.perf_counter()
+    batch = asyncio.run(client.fetch_many(quotes))
+    elapsed = time.perf_counter() - start
+    assert len(batch.quotes) == n
+    return elapsed
+
+
+def main(sizes: list[int]):
+    print(f"{'N':>8} {'concurrency':>12} {'seconds':>9}")
+    for n in sizes:
+        for concurrency in (1, settings.MARKET_DATA_MAX_CONCURRENCY):
+            elapsed = measure(n, concurrency)
+            print(f"{n:>8} {concurrency:>12} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
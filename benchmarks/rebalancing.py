@@ -0,0 +1,74 @@
+"""Wall time to plan the investment of new cash in an account of N securities,
+and how much of the cash each plan spends net of sells.
+
+Compares `solve_rebalance`, in whole shares with sells allowed, with the
+per-security Decimal loop of `AccountManager.get_allocation_plan`, whose
+needed investments are not bounded by the cash in total.
+
+Usage: python -m benchmarks.rebalancing [N ...]
+"""
+
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from app.services.rebalancing import solve_rebalance
+
+DEFAULT_SIZES = [10, 1_000, 10_000]
+CASH = 100_000.0
+MIN_TRADE = 50.0
+
+
+def build(n: int, rng: np.random.Generator):
+    positions = rng.integers(0, 100, n).astype(float)
+    prices = rng.lognormal(4, 1, n)
+    targets = rng.dirichlet(np.ones(n))
+    return positions, prices, targets
+
+
+def plan_with_loop(positions, prices, targets, cash: float):
+    positions = [Decimal(str(p)) for p in positions]
+    prices = [Decimal(str(p)) for p in prices]
+    targets = [Decimal(str(t)) for t in targets]
+    new_investment = Decimal(str(cash))
+    new_total = (
+        sum((p * q for p, q in zip(prices, positions)), Decimal(0)) + new_investment
+    )
+    needed = []
+    for position, price, target in zip(positions, prices, targets):
+        needed_investment = max(Decimal(0), new_total * target - price * position)
+        needed.append(min(needed_investment, new_investment))
+    return needed
+
+
+def main(sizes: list[int]):
+    rng = np.random.default_rng(0)
+    print(f"{'N':>8} {'mode':>10} {'seconds':>9} {'spent':>10}")
+    for n in sizes:
+        positions, prices, targets = build(n, rng)
+
+        start = time.perf_counter()
+        needed = plan_with_loop(positions, prices, targets, CASH)
+        elapsed = time.perf_counter() - start
+        spent = float(sum(needed)) / CASH
+        print(f"{n:>8} {'loop':>10} {elapsed:>9.3f} {spent:>10.2%}")
+
+        start = time.perf_counter()
+        result = solve_rebalance(
+            positions,
+            prices,
+            targets,
+            CASH,
+            lot_size=1.0,
+            min_trade=MIN_TRADE,
+            allow_sells=True,
+        )
+        elapsed = time.perf_counter() - start
+        spent = (result.quantities * prices).sum() / CASH
+        print(f"{n:>8} {'optimized':>10} {elapsed:>9.3f} {spent:>10.2%}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
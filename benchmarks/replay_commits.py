@@ -0,0 +1,125 @@
+"""Commits and wall time needed to replay an account history of N transactions.
+
+Compares committing after every processed transaction with the batched replay
+used by `reprocess_transactions_excluding`.
+
+Usage: python -m benchmarks.replay_commits [N ...]
+"""
+
+import logging
+import sys
+import time
+from decimal import Decimal
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app import crud
+from app.core.logging_config import logger
+from app.models.accounts import Account
+from app.models.contexts import LedgerTransactionContext, TradeTransactionContext
+from app.models.ledger import Ledger, LedgerCreate, LedgerType
+from app.models.securities import Security
+from app.models.trades import Trade, TradeCreate, TradeType
+from app.models.users import User
+from app.services.transactions import (
+    process_transaction,
+    reprocess_transactions_excluding,
+)
+
+DEFAULT_SIZES = [100, 500, 1_000]
+
+
+def build_account(session: Session, n: int) -> Account:
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        first_name="bench",
+        last_name="bench",
+        password_hash="",
+    )
+    account = Account(name="bench", user=user)
+    security = Security(symbol="SYM", target_allocation=Decimal("1"), account=account)
+    rows: list[Trade | Ledger] = [
+        Ledger(type=LedgerType.DEPOSIT, amount=Decimal(n * 100), account=account)
+    ]
+    for i in range(n - 1):
+        rows.append(
+            Trade(
+                type=TradeType.SELL if i % 4 == 3 else TradeType.BUY,
+                quantity=Decimal("1"),
+                price=Decimal("10"),
+                account=account,
+                security=security,
+            )
+        )
+    session.add_all(rows)
+    session.commit()
+    return account
+
+
+def replay_committing_each(session: Session, account: Account):
+    account.buying_power = Decimal("0")
+    for s in account.securities:
+        s.position = s.cost_basis = s.average_price = Decimal("0")
+        s.lot_sequence = s.lot_cursor = 0
+        crud.lots.delete_from_sequence(session, s, 0)
+    crud.realized_gains.delete_after(session, account, None)
+    transactions = [
+        *crud.trades.get_all_for_account(session, account),
+        *crud.ledger.get_all_for_account(session, account),
+    ]
+    transactions.sort(key=lambda txn: (txn.created_at, txn.id))
+    for txn in transactions:
+        if isinstance(txn, Trade):
+            ctx = TradeTransactionContext(
+                session,
+                account,
+                txn.security,
+                txn.type,
+                TradeCreate.model_validate(txn),
+                trade_id=txn.id,
+            )
+        else:
+            ctx = LedgerTransactionContext(
+                session, account, txn.type, LedgerCreate.model_validate(txn)
+            )
+        process_transaction(ctx)
+
+
+def measure(n: int, replay) -> tuple[int, float]:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        account = build_account(session, n)
+        commits = 0
+
+        def count_commit(session):
+            nonlocal commits
+            commits += 1
+
+        event.listen(session, "after_commit", count_commit)
+        start = time.perf_counter()
+        replay(session, account)
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return commits, elapsed
+
+
+def main(sizes: list[int]):
+    logger.setLevel(logging.WARNING)
+    print(f"{'N':>8} {'mode':>10} {'commits':>8} {'seconds':>9}")
+    for n in sizes:
+        for mode, replay in (
+            ("each", replay_committing_each),
+            ("batched", lambda s, a: reprocess_transactions_excluding(s, a, [])),
+        ):
+            commits, elapsed = measure(n, replay)
+            print(f"{n:>8} {mode:>10} {commits:>8} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,107 @@
+"""Wall time to compute daily value series over 10 years of closes for 500
+symbols, for N accounts each holding 20 symbols.
+
+Compares `compute_value_series` with valuing each account day by day with
+Decimal arithmetic, which is only run for up to LOOP_MAX_ACCOUNTS accounts.
+
+Usage: python -m benchmarks.value_series [N ...]
+"""
+
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from app.services.valuation import compute_value_series
+
+DEFAULT_SIZES = [10, 1_000, 5_000]
+LOOP_MAX_ACCOUNTS = 10
+SYMBOLS = 500
+HOLDINGS = 20
+TRADES_PER_HOLDING = 5
+START = date(2015, 1, 1)
+END = date(2024, 12, 31)
+
+
+def build(n: int, rng: np.random.Generator):
+    days = pd.date_range(START, END, freq="B")
+    symbols = [f"SYM{i}" for i in range(SYMBOLS)]
+    closes = pd.DataFrame(
+        rng.lognormal(4, 0.5, SYMBOLS)
+        * np.cumprod(1 + rng.normal(0, 0.01, (len(days), SYMBOLS)), axis=0),
+        index=days,
+        columns=symbols,
+    )
+
+    accounts = [uuid4() for _ in range(n)]
+    size = n * HOLDINGS * TRADES_PER_HOLDING
+    span = (END - START).days
+    trades = pd.DataFrame(
+        {
+            "account_id": np.repeat(accounts, HOLDINGS * TRADES_PER_HOLDING),
+            "symbol": np.array(symbols)[
+                np.repeat(rng.integers(0, SYMBOLS, n * HOLDINGS), TRADES_PER_HOLDING)
+            ],
+            "created_at": pd.to_datetime(START)
+            + pd.to_timedelta(rng.integers(0, span, size), unit="D"),
+            "quantity": rng.integers(1, 10, size).astype(float),
+        }
+    )
+    cash_flows = pd.DataFrame(
+        {
+            "account_id": accounts,
+            "created_at": [datetime.combine(START, datetime.min.time())] * n,
+            "amount": [100_000.0] * n,
+        }
+    )
+    return accounts, trades, cash_flows, closes
+
+
+def value_with_loop(accounts, trades: pd.DataFrame, closes: pd.DataFrame):
+    prices = {
+        (symbol, day.date()): Decimal(str(close))
+        for symbol, series in closes.items()
+        for day, close in series.items()
+    }
+    rows = list(trades.itertuples(index=False))
+    values = {}
+    for account in accounts:
+        account_trades = [t for t in rows if t.account_id == account]
+        last: dict[str, Decimal] = {}
+        day = START
+        while day <= END:
+            value = Decimal(0)
+            positions: dict[str, Decimal] = {}
+            for t in account_trades:
+                if t.created_at.date() <= day:
+                    positions[t.symbol] = positions.get(t.symbol, Decimal(0)) + Decimal(
+                        str(t.quantity)
+                    )
+            for symbol, position in positions.items():
+                last[symbol] = prices.get((symbol, day), last.get(symbol, Decimal(0)))
+                value += position * last[symbol]
+            values[(account, day)] = value
+            day += timedelta(days=1)
+    return values
+
+
+def main(sizes: list[int]):
+    rng = np.random.default_rng(0)
+    print(f"{'N':>8} {'mode':>10} {'seconds':>9}")
+    for n in sizes:
+        accounts, trades, cash_flows, closes = build(n, rng)
+        start = time.perf_counter()
+        compute_value_series(accounts, trades, cash_flows, closes, START, END)
+        print(f"{n:>8} {'vectorized':>10} {time.perf_counter() - start:>9.3f}")
+        if n <= LOOP_MAX_ACCOUNTS:
+            start = time.perf_counter()
+            value_with_loop(accounts, trades, closes)
+            print(f"{n:>8} {'loop':>10} {time.perf_counter() - start:>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
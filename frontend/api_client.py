@@ -11,11 +11,25 @@ class APIClient:
         self.token = token
         self.headers = {"Authorization": f"Bearer {token}"}
 
-    def get(self, endpoint: str):
-        response = requests.get(f"{self.base_url}{endpoint}", headers=self.headers)
+    def get(self, endpoint: str, params: dict | None = None):
+        response = requests.get(
+            f"{self.base_url}{endpoint}", headers=self.headers, params=params
+        )
         response.raise_for_status()
         return response.json()
 
+    def get_all(self, endpoint: str):
+        """Get every page of a list endpoint, following `meta.next_cursor`, as a
+        single response with the data of all pages."""
+        response = self.get(endpoint)
+        data = list(response["data"])
+        while response["meta"].get("next_cursor"):
+            response = self.get(
+                endpoint, params={"cursor": response["meta"]["next_cursor"]}
+            )
+            data.extend(response["data"])
+        return {**response, "data": data}
+
     def post(
         self,
         endpoint: str,
@@ -8,7 +8,7 @@ class AccountsRepository:
     def fetch_all(self) -> dict:
         """Fetch all accounts from the API."""
         try:
-            response = self.client.get("/accounts")
+            response = self.client.get_all("/accounts")
             return response
         except Exception as e:
             raise Exception(f"Error fetching accounts: {str(e)}")
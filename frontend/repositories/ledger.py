@@ -10,7 +10,7 @@ class LedgerRepository:
     def fetch_ledger(self, account_id: str) -> dict:
         """Fetch all ledger for a specific account."""
         try:
-            response = self.client.get(f"/accounts/{account_id}/ledger")
+            response = self.client.get_all(f"/accounts/{account_id}/ledger")
             return response
         except Exception as e:
             raise Exception(f"Error fetching ledger: {str(e)}")
@@ -9,7 +9,7 @@ class SecuritiesRepository:
     def fetch_securities(self, account_id: str) -> dict:
         """Fetch all securities for a specific account."""
         try:
-            response = self.client.get(f"/accounts/{account_id}/securities")
+            response = self.client.get_all(f"/accounts/{account_id}/securities")
             return response
         except Exception as e:
             raise Exception(f"Error fetching securities: {str(e)}")
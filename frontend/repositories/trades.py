@@ -10,7 +10,7 @@ class TradesRepository:
     def fetch_trades(self, account_id: str) -> dict:
         """Fetch all trades for a specific account."""
         try:
-            response = self.client.get(f"/accounts/{account_id}/trades")
+            response = self.client.get_all(f"/accounts/{account_id}/trades")
             return response
         except Exception as e:
             raise Exception(f"Error fetching trades: {str(e)}")